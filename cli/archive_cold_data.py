@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Run the cold-data archive job (python-analyzer/libs/archive.py) once, against
+the configured Postgres and MinIO (POSTGRES_* / MINIO_* env, as for the
+analyzer): hits and results older than --after-days move to Parquet files
+under archive/ in the bucket, listed in archive/manifest.json.
+
+    POSTGRES_HOST=localhost MINIO_ENDPOINT=localhost:7000 python cli/archive_cold_data.py --after-days 90
+    python cli/archive_cold_data.py --list            # manifest summary only
+"""
+import argparse
+import os
+import sys
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python-analyzer"))
+
+import libs.archive as archive  # noqa: E402
+
+
+def show_manifest() -> None:
+    files = archive.load_manifest(max_age=0)["files"]
+    totals = defaultdict(lambda: [0, 0, None, None])
+    for entry in files.values():
+        t = totals[entry["table"]]
+        t[0] += 1
+        t[1] += entry["rows"]
+        t[2] = entry["day"] if t[2] is None else min(t[2], entry["day"])
+        t[3] = entry["day"] if t[3] is None else max(t[3], entry["day"])
+    print(f"{'table':<9}{'files':>7}{'rows':>12}  days")
+    for table, (n, rows, first, last) in sorted(totals.items()):
+        print(f"{table:<9}{n:>7}{rows:>12}  {first} .. {last}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--after-days", type=int, default=archive.ARCHIVE_AFTER_DAYS,
+                    help="archive rows older than this many days (default ARCHIVE_AFTER_DAYS)")
+    ap.add_argument("--list", action="store_true", help="print the manifest summary and exit")
+    args = ap.parse_args()
+
+    if not archive.archive_enabled():
+        sys.exit("[archive] unavailable: pyarrow missing or MinIO not connected")
+    if not args.list:
+        if args.after_days <= 0:
+            sys.exit("[archive] --after-days (or ARCHIVE_AFTER_DAYS) must be positive")
+        archive.ARCHIVE_AFTER_DAYS = args.after_days
+        moved = archive.archive_cold_data()
+        print(f"[archive] moved {moved or 'nothing (another run holds the lock?)'}", flush=True)
+    show_manifest()
+
+
+if __name__ == "__main__":
+    main()
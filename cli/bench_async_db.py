@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Report latency during heavy ingest: the async DB layer (libs/async_db.py on
+asyncpg) against the thread-offloaded sync sessions it replaces, against the
+configured Postgres (POSTGRES_* env, as for the analyzer).
+
+For --duration seconds per mode:
+  ingest:  --writers concurrent hit flushes of --batch hits each, back to back
+           (libs/hit_writer.write_hits, through run_db as pg_flusher does)
+  reports: --clients concurrent report requests, alternating the task list
+           and the detail report of a --pages page domain (the controllers
+           in controllers/report_controller.py)
+
+threads: sync sessions - flushes on a 5-thread DB_POOL, reports on the
+         default executor (as the sync routes ran)
+async:   the asyncpg engine (DB_ASYNC_POOL_SIZE, statement timeout,
+         prepared statement cache) for both
+
+Reports p50/p95/p99 report latency, reports/s and hits/s per mode.
+Benchmark rows are deleted afterwards.
+
+    docker compose up -d postgres
+    POSTGRES_HOST=localhost python cli/bench_async_db.py
+    python cli/bench_async_db.py --duration 30 --clients 50 --writers 4 --batch 2000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python-analyzer"))
+
+from sqlalchemy import delete  # noqa: E402
+
+import config.settings as settings  # noqa: E402
+from config.settings import SessionLocal, Base, engine  # noqa: E402
+from models.hit_model import Hit, HitRecord, Result, ResultUrl  # noqa: E402
+from libs.async_db import run_db  # noqa: E402
+from libs.hit_writer import write_hits  # noqa: E402
+from libs.result_writer import write_result  # noqa: E402
+from controllers.report_controller import (  # noqa: E402
+    list_report_tasks_controller,
+    get_report_by_main_url_controller,
+)
+
+
+def seed_report(task_id: str, main_url: str, pages: int) -> None:
+    db = SessionLocal()
+    try:
+        url_matches = {f"{main_url}/page/{i}": i % 4 for i in range(pages)}
+        write_result(db, task_id, main_url, url_matches, {f"kw-{i}": 10 for i in range(40)},
+                     ["payments"], sum(url_matches.values()), raw_data_url=None)
+        write_hits(db, [make_hit(task_id, main_url, i) for i in range(500)], "orm")
+    finally:
+        db.close()
+
+
+def make_hit(task_id: str, main_url: str, i: int) -> HitRecord:
+    return HitRecord(task_id=task_id, main_url=main_url, sub_url=f"{main_url}/page/{i}",
+                     category="payments", matched_keyword=f"kw-{i % 40}",
+                     snippet=f"pay to merchant{i}@upi before the due date", timestamp=int(time.time()),
+                     source="regex", confident_score=90)
+
+
+async def run_mode(mode: str, args, task_id: str, main_url: str):
+    db_pool = ThreadPoolExecutor(max_workers=5)
+    use_async = mode == "async"
+    saved = settings.AsyncSessionLocal
+    if not use_async:
+        settings.AsyncSessionLocal = None  # controllers fall back to sync sessions
+    stop = asyncio.Event()
+    latencies, written = [], [0]
+
+    async def writer(w: int):
+        n = 0
+        while not stop.is_set():
+            batch = [make_hit(task_id, f"{main_url}/ingest", w * 10_000_000 + n + i) for i in range(args.batch)]
+            n += args.batch
+            await run_db(write_hits, batch, "copy_staging", executor=db_pool, use_async=use_async)
+            written[0] += len(batch)
+
+    async def client(c: int):
+        i = c
+        while not stop.is_set():
+            start = time.perf_counter()
+            if i % 2:
+                await list_report_tasks_controller()
+            else:
+                await get_report_by_main_url_controller(main_url)
+            latencies.append((time.perf_counter() - start) * 1000)
+            i += 1
+
+    try:
+        tasks = [asyncio.create_task(writer(w)) for w in range(args.writers)]
+        tasks += [asyncio.create_task(client(c)) for c in range(args.clients)]
+        await asyncio.sleep(args.duration)
+        stop.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        settings.AsyncSessionLocal = saved
+        db_pool.shutdown(wait=True)
+
+    q = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+    return {
+        "p50": q[49], "p95": q[94], "p99": q[98],
+        "reports_s": len(latencies) / args.duration,
+        "hits_s": written[0] / args.duration,
+    }
+
+
+async def main_async(args):
+    Base.metadata.create_all(bind=engine)
+    task_id = f"bench-{uuid.uuid4().hex[:8]}"
+    main_url = f"https://{task_id}.example.com"
+    seed_report(task_id, main_url, args.pages)
+
+    modes = [m for m in args.modes.split(",") if m in ("threads", "async")]
+    if "async" in modes and settings.AsyncSessionLocal is None:
+        print("[warn] async engine unavailable (asyncpg missing or DB_ASYNC=0): skipping async", flush=True)
+        modes.remove("async")
+
+    results = {}
+    try:
+        for mode in modes:
+            print(f"[bench] {mode}: {args.duration}s, writers={args.writers}x{args.batch}, clients={args.clients}", flush=True)
+            results[mode] = await run_mode(mode, args, task_id, main_url)
+    finally:
+        with engine.begin() as conn:
+            hits = conn.execute(delete(Hit).where(Hit.task_id == task_id)).rowcount
+            conn.execute(delete(ResultUrl).where(ResultUrl.main_url == main_url))
+            conn.execute(delete(Result).where(Result.task_id == task_id))
+        print(f"[cleanup] deleted {hits} benchmark hits", flush=True)
+        if settings.async_engine is not None:
+            await settings.async_engine.dispose()
+
+    print(f"{'mode':<9}{'p50_ms':>9}{'p95_ms':>9}{'p99_ms':>9}{'reports/s':>11}{'hits/s':>10}")
+    for mode, r in results.items():
+        print(f"{mode:<9}{r['p50']:>9.1f}{r['p95']:>9.1f}{r['p99']:>9.1f}{r['reports_s']:>11.1f}{r['hits_s']:>10.0f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--duration", type=float, default=20.0)
+    ap.add_argument("--clients", type=int, default=32)
+    ap.add_argument("--writers", type=int, default=2)
+    ap.add_argument("--batch", type=int, default=2000)
+    ap.add_argument("--pages", type=int, default=2000, help="pages of the reported domain")
+    ap.add_argument("--modes", default="threads,async")
+    asyncio.run(main_async(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the /report/export CSV stream (controllers/report_controller.py,
+iter_export_csv) against the configured Postgres (POSTGRES_* env, as for the
+analyzer), over --rows synthetic hits (10M by default) of one task.
+
+Modes (--modes):
+  stream:   server-side cursor (yield_per), CSV chunks as they fill
+  gzip:     the same, gzipped on the fly (?gzip=true)
+  buffered: the previous approach - fetch every row, build the CSV in one
+            StringIO (memory grows with the export; try it with fewer rows)
+
+Per mode: seconds, rows/s, output MB and the peak RSS growth over the
+process baseline (sampled every 50ms). Seeded with COPY in --seed-batch
+batches; benchmark rows are deleted afterwards unless --keep, and can be
+reused with --task-id.
+
+    docker compose up -d postgres
+    POSTGRES_HOST=localhost python cli/bench_export.py
+    python cli/bench_export.py --rows 1000000 --modes stream,gzip,buffered
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python-analyzer"))
+
+from sqlalchemy import delete, func, select  # noqa: E402
+
+from config.settings import SessionLocal, Base, engine  # noqa: E402
+from models.hit_model import Hit, HitRecord  # noqa: E402
+from libs.hit_writer import write_hits  # noqa: E402
+from controllers.report_controller import iter_export_csv, HIT_EXPORT_COLUMNS  # noqa: E402
+
+_PAGE = os.sysconf("SC_PAGE_SIZE")
+
+
+def rss() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * _PAGE
+
+
+class PeakRss:
+    """Samples the resident set size in the background while active."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self.base = self.peak = rss()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss())
+
+    @property
+    def growth_mb(self) -> float:
+        return (self.peak - self.base) / 1e6
+
+
+def seed(task_id: str, rows: int, batch: int) -> None:
+    now = int(time.time())
+    done, started = 0, time.perf_counter()
+    while done < rows:
+        n = min(batch, rows - done)
+        hits = [HitRecord(task_id=task_id, main_url=f"https://shop{(done + i) // 5000}.example.com",
+                          sub_url=f"https://shop{(done + i) // 5000}.example.com/item/{done + i}",
+                          category=("payments", "crypto", "gambling")[(done + i) % 3],
+                          matched_keyword=f"kw-{(done + i) % 40}",
+                          snippet=f"pay to merchant{done + i}@upi, \"quoted\", comma, newline\nend",
+                          timestamp=now, source="regex", confident_score=90)
+                for i in range(n)]
+        db = SessionLocal()
+        try:
+            write_hits(db, hits, "copy")
+        finally:
+            db.close()
+        done += n
+        print(f"\r[seed] {done}/{rows} ({done / (time.perf_counter() - started):.0f} rows/s)", end="", flush=True)
+    print(flush=True)
+
+
+def export_buffered(task_id: str):
+    """The previous controller's shape: all rows in memory, then one StringIO."""
+    db = SessionLocal()
+    try:
+        rows = db.execute(select(*HIT_EXPORT_COLUMNS).where(Hit.task_id == task_id).order_by(Hit.id)).all()
+    finally:
+        db.close()
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    w.writerow([c.key for c in HIT_EXPORT_COLUMNS])
+    w.writerows(rows)
+    yield buf.getvalue().encode("utf-8")
+
+
+def run(mode: str, task_id: str, rows: int):
+    if mode == "buffered":
+        chunks = export_buffered(task_id)
+    else:
+        chunks = iter_export_csv("hits", task_id=task_id, compress=mode == "gzip")
+    out = 0
+    with PeakRss() as mem:
+        start = time.perf_counter()
+        for data in chunks:
+            out += len(data)
+        elapsed = time.perf_counter() - start
+    return {"sec": elapsed, "rows_s": rows / elapsed, "out_mb": out / 1e6, "rss_mb": mem.growth_mb}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=10_000_000)
+    ap.add_argument("--seed-batch", type=int, default=100_000)
+    ap.add_argument("--modes", default="stream,gzip")
+    ap.add_argument("--task-id", help="export an existing benchmark task instead of seeding")
+    ap.add_argument("--keep", action="store_true", help="keep the seeded rows (reuse with --task-id)")
+    args = ap.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    task_id = args.task_id or f"bench-{uuid.uuid4().hex[:8]}"
+    if not args.task_id:
+        seed(task_id, args.rows, args.seed_batch)
+    with engine.connect() as conn:
+        rows = conn.execute(select(func.count()).select_from(Hit).where(Hit.task_id == task_id)).scalar()
+    print(f"[bench] task={task_id} rows={rows}", flush=True)
+
+    results = {}
+    try:
+        for mode in [m for m in args.modes.split(",") if m in ("stream", "gzip", "buffered")]:
+            print(f"[bench] {mode}", flush=True)
+            results[mode] = run(mode, task_id, rows)
+    finally:
+        if not args.keep and not args.task_id:
+            with engine.begin() as conn:
+                deleted = conn.execute(delete(Hit).where(Hit.task_id == task_id)).rowcount
+            print(f"[cleanup] deleted {deleted} benchmark hits", flush=True)
+
+    print(f"{'mode':<10}{'sec':>9}{'rows/s':>12}{'out_MB':>10}{'rss_growth_MB':>15}")
+    for mode, r in results.items():
+        print(f"{mode:<10}{r['sec']:>9.1f}{r['rows_s']:>12.0f}{r['out_mb']:>10.1f}{r['rss_mb']:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Memory and enqueue cost of a queued hit: the ORM Hit the analyzer used to put
+on hit_queue against the HitRecord it queues now (python-analyzer/models/hit_model.py).
+
+memory:  tracemalloc bytes allocated per queued hit for --hits hits: the hit
+         object and its queue tuple (the text fields exist either way)
+enqueue: construct a hit and put it on an asyncio.Queue as record_hit does
+         ((enqueued_at, size, hit) tuple); median ns per hit over --repeat runs
+convert: rebuild a hit from a FailedHit, as the DLQ retry worker does
+
+Nothing is written to Postgres or Redis; the analyzer's Python deps must be importable.
+
+    python cli/bench_hit_records.py
+    python cli/bench_hit_records.py --hits 50000 --repeat 7
+"""
+import argparse
+import asyncio
+import gc
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python-analyzer"))
+
+from models.hit_model import Hit, HitRecord  # noqa: E402
+from libs.dlq import FailedHit  # noqa: E402
+
+KINDS = {"orm": Hit, "record": HitRecord}
+
+
+def fields(i: int, now: int) -> dict:
+    # fresh strings per hit, as record_hit builds them from each page
+    return dict(
+        task_id="task-" + "0123456789abcdef"[i % 16] * 8,
+        main_url=f"https://bench{i % 50}.example.com",
+        sub_url=f"https://bench{i % 50}.example.com/page/{i}",
+        category="payments",
+        matched_keyword=f"kw-{i % 40}",
+        snippet=f"pay to merchant{i}@upi before the due date " * 8,
+        screenshot_path=None,
+        timestamp=now,
+        source="regex",
+        confident_score=90,
+    )
+
+
+def measure_memory(cls, n: int) -> float:
+    now = int(time.time())
+    specs = [fields(i, now) for i in range(n)]
+    gc.collect()
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    queued = [(time.monotonic(), 0, cls(**spec)) for spec in specs]
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del queued
+    return (used - base) / n
+
+
+def measure_enqueue(cls, n: int, repeat: int) -> float:
+    now = int(time.time())
+    specs = [fields(i, now) for i in range(n)]
+    timings = []
+
+    async def run():
+        q: asyncio.Queue = asyncio.Queue()
+        start = time.perf_counter_ns()
+        for spec in specs:
+            q.put_nowait((time.monotonic(), 0, cls(**spec)))
+        return time.perf_counter_ns() - start
+
+    for _ in range(repeat):
+        timings.append(asyncio.run(run()) / n)
+    return statistics.median(timings)
+
+
+def measure_convert(n: int, repeat: int) -> dict:
+    now = int(time.time())
+    failed = [FailedHit(error="bench", **{k: v for k, v in fields(i, now).items() if k != "screenshot_path"})
+              for i in range(n)]
+    out = {}
+    for name, to_hit in (("orm", lambda f: Hit(**{k: getattr(f, k) for k in (
+            "task_id", "main_url", "sub_url", "category", "matched_keyword", "snippet",
+            "timestamp", "source", "confident_score")})),
+                         ("record", FailedHit.to_record)):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter_ns()
+            for f in failed:
+                to_hit(f)
+            timings.append((time.perf_counter_ns() - start) / n)
+        out[name] = statistics.median(timings)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--hits", type=int, default=20000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    print(f"[bench] hits={args.hits} repeat={args.repeat}")
+    print(f"{'kind':<8}{'bytes/hit':>12}{'enqueue_ns':>14}{'from_dlq_ns':>14}")
+    convert = measure_convert(args.hits, args.repeat)
+    for name, cls in KINDS.items():
+        mem = measure_memory(cls, args.hits)
+        enq = measure_enqueue(cls, args.hits, args.repeat)
+        print(f"{name:<8}{mem:>12.0f}{enq:>14.0f}{convert[name]:>14.0f}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the analyzer's hit writer paths (python-analyzer/libs/hit_writer.py)
+against the configured Postgres (POSTGRES_* env, as for the analyzer).
+
+Each mode (orm, copy, copy_staging) writes synthetic hits at batch sizes
+200 / 2000 / 20000, --repeat times each; hits/sec is reported per batch size.
+Benchmark rows use a unique task_id and are deleted afterwards.
+
+    docker compose up -d postgres
+    POSTGRES_HOST=localhost python cli/bench_hit_writer.py
+    python cli/bench_hit_writer.py --sizes 200,2000 --repeat 5 --modes copy,orm
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python-analyzer"))
+
+from sqlalchemy import text  # noqa: E402
+
+from config.settings import SessionLocal, Base, engine  # noqa: E402
+from models.hit_model import Hit, HitRecord  # noqa: E402
+from libs.hit_writer import MODES, write_hits  # noqa: E402
+
+
+def make_hits(task_id: str, n: int):
+    now = int(time.time())
+    return [
+        HitRecord(
+            task_id=task_id,
+            main_url="https://bench.example.com",
+            sub_url=f"https://bench.example.com/page/{i // 4}",
+            category="payments",
+            matched_keyword=f"kw-{i % 4}",
+            snippet=f"pay to merchant{i}@upi, \"quoted\", comma, newline\nend",
+            screenshot_path=None if i % 2 else "",
+            timestamp=now,
+            source="regex",
+            confident_score=90,
+        )
+        for i in range(n)
+    ]
+
+
+def run(mode: str, size: int, repeat: int, task_id: str):
+    timings = []
+    for _ in range(repeat):
+        hits = make_hits(task_id, size)
+        db = SessionLocal()
+        try:
+            start = time.perf_counter()
+            path = write_hits(db, hits, mode)
+            timings.append(time.perf_counter() - start)
+        finally:
+            db.close()
+        if path != mode:
+            print(f"  [warn] {mode} fell back to {path}", flush=True)
+        if any(h.id is None for h in hits):
+            print(f"  [error] {mode} left hits without ids", file=sys.stderr)
+            sys.exit(1)
+    return timings
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="200,2000,20000")
+    ap.add_argument("--modes", default=",".join(reversed(MODES)))
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    task_id = f"bench-{uuid.uuid4().hex[:8]}"
+    sizes = [int(s) for s in args.sizes.split(",")]
+    modes = [m for m in args.modes.split(",") if m in MODES]
+
+    print(f"{'mode':<14}{'batch':>8}{'median_ms':>12}{'hits/s':>12}")
+    try:
+        for mode in modes:
+            for size in sizes:
+                timings = run(mode, size, args.repeat, task_id)
+                median = statistics.median(timings)
+                print(f"{mode:<14}{size:>8}{median * 1000:>12.1f}{size / median:>12.0f}", flush=True)
+    finally:
+        with engine.begin() as conn:
+            deleted = conn.execute(text(f"DELETE FROM {Hit.__tablename__} WHERE task_id = :t"), {"t": task_id})
+        print(f"[cleanup] deleted {deleted.rowcount} benchmark hits", flush=True)
+
+
+if __name__ == "__main__":
+    main()
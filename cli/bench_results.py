@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Write/read latency of a domain's result row against the configured Postgres
+(POSTGRES_* env, as for the analyzer), for a synthetic --pages page domain.
+
+merge:   the previous path - db.merge(Result) with sub_urls / keyword_match
+         JSON arrays (one entry per match) and raw_data inline (1 MB cap);
+         read = SELECT the row
+upsert:  libs/result_writer.write_result - ON CONFLICT (main_url) upsert,
+         keyword count map, result_urls rows; read = the report controller's
+         queries (row + result_urls). Snippets are gzipped as for MinIO
+         (time and size reported) but not uploaded.
+
+Each mode runs --repeat times; the upsert rewrites the same main_url (a
+rescan). Benchmark rows are deleted afterwards.
+
+    docker compose up -d postgres
+    POSTGRES_HOST=localhost python cli/bench_results.py
+    python cli/bench_results.py --pages 10000 --matches-per-page 3 --repeat 5
+"""
+import argparse
+import gzip
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python-analyzer"))
+
+from sqlalchemy import delete, select  # noqa: E402
+
+from config.settings import SessionLocal, Base, engine  # noqa: E402
+from models.hit_model import Result, ResultUrl  # noqa: E402
+from libs.result_writer import write_result  # noqa: E402
+
+
+def make_domain(main_url: str, pages: int, per_page: float):
+    rnd = random.Random(7)
+    url_matches, keywords, snippets = {}, [], []
+    for i in range(pages):
+        url = f"{main_url}/products/item-{i}"
+        n = rnd.randint(0, int(per_page * 2))
+        url_matches[url] = n
+        for _ in range(n):
+            kw = f"keyword-{rnd.randint(0, 39)}"
+            keywords.append(kw)
+            snippets.append(f"... buy {kw} online, pay to merchant{i}@upi, fast delivery across the country ...")
+    return url_matches, keywords, snippets
+
+
+def timed(fn):
+    start = time.perf_counter()
+    out = fn()
+    return (time.perf_counter() - start) * 1000, out
+
+
+def bench_merge(main_url, task_id, url_matches, keywords, snippets, repeat):
+    writes, reads = [], []
+    raw = "\n---SNIPPET---\n".join(snippets)[:1000000]
+    for r in range(repeat):
+        url = f"{main_url}#merge{r}"  # a fresh row each time: merge cannot update by main_url
+
+        def write():
+            db = SessionLocal()
+            try:
+                db.merge(Result(task_id=task_id, main_url=url, sub_urls=list(url_matches),
+                                keyword_match=keywords, categories=["payments"], raw_data=raw,
+                                cleaned_data="", timestamp=int(time.time())))
+                db.commit()
+            finally:
+                db.close()
+
+        def read():
+            db = SessionLocal()
+            try:
+                row = db.execute(select(Result).where(Result.main_url == url)).scalars().first()
+                return len(row.sub_urls), len(row.keyword_match), len(row.raw_data or "")
+            finally:
+                db.close()
+
+        writes.append(timed(write)[0])
+        reads.append(timed(read)[0])
+    return writes, reads
+
+
+def bench_upsert(main_url, task_id, url_matches, keywords, snippets, repeat):
+    writes, reads, gz = [], [], []
+    counts = Counter(keywords)
+    for _ in range(repeat):
+        gz_ms, data = timed(lambda: gzip.compress("\n---SNIPPET---\n".join(snippets).encode("utf-8"), 6))
+        gz.append((gz_ms, len(data)))
+
+        def write():
+            db = SessionLocal()
+            try:
+                write_result(db, task_id, main_url, url_matches, counts, ["payments"], len(keywords),
+                             raw_data_url=f"results/{task_id}-snippets.txt.gz")
+            finally:
+                db.close()
+
+        def read():
+            db = SessionLocal()
+            try:
+                row = db.execute(select(Result).where(Result.main_url == main_url)).scalars().first()
+                urls = db.execute(select(ResultUrl.sub_url, ResultUrl.matches)
+                                  .where(ResultUrl.main_url == main_url).order_by(ResultUrl.id)).all()
+                return len(urls), len(row.keyword_counts or {})
+            finally:
+                db.close()
+
+        writes.append(timed(write)[0])
+        reads.append(timed(read)[0])
+    return writes, reads, gz
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--pages", type=int, default=10000)
+    ap.add_argument("--matches-per-page", type=float, default=3.0)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    task_id = f"bench-{uuid.uuid4().hex[:8]}"
+    main_url = f"https://{task_id}.example.com"
+    url_matches, keywords, snippets = make_domain(main_url, args.pages, args.matches_per_page)
+    raw_bytes = len("\n---SNIPPET---\n".join(snippets).encode("utf-8"))
+    print(f"[bench] pages={args.pages} matches={len(keywords)} snippets={raw_bytes / 1e6:.1f}MB repeat={args.repeat}")
+
+    try:
+        m_w, m_r = bench_merge(main_url, task_id, url_matches, keywords, snippets, args.repeat)
+        u_w, u_r, gz = bench_upsert(main_url, task_id, url_matches, keywords, snippets, args.repeat)
+    finally:
+        with engine.begin() as conn:
+            conn.execute(delete(ResultUrl).where(ResultUrl.main_url == main_url))
+            deleted = conn.execute(delete(Result).where(Result.task_id == task_id))
+        print(f"[cleanup] deleted {deleted.rowcount} benchmark results", flush=True)
+
+    print(f"{'mode':<8}{'write_ms':>12}{'read_ms':>12}")
+    print(f"{'merge':<8}{statistics.median(m_w):>12.1f}{statistics.median(m_r):>12.1f}")
+    print(f"{'upsert':<8}{statistics.median(u_w):>12.1f}{statistics.median(u_r):>12.1f}")
+    gz_ms = statistics.median(ms for ms, _ in gz)
+    print(f"snippets gzip: {gz_ms:.1f}ms {raw_bytes / 1e6:.1f}MB -> {gz[0][1] / 1e6:.2f}MB "
+          f"(merge keeps the first 1MB inline)")
+
+
+if __name__ == "__main__":
+    main()
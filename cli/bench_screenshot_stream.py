@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the analyzer's Redis Streams screenshot queue
+(python-analyzer/libs/screenshot_stream.py) against a local Redis.
+
+throughput: produce --jobs entries, drain them with --consumers threads
+            (read --batch, simulate --work-ms per job, ack) and report jobs/sec;
+            the same run through an in-process queue.Queue is the baseline.
+recovery:   a consumer reads --kill-after entries and dies without acking; a
+            survivor (claim idle --claim-idle-ms) drains the rest and takes the
+            dead consumer's entries over. Reports time to an empty backlog and
+            checks that every job was processed.
+
+    docker compose up -d redis
+    python cli/bench_screenshot_stream.py --redis redis://localhost:6379/0
+    python cli/bench_screenshot_stream.py --jobs 20000 --consumers 8 --work-ms 1
+"""
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python-analyzer"))
+
+import redis  # noqa: E402
+
+from libs.screenshot_stream import ScreenshotStream  # noqa: E402
+
+
+def job_fields(i: int):
+    return {"sub_url": f"https://example.com/page/{i // 5}", "keyword": f"kw{i % 5}",
+            "main_url": "https://example.com", "task_id": "bench", "confidence": "0.9"}
+
+
+def make_stream(client, claim_idle_ms: int) -> ScreenshotStream:
+    stream = ScreenshotStream(client, key=f"bench:screenshots:{uuid.uuid4().hex[:8]}",
+                              group="bench-workers", claim_idle_ms=claim_idle_ms)
+    stream.ensure_group()
+    return stream
+
+
+def produce(stream: ScreenshotStream, n: int) -> float:
+    start = time.perf_counter()
+    pipe = stream.client.pipeline(transaction=False)
+    for i in range(n):
+        pipe.xadd(stream.key, job_fields(i))
+        if i % 500 == 499:
+            pipe.execute()
+    pipe.execute()
+    return time.perf_counter() - start
+
+
+def consume(stream: ScreenshotStream, name: str, batch: int, work_s: float, seen: set, lock, stop):
+    while not stop.is_set():
+        entries = stream.read(name, batch, block_ms=200) or stream.reclaim(name, batch)
+        if not entries:
+            if stream.backlog() == 0:
+                return
+            continue
+        for entry_id, fields in entries:
+            if work_s:
+                time.sleep(work_s)
+            with lock:
+                seen.add(fields["sub_url"] + "|" + fields["keyword"] + "|" + entry_id)
+        stream.ack([e[0] for e in entries])
+
+
+def bench_queue(n: int, consumers: int, work_s: float) -> float:
+    q: "queue.Queue" = queue.Queue()
+    start = time.perf_counter()
+    for i in range(n):
+        q.put(job_fields(i))
+
+    def worker():
+        while True:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                return
+            if work_s:
+                time.sleep(work_s)
+
+    threads = [threading.Thread(target=worker) for _ in range(consumers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+
+def bench_throughput(client, args) -> None:
+    work_s = args.work_ms / 1000
+    stream = make_stream(client, claim_idle_ms=60000)
+    try:
+        produce_s = produce(stream, args.jobs)
+        seen, lock, stop = set(), threading.Lock(), threading.Event()
+        start = time.perf_counter()
+        threads = [threading.Thread(target=consume, args=(stream, f"c{i}", args.batch, work_s, seen, lock, stop))
+                   for i in range(args.consumers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        consume_s = time.perf_counter() - start
+    finally:
+        client.delete(stream.key)
+    queue_s = bench_queue(args.jobs, args.consumers, work_s)
+
+    print(f"[throughput] jobs={args.jobs} consumers={args.consumers} batch={args.batch} work_ms={args.work_ms}")
+    print(f"  redis produce : {args.jobs / produce_s:>10.0f} jobs/s")
+    print(f"  redis consume : {args.jobs / consume_s:>10.0f} jobs/s  processed={len(seen)}")
+    print(f"  queue.Queue   : {args.jobs / queue_s:>10.0f} jobs/s  (in-process baseline, produce+consume)")
+
+
+def bench_recovery(client, args) -> None:
+    work_s = args.work_ms / 1000
+    stream = make_stream(client, claim_idle_ms=args.claim_idle_ms)
+    try:
+        produce(stream, args.jobs)
+        # the victim reads a batch and "dies" before acking any of it
+        lost = stream.read("victim", args.kill_after, block_ms=200)
+        killed_at = time.perf_counter()
+
+        seen, lock, stop = set(), threading.Lock(), threading.Event()
+        survivor = ScreenshotStream(client, stream.key, stream.group, args.claim_idle_ms)
+        t = threading.Thread(target=consume, args=(survivor, "survivor", args.batch, work_s, seen, lock, stop))
+        t.start()
+        t.join(timeout=args.timeout)
+        stop.set()
+        recovered_s = time.perf_counter() - killed_at
+        lost_ids = {e[0] for e in lost}
+        recovered = sum(1 for key in seen if key.rsplit("|", 1)[1] in lost_ids)
+        left = stream.backlog()
+    finally:
+        client.delete(stream.key)
+
+    print(f"[recovery] jobs={args.jobs} killed_with={len(lost)} unacked claim_idle_ms={args.claim_idle_ms}")
+    print(f"  backlog empty after {recovered_s:.2f}s  processed={len(seen)}/{args.jobs} "
+          f"reclaimed={recovered}/{len(lost)} left={left}")
+    if len(seen) < args.jobs or left:
+        print("  FAIL: jobs were lost", file=sys.stderr)
+        sys.exit(1)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--redis", default=os.environ.get("REDIS_URL", "redis://localhost:6379/0"))
+    ap.add_argument("--jobs", type=int, default=5000)
+    ap.add_argument("--consumers", type=int, default=4)
+    ap.add_argument("--batch", type=int, default=50)
+    ap.add_argument("--work-ms", type=float, default=0.0, help="simulated processing time per job")
+    ap.add_argument("--kill-after", type=int, default=200, help="entries the killed consumer holds")
+    ap.add_argument("--claim-idle-ms", type=int, default=2000)
+    ap.add_argument("--timeout", type=float, default=120.0)
+    ap.add_argument("--only", choices=["throughput", "recovery"])
+    args = ap.parse_args()
+
+    client = redis.Redis.from_url(args.redis, decode_responses=True)
+    client.ping()
+    if args.only != "recovery":
+        bench_throughput(client, args)
+    if args.only != "throughput":
+        bench_recovery(client, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Offline evaluation of the analyzer's static heavy-JS predictor
+(python-analyzer/libs/js_predictor.py) on captured pages.
+
+Input is JSONL, one captured page per line:
+    {"url": ..., "html": <fetched HTML>, "rendered_text": <text after rendering>}
+or with an explicit label instead of rendered_text:
+    {"url": ..., "html": ..., "needs_render": true}
+
+Pages without either can be labelled against a running renderer
+(--renderer http://localhost:9000, uses /render mode=text) and written back
+with --out. A page "needs render" when the rendered text is substantially
+larger than the static text.
+
+Compares the predictor's lanes with the legacy rule (render only when the
+static text is thin) and reports renders issued, renders saved, misses
+(pages that needed a render but got none) and static passes skipped.
+Offline there are no keyword matches, so "thin" means static text < 200 chars.
+
+    python cli/eval_js_predictor.py captured.jsonl
+    python cli/eval_js_predictor.py captured.jsonl --sweep
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python-analyzer"))
+
+from selectolax.parser import HTMLParser  # noqa: E402
+
+from libs.js_predictor import (  # noqa: E402
+    extract_features, score,
+    LANE_STATIC, LANE_RENDER_FIRST, LANE_RENDER_PARALLEL,
+    RENDER_FIRST_THRESHOLD, RENDER_PARALLEL_THRESHOLD, THIN_RENDER_THRESHOLD,
+)
+
+THIN_TEXT = 200  # legacy escalation rule: len(text) < 200
+
+
+def needs_render(static_len: int, rendered_len: int) -> bool:
+    return rendered_len > max(static_len * 1.5, static_len + 500)
+
+
+def label_with_renderer(pages, renderer_url: str):
+    import requests
+    for page in pages:
+        if "needs_render" in page or "rendered_text" in page:
+            continue
+        try:
+            r = requests.post(f"{renderer_url.rstrip('/')}/render",
+                              json={"url": page["url"], "mode": "text"}, timeout=90)
+            r.raise_for_status()
+            page["rendered_text"] = r.json().get("text") or ""
+            print(f"  [label] {page['url']} -> {len(page['rendered_text'])} chars", flush=True)
+        except Exception as e:
+            print(f"  [label:error] {page['url']} -> {e}", flush=True)
+
+
+def load(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def featurize(pages):
+    rows = []
+    for page in pages:
+        html = page.get("html") or ""
+        if not html:
+            continue
+        features = extract_features(html, HTMLParser(html))
+        if "needs_render" in page:
+            label = bool(page["needs_render"])
+        elif "rendered_text" in page:
+            label = needs_render(features.text_bytes, len(page["rendered_text"]))
+        else:
+            continue
+        rows.append((page.get("url", ""), features, score(features), label))
+    return rows
+
+
+def evaluate(rows, first_t: float, parallel_t: float):
+    out = {"pages": len(rows), "need_render": sum(1 for r in rows if r[3]),
+           LANE_STATIC: 0, LANE_RENDER_PARALLEL: 0, LANE_RENDER_FIRST: 0,
+           "renders": 0, "useful_renders": 0, "misses": 0,
+           "legacy_renders": 0, "legacy_misses": 0}
+    for _url, features, p, label in rows:
+        thin = features.text_bytes < THIN_TEXT
+        out["legacy_renders"] += thin
+        out["legacy_misses"] += label and not thin
+
+        lane = LANE_RENDER_FIRST if p >= first_t else LANE_RENDER_PARALLEL if p >= parallel_t else LANE_STATIC
+        out[lane] += 1
+        # static lane keeps the thin-text safety net unless the score rules JS out
+        rendered = lane != LANE_STATIC or (thin and p >= THIN_RENDER_THRESHOLD)
+        out["renders"] += rendered
+        out["useful_renders"] += rendered and label
+        out["misses"] += label and not rendered
+    out["renders_saved"] = out["legacy_renders"] - out["renders"]
+    out["static_passes_skipped"] = out[LANE_RENDER_FIRST]
+    return out
+
+
+def report(stats):
+    n = max(1, stats["pages"])
+    print(f"pages={stats['pages']} need_render={stats['need_render']}")
+    print(f"lanes: static={stats[LANE_STATIC]} render_parallel={stats[LANE_RENDER_PARALLEL]} "
+          f"render_first={stats[LANE_RENDER_FIRST]}")
+    print(f"legacy rule : renders={stats['legacy_renders']} ({stats['legacy_renders'] / n:.1%}) "
+          f"misses={stats['legacy_misses']}")
+    print(f"predictor   : renders={stats['renders']} ({stats['renders'] / n:.1%}) "
+          f"useful={stats['useful_renders']} misses={stats['misses']}")
+    print(f"renders saved vs legacy={stats['renders_saved']} "
+          f"static passes skipped (render-first)={stats['static_passes_skipped']}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("captured", help="JSONL of captured pages")
+    ap.add_argument("--renderer", help="renderer base URL used to label unlabelled pages")
+    ap.add_argument("--out", help="write (newly labelled) pages back to this JSONL")
+    ap.add_argument("--sweep", action="store_true", help="report a grid of lane thresholds")
+    args = ap.parse_args()
+
+    pages = load(args.captured)
+    if args.renderer:
+        label_with_renderer(pages, args.renderer)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            for page in pages:
+                f.write(json.dumps(page) + "\n")
+
+    rows = featurize(pages)
+    if not rows:
+        print("no labelled pages", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"[thresholds] render_first>={RENDER_FIRST_THRESHOLD} render_parallel>={RENDER_PARALLEL_THRESHOLD} "
+          f"thin_render>={THIN_RENDER_THRESHOLD}")
+    report(evaluate(rows, RENDER_FIRST_THRESHOLD, RENDER_PARALLEL_THRESHOLD))
+
+    if args.sweep:
+        print("\nfirst  parallel  renders  saved  misses  skipped")
+        for first_t in (0.7, 0.8, 0.85, 0.9, 0.95):
+            for parallel_t in (0.3, 0.4, 0.5, 0.6, 0.7):
+                if parallel_t > first_t:
+                    continue
+                s = evaluate(rows, first_t, parallel_t)
+                print(f"{first_t:<6} {parallel_t:<9} {s['renders']:<8} {s['renders_saved']:<6} "
+                      f"{s['misses']:<7} {s['static_passes_skipped']}")
+
+
+if __name__ == "__main__":
+    main()
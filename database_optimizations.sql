@@ -226,6 +226,40 @@ ORDER BY hit_count DESC;
 -- Check materialized views created
 -- SELECT matviewname FROM pg_matviews;
 
+-- ============================================================================
+-- 13. HITS PARTITIONING (managed by python-analyzer/models/database_init.py)
+-- ============================================================================
+-- hits is range-partitioned on its epoch-seconds timestamp; the primary key
+-- is (id, timestamp). Partitions are created HITS_PARTITIONS_AHEAD periods
+-- ahead at startup and every HITS_PARTITION_CHECK_SEC; hits_default catches
+-- anything outside them. Equivalent DDL:
+
+-- CREATE TABLE hits (
+--     id BIGSERIAL, task_id VARCHAR NOT NULL, main_url TEXT NOT NULL, sub_url TEXT NOT NULL,
+--     category VARCHAR(100) NOT NULL, matched_keyword VARCHAR(255) NOT NULL, snippet TEXT NOT NULL,
+--     screenshot_path TEXT, timestamp BIGINT NOT NULL, source VARCHAR(50) NOT NULL,
+--     confident_score INTEGER,
+--     PRIMARY KEY (id, timestamp)
+-- ) PARTITION BY RANGE (timestamp);
+-- CREATE INDEX ix_hits_task_sub_url ON hits (task_id, sub_url);
+-- CREATE INDEX ix_hits_main_url ON hits (main_url);
+-- CREATE INDEX ix_hits_timestamp_brin ON hits USING brin (timestamp);
+-- CREATE TABLE hits_p20260105 PARTITION OF hits FOR VALUES FROM (1767571200) TO (1768176000);
+-- CREATE TABLE hits_default PARTITION OF hits DEFAULT;
+
+-- Retention (HITS_RETENTION_DAYS > 0) detaches whole partitions instead of DELETE:
+-- ALTER TABLE hits DETACH PARTITION hits_p20260105;
+-- ALTER TABLE hits_p20260105 RENAME TO hits_archive_20260105;   -- HITS_RETENTION_MODE=detach
+-- DROP TABLE hits_p20260105;                                      -- HITS_RETENTION_MODE=drop
+
+-- An existing unpartitioned hits table is converted only with HITS_PARTITION_MIGRATE=1
+-- (renamed to hits_legacy, rows copied; drop hits_legacy once checked).
+
+-- Check partitions and their sizes
+-- SELECT c.relname, pg_size_pretty(pg_total_relation_size(c.oid))
+-- FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+-- WHERE i.inhparent = 'hits'::regclass ORDER BY c.relname;
+
 -- ============================================================================
 -- END OF OPTIMIZATION SCRIPT
 -- ============================================================================
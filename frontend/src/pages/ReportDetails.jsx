@@ -22,6 +22,7 @@ function ReportDetails() {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState("");
   const [activeTab, setActiveTab] = useState("validated"); // "all" or "validated"
+  const [storedSnippets, setStoredSnippets] = useState(""); // snippets kept in MinIO (raw_data_url)
 
   // Normalize screenshot URL (replace internal MinIO host)
   const getPublicScreenshotUrl = (url) => {
@@ -48,6 +49,9 @@ function ReportDetails() {
         throw new Error(`HTTP error! Status: ${response.status}`);
       const data = await response.json();
       setReport(data);
+      if (data.results?.raw_data_url && !data.results?.raw_data) {
+        fetchStoredSnippets(encodedUrl);
+      }
     } catch (err) {
       console.error("Error fetching report details:", err);
       setError("Failed to load report details. Please try again later.");
@@ -56,7 +60,20 @@ function ReportDetails() {
     }
   };
 
+  // Snippets of newer reports are stored gzipped in MinIO and served separately
+  const fetchStoredSnippets = async (encodedUrl) => {
+    try {
+      const response = await fetch(
+        `${API_CONFIG.analyzerBaseUrl}/report/snippets?main_url=${encodedUrl}`
+      );
+      if (response.ok) setStoredSnippets(await response.text());
+    } catch (err) {
+      console.error("Error fetching snippets:", err);
+    }
+  };
+
   useEffect(() => {
+    setStoredSnippets("");
     fetchReportDetails();
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [mainUrl]);
@@ -141,7 +158,7 @@ function ReportDetails() {
   const allMatches = resultsData.keyword_match || [];
   const allCategories = resultsData.categories || [];
   const allSubUrls = resultsData.sub_urls || [];
-  const rawData = resultsData.raw_data || "";  // All snippets from matches
+  const rawData = resultsData.raw_data || storedSnippets;  // All snippets from matches
   const totalAllMatches = report.total_matches_all || 0;
   const totalValidatedHits = report.total_hits || 0;
   
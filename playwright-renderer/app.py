@@ -1,11 +1,14 @@
 # app.py
+import asyncio
 import base64
+import json
 import os
-import uuid
-from typing import Optional
+import time
+from typing import List, Optional
 
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, field_validator
 from urllib.parse import urlparse
 
@@ -13,73 +16,294 @@ from lib.renderer import (
     init_browser,
     shutdown_browser,
     render_html,
+    render_text,
     render_and_screenshot,
-    upload_to_minio,
+    check_visibility,
+    browser_stats,
+    scheduler_stats,
 )
+from lib.scheduler import Overloaded, DeadlineExceeded
+from lib.storage import init_storage, shutdown_storage, upload_to_minio
+from lib.metrics import render_prometheus, observe_stage, ERRORS
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan event handler for startup and shutdown."""
     # Startup
     await init_browser()
+    init_storage()
     yield
     # Shutdown
     await shutdown_browser()
+    shutdown_storage()
 
 app = FastAPI(title="Playwright Async Renderer", lifespan=lifespan)
 
 # default upload behaviour if not specified in request (env var "true"/"1"/"yes")
 MINIO_UPLOAD_DEFAULT = os.environ.get("MINIO_UPLOAD_DEFAULT", "false").lower() in ("1", "true", "yes")
+# how often a running render checks whether its client went away
+DISCONNECT_POLL_SEC = float(os.environ.get("RENDERER_DISCONNECT_POLL_SEC", "0.5"))
+# max URLs accepted by one /render/batch request
+BATCH_MAX_URLS = int(os.environ.get("RENDERER_BATCH_MAX_URLS", "100"))
+# max keywords accepted by one /render/visibility request
+VISIBILITY_MAX_KEYWORDS = int(os.environ.get("RENDERER_VISIBILITY_MAX_KEYWORDS", "50"))
 
 
-class RenderRequest(BaseModel):
+def _validate_url(v: str) -> str:
+    """Validate that the URL is well-formed"""
+    if not v:
+        raise ValueError("URL cannot be empty")
+    try:
+        parsed = urlparse(v)
+        if not parsed.scheme or not parsed.netloc:
+            raise ValueError(f"Invalid URL format: {v}")
+        return v
+    except Exception as e:
+        raise ValueError(f"Invalid URL: {v} - {e}")
+
+
+def _validate_mode(v: str) -> str:
+    if v not in ("html", "text"):
+        raise ValueError(f"Invalid mode: {v} (expected 'html' or 'text')")
+    return v
+
+
+class _RenderOptions(BaseModel):
+    # caller's remaining time budget; work that cannot finish in it is shed or dropped
+    deadline_ms: Optional[int] = None
+    # include the per-stage timing breakdown ("stages") in the response
+    timings: bool = False
+
+    def deadline(self) -> Optional[float]:
+        """Absolute time.monotonic() deadline, or None when the caller set none."""
+        if not self.deadline_ms:
+            return None
+        return time.monotonic() + self.deadline_ms / 1000
+
+
+class RenderRequest(_RenderOptions):
     url: str  # Changed from HttpUrl to str to handle URLs with query parameters
     keyword: Optional[str] = None
+    # several keywords sharing one screenshot (render-and-screenshot only)
+    keywords: Optional[List[str]] = None
     # If present, overrides MINIO_UPLOAD_DEFAULT
     upload: Optional[bool] = None
     # optional max matches to return
     max_matches: Optional[int] = 20
+    # /render output: "html" (serialized DOM) or "text" (visible text, image srcs, links)
+    mode: str = "html"
     
     @field_validator('url')
     @classmethod
     def validate_url(cls, v: str) -> str:
-        """Validate that the URL is well-formed"""
+        return _validate_url(v)
+
+    @field_validator('mode')
+    @classmethod
+    def validate_mode(cls, v: str) -> str:
+        return _validate_mode(v)
+
+
+class VisibilityRequest(_RenderOptions):
+    url: str
+    keywords: List[str]
+    # boxes returned per keyword
+    max_matches: int = 5
+    # screenshot in the same render when one of these is visible (or not literal page text)
+    screenshot_keywords: Optional[List[str]] = None
+
+    @field_validator('url')
+    @classmethod
+    def validate_url(cls, v: str) -> str:
+        return _validate_url(v)
+
+    @field_validator('keywords')
+    @classmethod
+    def validate_keywords(cls, v: List[str]) -> List[str]:
+        v = [k for k in v if k]
         if not v:
-            raise ValueError("URL cannot be empty")
-        try:
-            parsed = urlparse(v)
-            if not parsed.scheme or not parsed.netloc:
-                raise ValueError(f"Invalid URL format: {v}")
-            return v
-        except Exception as e:
-            raise ValueError(f"Invalid URL: {v} - {e}")
+            raise ValueError("keywords cannot be empty")
+        if len(v) > VISIBILITY_MAX_KEYWORDS:
+            raise ValueError(f"too many keywords: {len(v)} > {VISIBILITY_MAX_KEYWORDS}")
+        return v
+
+
+class BatchRenderRequest(_RenderOptions):
+    # rendered under one shared deadline (callers scale it with the batch size);
+    # invalid entries get an error line, not a 422
+    urls: List[str]
+    mode: str = "html"
+
+    @field_validator('mode')
+    @classmethod
+    def validate_mode(cls, v: str) -> str:
+        return _validate_mode(v)
+
+    @field_validator('urls')
+    @classmethod
+    def validate_urls(cls, v: List[str]) -> List[str]:
+        if not v:
+            raise ValueError("urls cannot be empty")
+        if len(v) > BATCH_MAX_URLS:
+            raise ValueError(f"too many urls: {len(v)} > {BATCH_MAX_URLS}")
+        return v
 
 
 # Lifespan events are now handled in the lifespan context manager above
 
 
+@app.get("/health")
+async def health():
+    """Liveness plus browser pool and render queue state."""
+    return {"status": "ok", **browser_stats(), "queue": scheduler_stats()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition: stage histograms, queue, browsers, errors."""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+async def _run_render(request: Request, endpoint: str, coro):
+    """
+    Run a render, cancelling it if the client disconnects, and map scheduler
+    rejections to 503 + Retry-After (shed) or 504 (deadline passed while queued).
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SEC)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                ERRORS.inc(endpoint=endpoint, type="client_disconnected")
+                print(f"[renderer:cancelled] client disconnected: {request.url.path}", flush=True)
+                raise HTTPException(status_code=499, detail="client disconnected")
+    except Overloaded as e:
+        ERRORS.inc(endpoint=endpoint, type="shed")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except DeadlineExceeded as e:
+        ERRORS.inc(endpoint=endpoint, type="expired")
+        raise HTTPException(status_code=504, detail=str(e))
+    finally:
+        if not task.done():
+            task.cancel()
+
+
 @app.post("/render")
-async def api_render_html(req: RenderRequest):
+async def api_render_html(req: RenderRequest, request: Request):
     """
     Render a URL and return its HTML content (no screenshot).
     Used for JS-heavy pages where initial fetch doesn't have full content.
+    With mode="text" returns visible text, image sources and links instead of HTML.
     """
+    render = render_text if req.mode == "text" else render_html
     try:
-        result = await render_html(str(req.url))
+        result = await _run_render(request, "render", render(str(req.url), deadline=req.deadline()))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
     if not result.get("ok", False):
         raise HTTPException(status_code=500, detail=result.get("error", "unknown error"))
 
+    if not req.timings:
+        result.pop("stages", None)
+    return result
+
+
+@app.post("/render/batch")
+async def api_render_batch(req: BatchRenderRequest):
+    """
+    Render many URLs with shared options and stream one NDJSON line per URL as
+    each finishes (completion order; "index" refers to the request list).
+    Renders go through the same scheduler as /render, so the batch shares the
+    renderer's concurrency limit; work still queued when the client disconnects
+    is cancelled.
+    """
+    render = render_text if req.mode == "text" else render_html
+    deadline = req.deadline()
+
+    async def _one(index: int, url: str) -> dict:
+        try:
+            _validate_url(url)
+            result = await render(url, deadline=deadline)
+        except ValueError as e:
+            result = {"ok": False, "error": str(e), "status": 422}
+        except Overloaded as e:
+            ERRORS.inc(endpoint="batch", type="shed")
+            result = {"ok": False, "error": str(e), "status": 503, "retry_after": e.retry_after}
+        except DeadlineExceeded as e:
+            ERRORS.inc(endpoint="batch", type="expired")
+            result = {"ok": False, "error": str(e), "status": 504}
+        except Exception as e:
+            ERRORS.inc(endpoint="batch", type=type(e).__name__)
+            result = {"ok": False, "error": str(e), "status": 500}
+        result.setdefault("url", url)
+        result["index"] = index
+        if not req.timings:
+            result.pop("stages", None)
+        return result
+
+    async def _stream():
+        tasks = [asyncio.ensure_future(_one(i, u)) for i, u in enumerate(req.urls)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield json.dumps(await next_done) + "\n"
+        finally:
+            cancelled = sum(1 for t in tasks if not t.done() and t.cancel())
+            if cancelled:
+                ERRORS.inc(cancelled, endpoint="batch", type="client_disconnected")
+                print(f"[renderer:batch:cancelled] {cancelled}/{len(tasks)} renders dropped", flush=True)
+
+    print(f"[renderer:batch] urls={len(req.urls)} mode={req.mode}", flush=True)
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
+
+
+@app.post("/render/visibility")
+async def api_render_visibility(req: VisibilityRequest, request: Request):
+    """
+    Check whether keywords are visibly rendered on a page (CSS visibility,
+    opacity, size and position), returning per-keyword booleans and boxes.
+    Much cheaper than /render-and-screenshot: no image is captured unless
+    screenshot_keywords asks for one (then "screenshot_b64", from the same render).
+    """
+    try:
+        result = await _run_render(
+            request, "visibility",
+            check_visibility(str(req.url), req.keywords, max_matches=req.max_matches, deadline=req.deadline(),
+                             screenshot_keywords=req.screenshot_keywords),
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if not result.get("ok", False):
+        raise HTTPException(status_code=500, detail=result.get("error", "unknown error"))
+
+    screenshot_bytes = result.pop("screenshot", None)
+    if screenshot_bytes:
+        result["screenshot_b64"] = base64.b64encode(screenshot_bytes).decode()
+
+    if not req.timings:
+        result.pop("stages", None)
     return result
 
 
 @app.post("/render-and-screenshot")
-async def api_render(req: RenderRequest):
+async def api_render(req: RenderRequest, request: Request):
     # call renderer
     try:
-        result = await render_and_screenshot(str(req.url), keyword=req.keyword, max_matches=req.max_matches)
+        result = await _run_render(
+            request, "screenshot",
+            render_and_screenshot(str(req.url), keyword=req.keyword, max_matches=req.max_matches,
+                                  deadline=req.deadline(), keywords=req.keywords),
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -96,8 +320,14 @@ async def api_render(req: RenderRequest):
     # optionally upload to MinIO if requested or default enabled
     should_upload = req.upload if req.upload is not None else MINIO_UPLOAD_DEFAULT
     if should_upload and screenshot_bytes:
-        object_name = f"screenshots/{uuid.uuid4().hex}.png"
-        upload_info = await upload_to_minio(screenshot_bytes, object_name)
+        # content-addressed: identical screenshots share one object
+        upload_start = time.perf_counter()
+        upload_info = await upload_to_minio(screenshot_bytes)
+        observe_stage("screenshot", "upload", time.perf_counter() - upload_start, result.get("stages"))
+        if not upload_info.get("ok"):
+            ERRORS.inc(endpoint="screenshot", type="upload")
         result["minio"] = upload_info
 
+    if not req.timings:
+        result.pop("stages", None)
     return result
@@ -0,0 +1,259 @@
+# lib/browser_pool.py
+import asyncio
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, List
+
+from playwright.async_api import Browser
+
+# Number of Chromium processes to run; renders are spread across them (least in-flight first)
+BROWSER_COUNT = max(1, int(os.environ.get("RENDERER_BROWSERS", "1")))
+# Recycle a browser after it served this many renders (0 disables)
+RECYCLE_AFTER_RENDERS = int(os.environ.get("RENDERER_RECYCLE_RENDERS", "500"))
+# Recycle a browser once its process tree RSS exceeds this many MB (0 disables)
+RECYCLE_RSS_MB = int(os.environ.get("RENDERER_RECYCLE_RSS_MB", "1500"))
+# How often the supervisor checks RSS and connectivity
+MONITOR_INTERVAL_SEC = float(os.environ.get("RENDERER_MONITOR_INTERVAL", "10"))
+# Max time a retiring browser may take to drain its in-flight pages
+DRAIN_TIMEOUT_SEC = float(os.environ.get("RENDERER_DRAIN_TIMEOUT", "120"))
+
+LAUNCH_ARGS = ["--no-sandbox", "--disable-setuid-sandbox"]
+
+
+def _find_pid(marker: str) -> Optional[int]:
+    """Find the Chromium main process launched with the given marker switch."""
+    try:
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/cmdline", "rb") as f:
+                    if marker.encode() in f.read():
+                        return int(entry)
+            except OSError:
+                continue
+    except OSError:
+        pass
+    return None
+
+
+def _tree_rss_bytes(root_pid: int) -> int:
+    """Sum RSS of a process and all its descendants (Linux /proc)."""
+    children: Dict[int, List[int]] = {}
+    rss: Dict[int, int] = {}
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return 0
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                stat = f.read()
+            # fields after the "(comm)" part; ppid is field 4, rss (pages) field 24
+            fields = stat[stat.rindex(")") + 2:].split()
+            pid = int(entry)
+            children.setdefault(int(fields[1]), []).append(pid)
+            rss[pid] = int(fields[21]) * page_size
+        except (OSError, ValueError, IndexError):
+            continue
+
+    total = 0
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        total += rss.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return total
+
+
+class ManagedBrowser:
+    """One Chromium process plus its usage counters."""
+
+    def __init__(self, browser: Browser, slot: int, generation: int, marker: str):
+        self.browser = browser
+        self.slot = slot
+        self.generation = generation
+        self.marker = marker
+        self.pid: Optional[int] = _find_pid(marker)
+        self.renders = 0
+        self.inflight = 0
+        self.rss_bytes = 0
+        self.draining = False
+        self.launched_at = time.time()
+        self.idle = asyncio.Event()
+        self.idle.set()
+
+    def rss(self) -> int:
+        if self.pid is None:
+            self.pid = _find_pid(self.marker)
+        if self.pid is not None:
+            self.rss_bytes = _tree_rss_bytes(self.pid)
+        return self.rss_bytes
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "slot": self.slot,
+            "generation": self.generation,
+            "pid": self.pid,
+            "renders": self.renders,
+            "inflight": self.inflight,
+            "rss_mb": round(self.rss_bytes / 1024 / 1024, 1),
+            "draining": self.draining,
+            "uptime_s": int(time.time() - self.launched_at),
+        }
+
+
+class BrowserPool:
+    """
+    Supervises BROWSER_COUNT Chromium processes.
+
+    Browsers are recycled after RECYCLE_AFTER_RENDERS renders or RECYCLE_RSS_MB of
+    RSS: a replacement is launched first, new renders go to it, and the old browser
+    is closed once its in-flight pages drain. Disconnected browsers are relaunched.
+    """
+
+    def __init__(self, size: int = BROWSER_COUNT):
+        self.size = size
+        self._playwright = None
+        self._slots: List[Optional[ManagedBrowser]] = [None] * size
+        self._generations = [0] * size
+        self._lock = asyncio.Lock()
+        self._monitor: Optional[asyncio.Task] = None
+        self._closing = False
+        self.recycled = 0
+        self.crashes = 0
+
+    async def start(self, playwright) -> None:
+        self._playwright = playwright
+        self._closing = False
+        for slot in range(self.size):
+            try:
+                self._slots[slot] = await self._launch(slot)
+            except Exception as e:
+                print(f"[browser:launch:error] slot={slot} -> {e}", flush=True)
+        self._monitor = asyncio.create_task(self._monitor_loop())
+        print(f"[browser:pool] started browsers={self.size}", flush=True)
+
+    async def stop(self) -> None:
+        self._closing = True
+        if self._monitor:
+            self._monitor.cancel()
+            self._monitor = None
+        for slot, managed in enumerate(self._slots):
+            self._slots[slot] = None
+            if managed:
+                await self._close(managed)
+
+    async def _launch(self, slot: int) -> ManagedBrowser:
+        self._generations[slot] += 1
+        generation = self._generations[slot]
+        # unknown switches are ignored by Chromium; used to find the process in /proc
+        marker = f"--ats-browser={slot}-{generation}-{uuid.uuid4().hex[:8]}"
+        browser = await self._playwright.chromium.launch(headless=True, args=LAUNCH_ARGS + [marker])
+        managed = ManagedBrowser(browser, slot, generation, marker)
+        browser.on("disconnected", lambda _b: self._on_disconnected(managed))
+        print(f"[browser:launch] slot={slot} gen={generation} pid={managed.pid}", flush=True)
+        return managed
+
+    async def _close(self, managed: ManagedBrowser) -> None:
+        managed.draining = True
+        try:
+            await managed.browser.close()
+        except Exception:
+            pass
+
+    def _on_disconnected(self, managed: ManagedBrowser) -> None:
+        if self._closing or managed.draining:
+            return
+        self.crashes += 1
+        print(f"[browser:disconnected] slot={managed.slot} gen={managed.generation}, relaunching", flush=True)
+        asyncio.create_task(self._replace(managed, reason="disconnected"))
+
+    async def _replace(self, managed: ManagedBrowser, reason: str) -> None:
+        """Swap a slot to a fresh browser and retire the old one once drained."""
+        async with self._lock:
+            if self._closing or self._slots[managed.slot] is not managed:
+                return
+            managed.draining = True
+            try:
+                self._slots[managed.slot] = await self._launch(managed.slot)
+            except Exception as e:
+                self._slots[managed.slot] = None
+                print(f"[browser:relaunch:error] slot={managed.slot} -> {e}", flush=True)
+        if reason != "disconnected":
+            self.recycled += 1
+        print(f"[browser:recycle] slot={managed.slot} gen={managed.generation} reason={reason} "
+              f"renders={managed.renders} rss_mb={managed.rss_bytes // (1024 * 1024)}", flush=True)
+        asyncio.create_task(self._retire(managed))
+
+    async def _retire(self, managed: ManagedBrowser) -> None:
+        try:
+            await asyncio.wait_for(managed.idle.wait(), timeout=DRAIN_TIMEOUT_SEC)
+        except asyncio.TimeoutError:
+            print(f"[browser:drain:timeout] slot={managed.slot} gen={managed.generation} "
+                  f"inflight={managed.inflight}", flush=True)
+        await self._close(managed)
+
+    async def _monitor_loop(self) -> None:
+        while True:
+            await asyncio.sleep(MONITOR_INTERVAL_SEC)
+            for slot in range(self.size):
+                managed = self._slots[slot]
+                try:
+                    if managed is None:
+                        # a previous relaunch failed; try again
+                        async with self._lock:
+                            if self._slots[slot] is None and not self._closing:
+                                self._slots[slot] = await self._launch(slot)
+                        continue
+                    if not managed.browser.is_connected():
+                        self._on_disconnected(managed)
+                        continue
+                    rss = await asyncio.get_running_loop().run_in_executor(None, managed.rss)
+                    if RECYCLE_RSS_MB and rss >= RECYCLE_RSS_MB * 1024 * 1024:
+                        await self._replace(managed, reason="rss")
+                except Exception as e:
+                    print(f"[browser:monitor:error] slot={slot} -> {e}", flush=True)
+
+    def _pick(self) -> Optional[ManagedBrowser]:
+        candidates = [m for m in self._slots if m is not None and not m.draining and m.browser.is_connected()]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda m: m.inflight)
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Yield the least-loaded healthy Browser (or None if none is available)."""
+        managed = self._pick()
+        if managed is None:
+            yield None
+            return
+
+        managed.inflight += 1
+        managed.renders += 1
+        managed.idle.clear()
+        try:
+            yield managed.browser
+        finally:
+            managed.inflight -= 1
+            if managed.inflight == 0:
+                managed.idle.set()
+            if (RECYCLE_AFTER_RENDERS and managed.renders >= RECYCLE_AFTER_RENDERS
+                    and not managed.draining and not self._closing):
+                asyncio.create_task(self._replace(managed, reason="renders"))
+
+    def browsers(self) -> List[ManagedBrowser]:
+        """Current (non-retired) browser per slot."""
+        return [m for m in self._slots if m is not None]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "browsers": [m.stats() for m in self.browsers()],
+            "recycled": self.recycled,
+            "crashes": self.crashes,
+        }
@@ -0,0 +1,254 @@
+# lib/http_cache.py
+"""
+Shared on-disk cache for page subresources (scripts, stylesheets, fonts, images).
+
+Every browser context starts with an empty HTTP cache, so each render of a
+JS-heavy site re-downloads the same bundles. Contexts route cacheable GETs
+through this cache: hits are fulfilled from disk, misses are fetched once,
+stored with a TTL (Cache-Control max-age, else CACHE_DEFAULT_TTL_SEC) and
+evicted least-recently-used once the cache exceeds CACHE_MAX_MB.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+
+from playwright.async_api import Route
+
+from lib.metrics import CallbackMetric, Counter
+
+# Cache directory; empty disables the cache
+CACHE_DIR = os.environ.get("RENDERER_CACHE_DIR", "/tmp/renderer-cache")
+CACHE_MAX_MB = int(os.environ.get("RENDERER_CACHE_MAX_MB", "512"))
+# TTL for responses without max-age, and upper bound for those with one
+CACHE_DEFAULT_TTL_SEC = int(os.environ.get("RENDERER_CACHE_DEFAULT_TTL_SEC", "3600"))
+CACHE_MAX_TTL_SEC = int(os.environ.get("RENDERER_CACHE_MAX_TTL_SEC", "86400"))
+# Larger responses are passed through uncached
+CACHE_MAX_ENTRY_MB = float(os.environ.get("RENDERER_CACHE_MAX_ENTRY_MB", "10"))
+CACHE_RESOURCE_TYPES = set(
+    os.environ.get("RENDERER_CACHE_TYPES", "script,stylesheet,font,image").split(",")
+)
+
+CACHE_REQUESTS = Counter("renderer_cache_requests_total",
+                         "Subresource cache lookups by result (hit, miss, uncacheable, error)")
+CACHE_BYTES = Counter("renderer_cache_bytes_total", "Subresource bytes served from cache (hit) or network (miss)")
+
+# hop-by-hop / encoding headers that must not be replayed with a decoded body
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "set-cookie"}
+_MAX_AGE_RE = re.compile(r"(?:s-maxage|max-age)\s*=\s*(\d+)")
+
+
+def _ttl(headers: Dict[str, str]) -> Optional[int]:
+    """TTL in seconds for a response, or None if it must not be cached."""
+    cc = headers.get("cache-control", "").lower()
+    if "no-store" in cc or "private" in cc or "no-cache" in cc or "set-cookie" in headers:
+        return None
+    ages = [int(a) for a in _MAX_AGE_RE.findall(cc)]
+    if ages:
+        ttl = max(ages)
+        return min(ttl, CACHE_MAX_TTL_SEC) if ttl > 0 else None
+    return CACHE_DEFAULT_TTL_SEC
+
+
+class DiskCache:
+    """
+    Size-capped LRU of responses on disk, one <key>.body + <key>.json pair per entry.
+    The index (size, expiry) lives in memory and is rebuilt from disk at startup;
+    file reads and writes run in worker threads.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._index: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        base = os.path.join(self.directory, key[:2], key)
+        return base + ".body", base + ".json"
+
+    def load(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []
+        now = time.time()
+        for root, _dirs, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                key = name[:-5]
+                try:
+                    with open(os.path.join(root, name), "r") as f:
+                        meta = json.load(f)
+                    body_path, _ = self._paths(key)
+                    size = os.path.getsize(body_path)
+                except (OSError, ValueError):
+                    self._remove_files(key)
+                    continue
+                if meta.get("expires", 0) <= now:
+                    self._remove_files(key)
+                    continue
+                entries.append((meta.get("stored", 0), key, size, meta["expires"]))
+        # oldest first, so eviction order survives restarts
+        for _, key, size, expires in sorted(entries):
+            self._index[key] = (size, expires)
+            self.size += size
+        self._evict()
+
+    def _remove_files(self, key: str) -> None:
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _drop(self, key: str) -> None:
+        size, _ = self._index.pop(key, (0, 0))
+        self.size -= size
+        self._remove_files(key)
+
+    def _evict(self) -> None:
+        while self.size > self.max_bytes and self._index:
+            key = next(iter(self._index))
+            self._drop(key)
+
+    def _read(self, key: str) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        body_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                return meta, f.read()
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, key: str, meta: Dict[str, Any], body: bytes) -> None:
+        body_path, meta_path = self._paths(key)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        # write-then-rename so concurrent readers never see partial files
+        for path, data, mode in ((body_path, body, "wb"), (meta_path, json.dumps(meta), "w")):
+            tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp, mode) as f:
+                f.write(data)
+            os.replace(tmp, path)
+
+    async def get(self, key: str) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        entry = self._index.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.time():
+            self._drop(key)
+            return None
+        found = await asyncio.to_thread(self._read, key)
+        if found is None:
+            self._drop(key)
+            return None
+        self._index.move_to_end(key)
+        return found
+
+    async def put(self, key: str, meta: Dict[str, Any], body: bytes) -> None:
+        await asyncio.to_thread(self._write, key, meta, body)
+        if key in self._index:
+            self.size -= self._index.pop(key)[0]
+        self._index[key] = (len(body), meta["expires"])
+        self.size += len(body)
+        self._evict()
+
+
+_cache: Optional[DiskCache] = None
+
+
+def init_cache() -> None:
+    """Open (and index) the disk cache; no-op when RENDERER_CACHE_DIR is empty."""
+    global _cache
+    if not CACHE_DIR or _cache is not None:
+        return
+    cache = DiskCache(CACHE_DIR, CACHE_MAX_MB * 1024 * 1024)
+    try:
+        cache.load()
+    except OSError as e:
+        print(f"[cache:error] cannot use {CACHE_DIR} -> {e}", flush=True)
+        return
+    _cache = cache
+    print(f"[cache:init] dir={CACHE_DIR} entries={len(cache)} "
+          f"size_mb={cache.size // (1024 * 1024)} max_mb={CACHE_MAX_MB}", flush=True)
+
+
+def _key(route: Route) -> str:
+    request = route.request
+    # Accept varies image formats (webp/avif) and is stable per browser build
+    accept = request.headers.get("accept", "")
+    return hashlib.sha256(f"{request.url}\n{accept}".encode()).hexdigest()
+
+
+async def _handle(route: Route) -> None:
+    request = route.request
+    if request.method != "GET" or request.resource_type not in CACHE_RESOURCE_TYPES:
+        await route.continue_()
+        return
+
+    key = _key(route)
+    try:
+        cached = await _cache.get(key)
+    except Exception:
+        cached = None
+    if cached is not None:
+        meta, body = cached
+        CACHE_REQUESTS.inc(result="hit", type=request.resource_type)
+        CACHE_BYTES.inc(len(body), result="hit")
+        await route.fulfill(status=meta["status"], headers=meta["headers"], body=body)
+        return
+
+    try:
+        response = await route.fetch()
+        body = await response.body()
+    except Exception:
+        # let the browser try on its own (and report the failure to the page)
+        CACHE_REQUESTS.inc(result="error", type=request.resource_type)
+        await route.continue_()
+        return
+
+    headers = {k: v for k, v in response.headers.items() if k.lower() not in _DROP_HEADERS}
+    ttl = _ttl({k.lower(): v for k, v in response.headers.items()}) if response.status == 200 else None
+    if ttl is not None and len(body) <= CACHE_MAX_ENTRY_MB * 1024 * 1024:
+        now = time.time()
+        meta = {"url": request.url, "status": response.status, "headers": headers,
+                "stored": now, "expires": now + ttl}
+        try:
+            await _cache.put(key, meta, body)
+            CACHE_REQUESTS.inc(result="miss", type=request.resource_type)
+        except OSError as e:
+            CACHE_REQUESTS.inc(result="error", type=request.resource_type)
+            print(f"[cache:write:error] {request.url} -> {e}", flush=True)
+    else:
+        CACHE_REQUESTS.inc(result="uncacheable", type=request.resource_type)
+    CACHE_BYTES.inc(len(body), result="miss")
+    await route.fulfill(status=response.status, headers=headers, body=body)
+
+
+async def _safe_handle(route: Route) -> None:
+    try:
+        await _handle(route)
+    except Exception:
+        # context closed mid-request (render finished or hit its deadline)
+        pass
+
+
+async def attach(ctx) -> None:
+    """Route a browser context's subresource requests through the shared cache."""
+    if _cache is None:
+        return
+    await ctx.route("**/*", _safe_handle)
+
+
+CallbackMetric("renderer_cache_size_bytes", "Bytes stored in the subresource cache",
+               lambda: [({}, _cache.size if _cache else 0)])
+CallbackMetric("renderer_cache_entries", "Entries in the subresource cache",
+               lambda: [({}, len(_cache) if _cache else 0)])
@@ -0,0 +1,155 @@
+# lib/metrics.py
+"""
+Minimal in-process metrics with Prometheus text exposition.
+
+Counters and histograms are updated from the event loop; callback metrics
+read live state (queue depth, browser RSS, ...) at scrape time.
+"""
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+_REGISTRY: List["_Metric"] = []
+
+# seconds; covers sub-10ms JS evaluations up to the 120s goto timeout
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _fmt_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for k, v in labels.items():
+        v = str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        _REGISTRY.append(self)
+
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        return []
+
+    def expose(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{_fmt_labels(labels)} {value}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self._values: Dict[Tuple[Tuple[str, str], ...], float] = {}
+
+    def inc(self, value: float = 1, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        self._values[key] = self._values.get(key, 0) + value
+
+    def samples(self):
+        for key, value in self._values.items():
+            yield self.name, dict(key), value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[Tuple[str, str], ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[len(self.buckets)] += 1
+        series[-1] += value
+
+    def samples(self):
+        for key, series in self._series.items():
+            labels = dict(key)
+            for i, bound in enumerate(self.buckets):
+                yield f"{self.name}_bucket", {**labels, "le": repr(float(bound))}, series[i]
+            yield f"{self.name}_bucket", {**labels, "le": "+Inf"}, series[len(self.buckets)]
+            yield f"{self.name}_count", labels, series[len(self.buckets)]
+            yield f"{self.name}_sum", labels, series[-1]
+
+
+class CallbackMetric(_Metric):
+    """Gauge/counter whose samples are produced by `fn` at scrape time."""
+
+    def __init__(self, name: str, help_text: str, fn: Callable[[], Iterable[Tuple[Dict[str, str], float]]],
+                 kind: str = "gauge"):
+        super().__init__(name, help_text)
+        self.kind = kind
+        self._fn = fn
+
+    def samples(self):
+        try:
+            for labels, value in self._fn():
+                yield self.name, labels, value
+        except Exception as e:
+            print(f"[metrics:callback:error] {self.name} -> {e}", flush=True)
+
+
+def render_prometheus() -> str:
+    return "\n".join(m.expose() for m in _REGISTRY) + "\n"
+
+
+# ---------------------------------------------------------------------------
+# Renderer metrics
+# ---------------------------------------------------------------------------
+STAGE_SECONDS = Histogram(
+    "renderer_stage_seconds",
+    "Time spent per render stage (queue, context, navigate, settle, extract, find_rects, screenshot, upload)",
+)
+RENDER_SECONDS = Histogram("renderer_render_seconds", "End-to-end render time by endpoint and outcome")
+ERRORS = Counter("renderer_errors_total", "Render errors by endpoint and type")
+TEXT_BYTES = Counter(
+    "renderer_text_mode_bytes_total",
+    "Text-mode renders: bytes of text returned (kind=text) vs serialized DOM avoided (kind=dom)",
+)
+
+
+class StageTimer:
+    """Accumulates per-stage durations for one render and feeds STAGE_SECONDS."""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.stages: Dict[str, float] = {}
+
+    def record(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        STAGE_SECONDS.observe(seconds, endpoint=self.endpoint, stage=stage)
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def as_ms(self) -> Dict[str, int]:
+        return {k: int(v * 1000) for k, v in self.stages.items()}
+
+
+def observe_stage(endpoint: str, stage: str, seconds: float, stages_ms: Optional[Dict[str, int]] = None) -> None:
+    """Record a stage measured outside a StageTimer (e.g. the MinIO upload in the handler)."""
+    STAGE_SECONDS.observe(seconds, endpoint=endpoint, stage=stage)
+    if stages_ms is not None:
+        stages_ms[stage] = stages_ms.get(stage, 0) + int(seconds * 1000)
@@ -2,29 +2,67 @@
 import asyncio
 import os
 import time
-import io
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Callable, Awaitable
 
-from playwright.async_api import async_playwright, Browser, Page
-from minio import Minio
-from minio.error import S3Error
+from playwright.async_api import async_playwright, Page
+
+from lib import http_cache
+from lib.browser_pool import BrowserPool
+from lib.scheduler import RenderScheduler, PRIORITY_HTML, PRIORITY_SCREENSHOT, PRIORITY_NAMES
+from lib.metrics import StageTimer, CallbackMetric, RENDER_SECONDS, ERRORS, TEXT_BYTES
 
 # Globals
-_browser: Optional[Browser] = None
+_pool: Optional[BrowserPool] = None
 _playwright = None
 # concurrency limit (tune with env var)
 MAX_CONCURRENCY = int(os.environ.get("RENDERER_CONCURRENCY", "4"))
-_semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
-
-# MinIO env config
-MINIO_ENDPOINT = os.environ.get("MINIO_ENDPOINT")
-MINIO_ACCESS_KEY = os.environ.get("MINIO_ACCESS_KEY")
-MINIO_SECRET_KEY = os.environ.get("MINIO_SECRET_KEY")
-MINIO_BUCKET = os.environ.get("MINIO_BUCKET", "screenshots")
+_scheduler = RenderScheduler(MAX_CONCURRENCY)
+_active_contexts = 0
 
 # Allow skipping stealth or other advanced behaviours
 STEALTH = os.environ.get("RENDERER_STEALTH", "false").lower() in ("1", "true", "yes")
 
+# Readiness strategy: navigate to DOMContentLoaded, then wait for DOM/network
+# quiescence (or stable text) instead of the full load event plus a fixed sleep.
+GOTO_TIMEOUT_MS = int(os.environ.get("RENDERER_GOTO_TIMEOUT", "120000"))
+WAIT_UNTIL = os.environ.get("RENDERER_WAIT_UNTIL", "domcontentloaded")
+# hard cap for one render (navigation + settle + extraction), measured after admission
+RENDER_DEADLINE_MS = int(os.environ.get("RENDERER_DEADLINE_MS", "45000"))
+# max time spent waiting for the page to settle after navigation
+SETTLE_MAX_MS = int(os.environ.get("RENDERER_SETTLE_MAX_MS", "5000"))
+# no DOM mutations for this long (with network idle) => page is quiescent
+QUIET_MS = int(os.environ.get("RENDERER_QUIET_MS", "500"))
+# visible text length unchanged for this long => early exit even if network is busy
+TEXT_STABLE_MS = int(os.environ.get("RENDERER_TEXT_STABLE_MS", "1000"))
+TEXT_STABLE_MIN_CHARS = int(os.environ.get("RENDERER_TEXT_STABLE_MIN_CHARS", "200"))
+# in-flight requests tolerated when judging network idle (long-polls, analytics beacons)
+IDLE_INFLIGHT = int(os.environ.get("RENDERER_IDLE_INFLIGHT", "2"))
+POLL_MS = int(os.environ.get("RENDERER_POLL_MS", "150"))
+
+# Text-mode limits: max characters of text and max image/link entries returned
+TEXT_MAX_CHARS = int(os.environ.get("RENDERER_TEXT_MAX_CHARS", "2000000"))
+TEXT_MAX_ITEMS = int(os.environ.get("RENDERER_TEXT_MAX_ITEMS", "2000"))
+
+# Installed before any page script runs: records the time of the last DOM mutation.
+_QUIESCENCE_INIT_JS = """
+(() => {
+  window.__atsLastMutation = Date.now();
+  try {
+    new MutationObserver(() => { window.__atsLastMutation = Date.now(); })
+      .observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+  } catch (err) {
+    // observer unavailable; readiness falls back to text stability / cap
+  }
+})();
+"""
+
+_READINESS_PROBE_JS = """
+() => ({
+  idle: Date.now() - (window.__atsLastMutation || 0),
+  text: document.body ? document.body.innerText.length : 0,
+})
+"""
+
 # Small JS used to find text matches in page and return bounding rects
 # Modified to accept a single array argument [keyword, maxMatches] for Playwright evaluate()
 _FIND_RECTS_JS = """
@@ -63,161 +101,442 @@ _FIND_RECTS_JS = """
 })
 """
 
+# Text-mode extraction, done in the page instead of shipping page.content():
+# text, image sources and links. The text is built exactly as the analyzer's
+# extract_text() builds it from HTML: for every element under body that is not
+# script/style/nav/footer (in document order), its whole subtree text - text
+# nodes stripped, empty ones dropped, joined by a space - kept when longer than
+# 3 characters, at most 20000 parts. Keyword matching is therefore unchanged,
+# including matches that span inline tags.
+_EXTRACT_TEXT_JS = """
+(function(args) {
+  const maxChars = args[0];
+  const maxItems = args[1];
+  const MAX_PARTS = 20000;
+  const EXCLUDED = new Set(['SCRIPT', 'STYLE', 'NAV', 'FOOTER']);
+  // subtree text of every element, bottom-up in one pass
+  const subtree = new Map();
+  const textOf = (el) => {
+    const pieces = [];
+    for (const child of el.childNodes) {
+      if (child.nodeType === Node.TEXT_NODE) {
+        const t = child.nodeValue.trim();
+        if (t) pieces.push(t);
+      } else if (child.nodeType === Node.ELEMENT_NODE) {
+        const t = textOf(child);
+        if (t) pieces.push(t);
+      }
+    }
+    const text = pieces.join(' ');
+    subtree.set(el, text);
+    return text;
+  };
+  const parts = [];
+  let total = 0;
+  if (document.body) {
+    textOf(document.body);
+    for (const el of document.body.querySelectorAll('*')) {
+      if (EXCLUDED.has(el.tagName)) continue;
+      const t = subtree.get(el);
+      if (t && t.length > 3) {
+        parts.push(t);
+        total += t.length + 1;
+        if (parts.length >= MAX_PARTS || total >= maxChars) break;
+      }
+    }
+  }
+  const uniq = (xs) => Array.from(new Set(xs.filter(Boolean))).slice(0, maxItems);
+  return {
+    text: parts.join(' ').slice(0, maxChars),
+    images: uniq(Array.from(document.images).map(i => i.currentSrc || i.src)),
+    links: uniq(Array.from(document.links).map(a => a.href)),
+    // UTF-8 bytes, as page.content() would have shipped them
+    dom_bytes: document.documentElement
+      ? new TextEncoder().encode(document.documentElement.outerHTML).length : 0,
+  };
+})
+"""
+
+# Multi-keyword rect search with visibility checks, used instead of a screenshot
+# when the caller only needs to know whether a keyword is visibly rendered.
+# A match counts as visible when its element passes checkVisibility (display,
+# visibility, opacity of it and its ancestors), its box is at least MIN_PX in
+# both dimensions, its font is readable and it is not pushed off the page.
+# Boxes are in document coordinates (match a full-page screenshot).
+_VISIBILITY_JS = """
+(function(args) {
+  const keywords = args[0];
+  const maxMatches = args[1];
+  const MIN_PX = 2, MIN_FONT_PX = 6;
+  const sx = window.scrollX, sy = window.scrollY;
+  const docW = Math.max(document.documentElement.scrollWidth, window.innerWidth);
+  const styleOk = new WeakMap();
+  const elementOk = (el) => {
+    let ok = styleOk.get(el);
+    if (ok === undefined) {
+      const cs = getComputedStyle(el);
+      ok = (!el.checkVisibility || el.checkVisibility({checkOpacity: true, checkVisibilityCSS: true}))
+        && parseFloat(cs.fontSize) >= MIN_FONT_PX
+        && cs.visibility !== 'hidden' && parseFloat(cs.opacity) > 0.05;
+      styleOk.set(el, ok);
+    }
+    return ok;
+  };
+  const out = {};
+  for (const keyword of keywords) {
+    const res = {visible: false, matches: 0, visible_matches: 0, boxes: []};
+    out[keyword] = res;
+    if (!keyword || !document.body) continue;
+    const kw = keyword.replace(/[.*+?^${}()|[\\]\\\\]/g, '\\\\$&');
+    const re = new RegExp(kw, 'gi');
+    const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT, null, false);
+    let node;
+    while ((node = walker.nextNode())) {
+      const text = node.nodeValue;
+      if (!text) continue;
+      re.lastIndex = 0;
+      let match;
+      while ((match = re.exec(text)) !== null) {
+        res.matches += 1;
+        const el = node.parentElement;
+        if (!el || !elementOk(el)) continue;
+        try {
+          const range = document.createRange();
+          range.setStart(node, match.index);
+          range.setEnd(node, match.index + match[0].length);
+          for (const r of range.getClientRects()) {
+            const x = r.x + sx, y = r.y + sy;
+            if (r.width < MIN_PX || r.height < MIN_PX) continue;
+            if (x + r.width <= 0 || y + r.height <= 0 || x >= docW) continue;
+            res.visible = true;
+            res.visible_matches += 1;
+            if (res.boxes.length < maxMatches) {
+              res.boxes.push({x: x, y: y, width: r.width, height: r.height});
+            }
+            break;
+          }
+        } catch (err) {
+          // ignore ranges we can't read
+        }
+      }
+    }
+  }
+  return out;
+})
+"""
+
+class _NetworkTracker:
+    """Counts in-flight requests for one page."""
+
+    def __init__(self, page: Page):
+        self.inflight = 0
+        page.on("request", self._started)
+        page.on("requestfinished", self._done)
+        page.on("requestfailed", self._done)
+
+    def _started(self, _request) -> None:
+        self.inflight += 1
+
+    def _done(self, _request) -> None:
+        self.inflight = max(0, self.inflight - 1)
+
+
+async def _new_page(ctx) -> tuple:
+    page: Page = await ctx.new_page()
+    await page.add_init_script(_QUIESCENCE_INIT_JS)
+    return page, _NetworkTracker(page)
+
+
+async def _wait_for_ready(page: Page, tracker: _NetworkTracker, deadline: float) -> Dict[str, Any]:
+    """
+    Wait until the page settles and report which condition ended the wait:
+    "quiescent" (no DOM mutations for QUIET_MS and network idle), "text_stable"
+    (visible text length unchanged for TEXT_STABLE_MS), "settle_cap" or "deadline".
+    """
+    started = time.monotonic()
+    cap = min(started + SETTLE_MAX_MS / 1000, deadline)
+    last_len = -1
+    stable_since = started
+
+    while True:
+        now = time.monotonic()
+        if now >= deadline:
+            reason = "deadline"
+            break
+        if now >= cap:
+            reason = "settle_cap"
+            break
+
+        try:
+            probe = await page.evaluate(_READINESS_PROBE_JS)
+        except Exception:
+            # execution context destroyed by a client-side redirect; keep waiting
+            probe = {"idle": 0, "text": -1}
+
+        text_len = probe.get("text", 0)
+        if text_len != last_len:
+            last_len = text_len
+            stable_since = now
+
+        if probe.get("idle", 0) >= QUIET_MS and tracker.inflight <= IDLE_INFLIGHT:
+            reason = "quiescent"
+            break
+        if text_len >= TEXT_STABLE_MIN_CHARS and (now - stable_since) * 1000 >= TEXT_STABLE_MS:
+            reason = "text_stable"
+            break
+
+        await asyncio.sleep(POLL_MS / 1000)
+
+    return {"reason": reason, "settle_ms": int((time.monotonic() - started) * 1000)}
+
+
+async def _navigate(page: Page, tracker: _NetworkTracker, url: str, deadline: float,
+                    timer: StageTimer) -> Dict[str, Any]:
+    """Navigate within the render deadline and wait for readiness."""
+    remaining_ms = max(1, int((deadline - time.monotonic()) * 1000))
+    with timer.stage("navigate"):
+        await page.goto(url, wait_until=WAIT_UNTIL, timeout=min(GOTO_TIMEOUT_MS, remaining_ms))
+    with timer.stage("settle"):
+        return await _wait_for_ready(page, tracker, deadline)
+
+
 async def init_browser() -> None:
     """
-    Initialize Playwright browser singleton.
+    Start Playwright and the supervised browser pool (singleton).
     """
-    global _browser, _playwright
-    if _browser is not None:
+    global _pool, _playwright
+    if _pool is not None:
         return
 
+    http_cache.init_cache()
     _playwright = await async_playwright().start()
-    # Use Chromium by default
-    _browser = await _playwright.chromium.launch(headless=True, args=["--no-sandbox", "--disable-setuid-sandbox"])
-    # Create bucket in MinIO if needed (lazy)
+    # Use Chromium by default; the pool recycles and relaunches browsers as needed
+    pool = BrowserPool()
+    await pool.start(_playwright)
+    _pool = pool
     return
 
 async def shutdown_browser() -> None:
-    global _browser, _playwright
+    global _pool, _playwright
     try:
-        if _browser:
-            await _browser.close()
-            _browser = None
+        if _pool:
+            await _pool.stop()
+            _pool = None
         if _playwright:
             await _playwright.stop()
             _playwright = None
     except Exception:
         pass
 
-async def upload_to_minio(png_bytes: bytes, object_name: str) -> Dict[str, Any]:
-    """
-    Uploads bytes to MinIO. Returns dictionary with bucket and object info.
-    If MINIO_ENDPOINT is not set, returns empty dict.
-    """
-    if not MINIO_ENDPOINT:
-        return {"ok": False, "error": "minio not configured"}
-
-    client = Minio(
-        MINIO_ENDPOINT,
-        access_key=MINIO_ACCESS_KEY,
-        secret_key=MINIO_SECRET_KEY,
-        secure=MINIO_ENDPOINT.startswith("https")
-    )
-
-    # ensure bucket exists
-    try:
-        if not client.bucket_exists(MINIO_BUCKET):
-            client.make_bucket(MINIO_BUCKET)
-    except Exception as e:
-        return {"ok": False, "error": f"minio bucket error: {e}"}
+def browser_stats() -> Dict[str, Any]:
+    """Per-browser renders, in-flight pages, RSS and recycle/crash counters."""
+    if _pool is None:
+        return {"browsers": [], "recycled": 0, "crashes": 0}
+    return _pool.stats()
 
-    try:
-        client.put_object(MINIO_BUCKET, object_name, io.BytesIO(png_bytes), length=len(png_bytes))
-        url = f"{MINIO_ENDPOINT.rstrip('/')}/{MINIO_BUCKET}/{object_name}"
-        return {"ok": True, "bucket": MINIO_BUCKET, "object": object_name, "url": url}
-    except S3Error as e:
-        return {"ok": False, "error": str(e)}
-    except Exception as e:
-        return {"ok": False, "error": str(e)}
+def scheduler_stats() -> Dict[str, Any]:
+    """Render queue depth per priority, wait times and shed/expired/cancelled counts."""
+    return _scheduler.stats()
 
+def _render_deadline(deadline: Optional[float]) -> float:
+    """Hard deadline for one render: RENDER_DEADLINE_MS, tightened by the caller's deadline."""
+    own = time.monotonic() + RENDER_DEADLINE_MS / 1000
+    return own if deadline is None else min(own, deadline)
 
-async def render_html(url: str) -> Dict[str, Any]:
+async def _run_page(endpoint: str, priority: int, url: str, deadline: Optional[float],
+                    work: Callable[[Page, StageTimer], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
     """
-    Render the page at URL and return its HTML content (no screenshot).
-    Used for JS-heavy pages where initial fetch doesn't have full content.
+    Shared render path: admit through the scheduler, borrow a browser, open a
+    context, navigate and settle, then run `work(page, timer)` for the
+    endpoint-specific payload. Every stage is timed into `stages`.
     """
+    global _active_contexts
     await init_browser()
     start = time.time()
+    timer = StageTimer(endpoint)
+    queued = time.perf_counter()
 
-    async with _semaphore:
-        if _browser is None:
+    async with _scheduler.slot(priority, deadline), _pool.acquire() as browser:
+        timer.record("queue", time.perf_counter() - queued)
+        if browser is None:
+            ERRORS.inc(endpoint=endpoint, type="no_browser")
             return {"ok": False, "error": "browser not initialized"}
 
+        deadline = _render_deadline(deadline)
         # create context and page
-        ctx = await _browser.new_context(viewport={"width": 1280, "height": 900}, locale="en-US")
-        page: Page = await ctx.new_page()
+        with timer.stage("context"):
+            ctx = await browser.new_context(viewport={"width": 1280, "height": 900}, locale="en-US")
+            # serve repeated scripts/styles/fonts/images from the shared disk cache
+            await http_cache.attach(ctx)
+        _active_contexts += 1
         try:
-            goto_timeout = int(os.environ.get("RENDERER_GOTO_TIMEOUT", "120000"))
-            wait_until = os.environ.get("RENDERER_WAIT_UNTIL", "load")
-            await page.goto(url, wait_until=wait_until, timeout=goto_timeout)
-            await asyncio.sleep(0.5)
-
-            # get rendered HTML content
-            html_content = await page.content()
-            elapsed = int((time.time() - start) * 1000)
-
-            return {
-                "ok": True,
-                "url": url,
-                "content": html_content,
-                "time_ms": elapsed,
-            }
+            async def _render() -> Dict[str, Any]:
+                with timer.stage("context"):
+                    page, tracker = await _new_page(ctx)
+                # navigate and wait for DOM/network quiescence (bounded by the render deadline)
+                ready = await _navigate(page, tracker, url, deadline, timer)
+                payload = await work(page, timer)
+                return {
+                    "ok": True,
+                    "url": url,
+                    **payload,
+                    "ready": ready,
+                    "time_ms": int((time.time() - start) * 1000),
+                    "stages": timer.as_ms(),
+                }
+
+            result = await asyncio.wait_for(_render(), timeout=max(0.0, deadline - time.monotonic()))
+            RENDER_SECONDS.observe(time.time() - start, endpoint=endpoint, outcome="ok")
+            return result
+        except asyncio.TimeoutError:
+            ERRORS.inc(endpoint=endpoint, type="deadline")
+            RENDER_SECONDS.observe(time.time() - start, endpoint=endpoint, outcome="error")
+            print(f"[renderer:deadline] {endpoint} {url} exceeded its deadline", flush=True)
+            return {"ok": False, "error": "render deadline exceeded", "stages": timer.as_ms()}
         except Exception as e:
-            print(f"[renderer:error] render_html {url} -> {e}", flush=True)
-            return {"ok": False, "error": str(e)}
+            ERRORS.inc(endpoint=endpoint, type=type(e).__name__)
+            RENDER_SECONDS.observe(time.time() - start, endpoint=endpoint, outcome="error")
+            print(f"[renderer:error] {endpoint} {url} -> {e}", flush=True)
+            return {"ok": False, "error": str(e), "stages": timer.as_ms()}
         finally:
+            _active_contexts -= 1
             try:
                 await ctx.close()
             except Exception:
                 pass
 
 
-async def render_and_screenshot(url: str, keyword: Optional[str], max_matches: int = 5) -> Dict[str, Any]:
+async def render_html(url: str, deadline: Optional[float] = None) -> Dict[str, Any]:
     """
-    Render the page at URL, find bounding rects for keyword, return screenshot bytes and boxes.
+    Render the page at URL and return its HTML content (no screenshot).
+    Used for JS-heavy pages where initial fetch doesn't have full content.
+    Scheduled ahead of screenshots; `deadline` is the caller's time.monotonic() deadline.
+    Raises Overloaded / DeadlineExceeded when the request cannot start in time.
     """
-    await init_browser()
-    start = time.time()
+    async def _extract(page: Page, timer: StageTimer) -> Dict[str, Any]:
+        # get rendered HTML content
+        with timer.stage("extract"):
+            return {"content": await page.content()}
 
-    async with _semaphore:
-        if _browser is None:
-            return {"ok": False, "error": "browser not initialized"}
+    return await _run_page("render", PRIORITY_HTML, url, deadline, _extract)
 
-        # create context and page
-        ctx = await _browser.new_context(viewport={"width": 1280, "height": 900}, locale="en-US")
-        page: Page = await ctx.new_page()
-        try:
-            # navigate
-            # Configurable timeout (default 120 seconds for slow-loading pages)
-            goto_timeout = int(os.environ.get("RENDERER_GOTO_TIMEOUT", "120000"))
-            # Use "load" instead of "networkidle" for pages with continuous network activity
-            # "load" waits for the load event, which is more reliable for slow pages
-            wait_until = os.environ.get("RENDERER_WAIT_UNTIL", "load")
-            await page.goto(url, wait_until=wait_until, timeout=goto_timeout)
-            # small delay to allow dynamic content to settle (tweak if needed)
-            await asyncio.sleep(0.5)  # Increased from 0.3s to 0.5s for better content rendering
-
-            # find rects for keyword
-            boxes = []
-            if keyword:
-                try:
-                    # Playwright evaluate: pass arguments as a list
-                    # The JS function receives the list as a single argument
-                    boxes = await page.evaluate(
+
+async def render_text(url: str, deadline: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Render the page at URL and return its visible text, image sources and links
+    extracted in the browser, so callers can skip HTML parsing entirely.
+    `dom_bytes` is the size of the serialized DOM that render_html would have returned.
+    Raises Overloaded / DeadlineExceeded when the request cannot start in time.
+    """
+    async def _extract(page: Page, timer: StageTimer) -> Dict[str, Any]:
+        with timer.stage("extract"):
+            data = await page.evaluate(_EXTRACT_TEXT_JS, [TEXT_MAX_CHARS, TEXT_MAX_ITEMS])
+        text = data.get("text") or ""
+        TEXT_BYTES.inc(len(text.encode("utf-8")), kind="text")
+        TEXT_BYTES.inc(data.get("dom_bytes", 0), kind="dom")
+        return {
+            "text": text,
+            "images": data.get("images") or [],
+            "links": data.get("links") or [],
+            "dom_bytes": data.get("dom_bytes", 0),
+        }
+
+    return await _run_page("render", PRIORITY_HTML, url, deadline, _extract)
+
+
+async def check_visibility(url: str, keywords: List[str], max_matches: int = 5,
+                           deadline: Optional[float] = None,
+                           screenshot_keywords: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Render the page at URL and report, per keyword, whether it is visibly rendered
+    (not hidden/transparent/zero-size/off-page text) with up to max_matches boxes.
+    With `screenshot_keywords`, a full-page screenshot is taken on the same page
+    when one of them is visible or not found as literal text (the caller cannot
+    rule it out), so a capture needs no second render; "captured_keywords" lists
+    them. Raises Overloaded / DeadlineExceeded when the request cannot start in time.
+    """
+    async def _check(page: Page, timer: StageTimer) -> Dict[str, Any]:
+        with timer.stage("find_rects"):
+            found = await page.evaluate(_VISIBILITY_JS, [keywords, max_matches])
+        result = {"keywords": found, "visible": any(v.get("visible") for v in found.values())}
+        wanted = [k for k in (screenshot_keywords or []) if k in found
+                  and (found[k].get("visible") or not found[k].get("matches"))]
+        if wanted:
+            with timer.stage("screenshot"):
+                result["screenshot"] = await page.screenshot(full_page=True)
+            result["captured_keywords"] = wanted
+            result["boxes_by_keyword"] = {k: found[k].get("boxes", []) for k in wanted}
+        return result
+
+    return await _run_page("visibility", PRIORITY_SCREENSHOT, url, deadline, _check)
+
+
+async def render_and_screenshot(url: str, keyword: Optional[str], max_matches: int = 5,
+                                deadline: Optional[float] = None,
+                                keywords: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Render the page at URL, find bounding rects for keyword, return screenshot bytes and boxes.
+    With `keywords`, rects are found for each of them and one screenshot serves them all
+    (`boxes_by_keyword`); `boxes` then holds every box.
+    Raises Overloaded / DeadlineExceeded when the request cannot start in time.
+    """
+    wanted = [k for k in (keywords or [keyword]) if k]
+
+    async def _capture(page: Page, timer: StageTimer) -> Dict[str, Any]:
+        # find rects for each keyword
+        boxes_by_keyword: Dict[str, List[Dict[str, float]]] = {}
+        for kw in wanted:
+            try:
+                # Playwright evaluate: pass arguments as a list
+                # The JS function receives the list as a single argument
+                with timer.stage("find_rects"):
+                    boxes_by_keyword[kw] = await page.evaluate(
                         _FIND_RECTS_JS,
-                        [keyword, max_matches]
+                        [kw, max_matches]
                     )
-                except Exception as e:
-                    print(f"[renderer:boxes:error] {url} -> {e}", flush=True)
+            except Exception as e:
+                boxes_by_keyword[kw] = []
+                ERRORS.inc(endpoint="screenshot", type="find_rects")
+                print(f"[renderer:boxes:error] {url} -> {e}", flush=True)
+        boxes = [b for kw in wanted for b in boxes_by_keyword.get(kw, [])]
 
-            # take full page screenshot (png bytes)
+        # take full page screenshot (png bytes)
+        with timer.stage("screenshot"):
             screenshot_bytes = await page.screenshot(full_page=True)
-            elapsed = int((time.time() - start) * 1000)
-
-            return {
-                "ok": True,
-                "url": url,
-                "keyword": keyword,
-                "matches": len(boxes),
-                "boxes": boxes,
-                "time_ms": elapsed,
-                "screenshot": screenshot_bytes,
-            }
-        except Exception as e:
-            print(f"[renderer:error] render_and_screenshot {url} -> {e}", flush=True)
-            return {"ok": False, "error": str(e)}
-        finally:
-            try:
-                await ctx.close()
-            except Exception:
-                pass
+
+        result = {
+            "keyword": keyword,
+            "matches": len(boxes),
+            "boxes": boxes,
+            "screenshot": screenshot_bytes,
+        }
+        if keywords:
+            result["keywords"] = wanted
+            result["boxes_by_keyword"] = boxes_by_keyword
+        return result
+
+    return await _run_page("screenshot", PRIORITY_SCREENSHOT, url, deadline, _capture)
+
+
+# ---------------------------------------------------------------------------
+# Live-state metrics (read at scrape time)
+# ---------------------------------------------------------------------------
+CallbackMetric("renderer_slots_in_use", "Render slots currently held",
+               lambda: [({}, _scheduler.active)])
+CallbackMetric("renderer_slots_total", "Configured render concurrency",
+               lambda: [({}, _scheduler.concurrency)])
+CallbackMetric("renderer_queue_depth", "Renders waiting for a slot by priority",
+               lambda: [({"priority": name}, _scheduler.queue_depth(p)) for p, name in PRIORITY_NAMES.items()])
+CallbackMetric("renderer_queue_outcomes_total", "Scheduler admissions and rejections",
+               lambda: [({"outcome": k}, getattr(_scheduler, k)) for k in ("admitted", "shed", "expired", "cancelled")],
+               kind="counter")
+CallbackMetric("renderer_active_contexts", "Open browser contexts",
+               lambda: [({}, _active_contexts)])
+CallbackMetric("renderer_browser_rss_bytes", "Process-tree RSS per browser slot",
+               lambda: [({"slot": str(m.slot)}, m.rss_bytes) for m in (_pool.browsers() if _pool else [])])
+CallbackMetric("renderer_browser_inflight", "In-flight renders per browser slot",
+               lambda: [({"slot": str(m.slot)}, m.inflight) for m in (_pool.browsers() if _pool else [])])
+CallbackMetric("renderer_browser_events_total", "Browser recycles and crashes",
+               lambda: [({"event": "recycled"}, _pool.recycled if _pool else 0),
+                        ({"event": "crashed"}, _pool.crashes if _pool else 0)],
+               kind="counter")
@@ -0,0 +1,136 @@
+# lib/scheduler.py
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any
+
+# Priority classes: lower value is served first
+PRIORITY_HTML = 0        # /render fallbacks the analyzer is blocked on
+PRIORITY_SCREENSHOT = 1  # evidence screenshots, tolerant of delay
+PRIORITY_NAMES = {PRIORITY_HTML: "html", PRIORITY_SCREENSHOT: "screenshot"}
+
+
+class Overloaded(Exception):
+    """Queue wait would exceed the caller's deadline; retry later."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"renderer overloaded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """The caller's deadline passed before the render could start."""
+
+
+class RenderScheduler:
+    """
+    Admission control for renders: at most `concurrency` renders run at once and
+    waiters are served by (priority, arrival). Requests with a deadline are shed
+    up front when the estimated queue wait exceeds it, and dropped if the deadline
+    passes while queued. Cancelling a waiting task removes it from the queue.
+    """
+
+    def __init__(self, concurrency: int, initial_service_sec: float = 3.0):
+        self.concurrency = concurrency
+        self.active = 0
+        self._heap: list = []
+        self._seq = itertools.count()
+        # EWMA of how long a render holds a slot; drives the wait estimate
+        self._service_sec = initial_service_sec
+        self._waits = deque(maxlen=1000)
+        self.admitted = 0
+        self.shed = 0
+        self.expired = 0
+        self.cancelled = 0
+
+    def queue_depth(self, priority: Optional[int] = None) -> int:
+        return sum(
+            1 for _, _, w in self._heap
+            if not w["future"].done() and (priority is None or w["priority"] == priority)
+        )
+
+    def estimate_wait(self, priority: int) -> float:
+        """Estimated seconds until a new request of this priority would start."""
+        ahead = sum(1 for _, _, w in self._heap if not w["future"].done() and w["priority"] <= priority)
+        if ahead == 0 and self.active < self.concurrency:
+            return 0.0
+        return (ahead + 1) / self.concurrency * self._service_sec
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_SCREENSHOT, deadline: Optional[float] = None):
+        """Hold one render slot. `deadline` is an absolute time.monotonic() value."""
+        enqueued = time.monotonic()
+        if deadline is not None:
+            estimate = self.estimate_wait(priority)
+            if deadline <= enqueued or estimate > deadline - enqueued:
+                self.shed += 1
+                raise Overloaded(retry_after=max(1, math.ceil(estimate)))
+
+        if self.active < self.concurrency and self.queue_depth() == 0:
+            self.active += 1
+        else:
+            await self._wait(priority, deadline)
+
+        started = time.monotonic()
+        self._waits.append(started - enqueued)
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            held = time.monotonic() - started
+            self._service_sec = 0.8 * self._service_sec + 0.2 * held
+            self._release()
+
+    async def _wait(self, priority: int, deadline: Optional[float]) -> None:
+        waiter = {"priority": priority, "deadline": deadline, "future": asyncio.get_running_loop().create_future()}
+        heapq.heappush(self._heap, (priority, next(self._seq), waiter))
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        future = waiter["future"]
+        try:
+            await asyncio.wait_for(future, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # slot was handed to us just as we gave up: pass it on
+                self._release()
+            else:
+                future.cancel()
+            if isinstance(exc, asyncio.TimeoutError):
+                self.expired += 1
+                raise DeadlineExceeded("deadline passed while queued")
+            self.cancelled += 1
+            raise
+
+    def _release(self) -> None:
+        """Hand the freed slot to the next live waiter, dropping expired ones."""
+        now = time.monotonic()
+        while self._heap:
+            _, _, waiter = heapq.heappop(self._heap)
+            future = waiter["future"]
+            if future.done():
+                continue
+            if waiter["deadline"] is not None and now >= waiter["deadline"]:
+                self.expired += 1
+                future.set_exception(DeadlineExceeded("deadline passed while queued"))
+                continue
+            future.set_result(None)
+            return
+        self.active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+        return {
+            "concurrency": self.concurrency,
+            "active": self.active,
+            "queue_depth": {name: self.queue_depth(p) for p, name in PRIORITY_NAMES.items()},
+            "wait_ms_p50": int(waits[len(waits) // 2] * 1000) if waits else 0,
+            "wait_ms_p95": int(waits[int(len(waits) * 0.95)] * 1000) if waits else 0,
+            "service_ms_avg": int(self._service_sec * 1000),
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "expired": self.expired,
+            "cancelled": self.cancelled,
+        }
@@ -0,0 +1,183 @@
+# lib/storage.py
+"""
+MinIO upload pipeline for screenshots.
+
+One long-lived client is created at startup and the bucket check is cached.
+Uploads run on a small background thread pool (bounded by UPLOAD_QUEUE_MAX so
+callers get backpressure instead of an unbounded backlog) with retries, and
+objects are content-addressed so identical images are stored once.
+"""
+import asyncio
+import hashlib
+import io
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any
+from urllib.parse import urlparse
+
+from minio import Minio
+from minio.error import S3Error
+
+from lib.metrics import CallbackMetric, Counter
+
+# MinIO env config
+MINIO_ENDPOINT = os.environ.get("MINIO_ENDPOINT")
+MINIO_ACCESS_KEY = os.environ.get("MINIO_ACCESS_KEY")
+MINIO_SECRET_KEY = os.environ.get("MINIO_SECRET_KEY")
+MINIO_BUCKET = os.environ.get("MINIO_BUCKET", "screenshots")
+
+# Threads doing blocking put_object calls
+UPLOAD_WORKERS = int(os.environ.get("RENDERER_UPLOAD_WORKERS", "4"))
+# Max uploads queued or running; further callers wait for a free spot
+UPLOAD_QUEUE_MAX = int(os.environ.get("RENDERER_UPLOAD_QUEUE_MAX", "64"))
+UPLOAD_RETRIES = int(os.environ.get("RENDERER_UPLOAD_RETRIES", "3"))
+UPLOAD_BACKOFF_SEC = float(os.environ.get("RENDERER_UPLOAD_BACKOFF_SEC", "0.5"))
+# Digests known to exist in the bucket (skips the stat round trip for repeats)
+KNOWN_OBJECTS_MAX = int(os.environ.get("RENDERER_KNOWN_OBJECTS_MAX", "10000"))
+
+UPLOADS = Counter("renderer_uploads_total", "Screenshot uploads by outcome (uploaded, deduplicated, failed)")
+
+_client: Optional[Minio] = None
+_bucket_ready = False
+_executor: Optional[ThreadPoolExecutor] = None
+_slots: Optional[asyncio.Semaphore] = None
+_pending = 0
+# digest -> future of the upload in progress, so concurrent duplicates share one put
+_inflight: Dict[str, asyncio.Future] = {}
+_known: "OrderedDict[str, None]" = OrderedDict()
+
+
+def _make_client() -> Minio:
+    parsed = urlparse(MINIO_ENDPOINT if "://" in MINIO_ENDPOINT else f"http://{MINIO_ENDPOINT}")
+    return Minio(
+        parsed.netloc,
+        access_key=MINIO_ACCESS_KEY,
+        secret_key=MINIO_SECRET_KEY,
+        secure=parsed.scheme == "https",
+    )
+
+
+def init_storage() -> None:
+    """Create the MinIO client and upload pool (no-op when MinIO is not configured)."""
+    global _client, _executor, _slots
+    if not MINIO_ENDPOINT or _client is not None:
+        return
+    _client = _make_client()
+    _executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="minio-upload")
+    _slots = asyncio.Semaphore(UPLOAD_QUEUE_MAX)
+    print(f"[storage:init] endpoint={MINIO_ENDPOINT} bucket={MINIO_BUCKET} workers={UPLOAD_WORKERS}", flush=True)
+
+
+def shutdown_storage() -> None:
+    """Wait for queued uploads to finish and release the pool."""
+    global _client, _executor, _slots, _bucket_ready
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+    _client = _executor = _slots = None
+    _bucket_ready = False
+
+
+def _ensure_bucket() -> None:
+    global _bucket_ready
+    if _bucket_ready:
+        return
+    if not _client.bucket_exists(MINIO_BUCKET):
+        try:
+            _client.make_bucket(MINIO_BUCKET)
+        except S3Error as e:
+            # another replica created it first
+            if e.code not in ("BucketAlreadyOwnedByYou", "BucketAlreadyExists"):
+                raise
+    _bucket_ready = True
+
+
+def _remember(digest: str) -> None:
+    _known[digest] = None
+    _known.move_to_end(digest)
+    while len(_known) > KNOWN_OBJECTS_MAX:
+        _known.popitem(last=False)
+
+
+def _put(data: bytes, object_name: str, content_type: str) -> str:
+    """Blocking upload with retries; returns "uploaded" or "deduplicated"."""
+    last_error: Optional[Exception] = None
+    for attempt in range(UPLOAD_RETRIES + 1):
+        try:
+            _ensure_bucket()
+            try:
+                _client.stat_object(MINIO_BUCKET, object_name)
+                return "deduplicated"
+            except S3Error as e:
+                if e.code not in ("NoSuchKey", "NoSuchObject", "ResourceNotFound"):
+                    raise
+            _client.put_object(MINIO_BUCKET, object_name, io.BytesIO(data), length=len(data),
+                               content_type=content_type)
+            return "uploaded"
+        except Exception as e:
+            last_error = e
+            if attempt < UPLOAD_RETRIES:
+                print(f"[storage:retry] {object_name} attempt={attempt + 1} -> {e}", flush=True)
+                time.sleep(UPLOAD_BACKOFF_SEC * (2 ** attempt))
+    raise last_error
+
+
+def _object_url(object_name: str) -> str:
+    return f"{MINIO_ENDPOINT.rstrip('/')}/{MINIO_BUCKET}/{object_name}"
+
+
+async def upload_to_minio(data: bytes, prefix: str = "screenshots", ext: str = "png",
+                          content_type: str = "image/png") -> Dict[str, Any]:
+    """
+    Upload bytes under a content-addressed name (<prefix>/<sha256>.<ext>) and
+    return once MinIO confirmed it. Identical images map to the same object and
+    are only uploaded once. Returns {"ok", "bucket", "object", "url", "deduplicated"}
+    or {"ok": False, "error"}.
+    """
+    global _pending
+    if not MINIO_ENDPOINT:
+        return {"ok": False, "error": "minio not configured"}
+    init_storage()
+
+    digest = hashlib.sha256(data).hexdigest()
+    object_name = f"{prefix}/{digest}.{ext}"
+    info = {"ok": True, "bucket": MINIO_BUCKET, "object": object_name, "url": _object_url(object_name)}
+
+    if digest in _known:
+        _known.move_to_end(digest)
+        UPLOADS.inc(outcome="deduplicated")
+        return {**info, "deduplicated": True}
+
+    shared = _inflight.get(digest)
+    if shared is not None:
+        outcome = await asyncio.shield(shared)
+        UPLOADS.inc(outcome="deduplicated")
+        return {**info, "deduplicated": True} if outcome else {"ok": False, "error": "upload failed"}
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[digest] = future
+    try:
+        _pending += 1
+        async with _slots:
+            outcome = await asyncio.get_running_loop().run_in_executor(
+                _executor, _put, data, object_name, content_type
+            )
+        _remember(digest)
+        future.set_result(outcome)
+        UPLOADS.inc(outcome=outcome)
+        return {**info, "deduplicated": outcome == "deduplicated"}
+    except Exception as e:
+        future.set_result(None)
+        UPLOADS.inc(outcome="failed")
+        print(f"[storage:error] {object_name} -> {e}", flush=True)
+        return {"ok": False, "error": str(e)}
+    finally:
+        _pending -= 1
+        _inflight.pop(digest, None)
+        if not future.done():
+            # caller cancelled; waiters on the same digest report a failed upload
+            future.set_result(None)
+
+
+CallbackMetric("renderer_uploads_pending", "Uploads queued or running", lambda: [({}, _pending)])
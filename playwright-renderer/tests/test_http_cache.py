@@ -0,0 +1,91 @@
+import asyncio
+import json
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("playwright.async_api")
+
+from lib import http_cache  # noqa: E402
+from lib.http_cache import DiskCache, _ttl  # noqa: E402
+
+
+def test_ttl_rules():
+    assert _ttl({}) == http_cache.CACHE_DEFAULT_TTL_SEC
+    assert _ttl({"cache-control": "public, max-age=120"}) == 120
+    assert _ttl({"cache-control": "max-age=60, s-maxage=300"}) == 300
+    assert _ttl({"cache-control": f"max-age={http_cache.CACHE_MAX_TTL_SEC * 10}"}) == http_cache.CACHE_MAX_TTL_SEC
+    assert _ttl({"cache-control": "max-age=0"}) is None
+    for cc in ("no-store", "private, max-age=600", "no-cache"):
+        assert _ttl({"cache-control": cc}) is None
+    assert _ttl({"set-cookie": "a=b"}) is None
+
+
+def _route(url, accept=""):
+    return SimpleNamespace(request=SimpleNamespace(url=url, headers={"accept": accept}))
+
+
+def test_key_depends_on_url_and_accept():
+    base = http_cache._key(_route("https://cdn.example/app.js"))
+    assert base == http_cache._key(_route("https://cdn.example/app.js"))
+    assert base != http_cache._key(_route("https://cdn.example/app.js?v=2"))
+    assert base != http_cache._key(_route("https://cdn.example/app.js", "image/webp"))
+
+
+def _meta(ttl=60):
+    now = time.time()
+    return {"status": 200, "headers": {}, "stored": now, "expires": now + ttl}
+
+
+def test_put_get_and_overwrite(tmp_path):
+    async def main():
+        cache = DiskCache(str(tmp_path), max_bytes=1000)
+        await cache.put("ab01", _meta(), b"body-1")
+        await cache.put("ab01", _meta(), b"body-22")
+        return cache, await cache.get("ab01"), await cache.get("missing")
+    cache, found, missing = asyncio.run(main())
+    assert found[1] == b"body-22"
+    assert missing is None
+    assert len(cache) == 1 and cache.size == len(b"body-22")
+
+
+def test_expired_entry_is_dropped(tmp_path):
+    async def main():
+        cache = DiskCache(str(tmp_path), max_bytes=1000)
+        await cache.put("cd02", _meta(ttl=-1), b"stale")
+        return cache, await cache.get("cd02")
+    cache, found = asyncio.run(main())
+    assert found is None
+    assert len(cache) == 0 and cache.size == 0
+    assert not any(name.startswith("cd02") for _, _, files in os.walk(tmp_path) for name in files)
+
+
+def test_evicts_least_recently_used(tmp_path):
+    async def main():
+        cache = DiskCache(str(tmp_path), max_bytes=10)
+        await cache.put("aa01", _meta(), b"12345")
+        await cache.put("bb02", _meta(), b"12345")
+        await cache.get("aa01")  # bb02 is now the least recently used
+        await cache.put("cc03", _meta(), b"12345")
+        return cache, [await cache.get(k) is not None for k in ("aa01", "bb02", "cc03")]
+    cache, present = asyncio.run(main())
+    assert present == [True, False, True]
+    assert cache.size == 10
+
+
+def test_load_rebuilds_index_and_skips_expired(tmp_path):
+    async def main():
+        cache = DiskCache(str(tmp_path), max_bytes=1000)
+        await cache.put("aa01", _meta(), b"fresh")
+        await cache.put("bb02", _meta(ttl=-1), b"expired")
+    asyncio.run(main())
+    # an entry whose body is missing is dropped too
+    os.makedirs(tmp_path / "cc", exist_ok=True)
+    (tmp_path / "cc" / "cc03.json").write_text(json.dumps(_meta()))
+
+    reloaded = DiskCache(str(tmp_path), max_bytes=1000)
+    reloaded.load()
+    assert len(reloaded) == 1 and reloaded.size == len(b"fresh")
+    assert asyncio.run(reloaded.get("aa01"))[1] == b"fresh"
@@ -0,0 +1,69 @@
+"""
+The page scripts in lib/renderer.py are plain (non-raw) Python strings, so a
+Python escape can silently change the JavaScript the browser gets. These
+checks read the constants without importing playwright and hand them to node.
+"""
+import ast
+import json
+import re
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+RENDERER = Path(__file__).resolve().parents[1] / "lib" / "renderer.py"
+NODE = shutil.which("node")
+
+pytestmark = pytest.mark.skipif(NODE is None, reason="node is not installed")
+
+
+def _js_constants():
+    tree = ast.parse(RENDERER.read_text(encoding="utf-8"))
+    out = {}
+    for node in tree.body:
+        if (isinstance(node, ast.Assign) and len(node.targets) == 1
+                and isinstance(node.targets[0], ast.Name) and node.targets[0].id.endswith("_JS")
+                and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str)):
+            out[node.targets[0].id] = node.value.value
+    return out
+
+
+JS = _js_constants()
+
+
+def _node(script: str, tmp_path: Path, check: bool = False) -> subprocess.CompletedProcess:
+    path = tmp_path / "script.js"
+    path.write_text(script, encoding="utf-8")
+    args = [NODE, "--check", str(path)] if check else [NODE, str(path)]
+    return subprocess.run(args, capture_output=True, text=True, timeout=30)
+
+
+def test_constants_found():
+    assert {"_FIND_RECTS_JS", "_EXTRACT_TEXT_JS", "_VISIBILITY_JS"} <= set(JS)
+
+
+def test_renderer_has_no_invalid_escapes():
+    import warnings
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        compile(RENDERER.read_text(encoding="utf-8"), str(RENDERER), "exec")
+
+
+@pytest.mark.parametrize("name", sorted(JS))
+def test_js_parses(name, tmp_path):
+    result = _node(JS[name], tmp_path, check=True)
+    assert result.returncode == 0, result.stderr
+
+
+@pytest.mark.parametrize("name", sorted(n for n, js in JS.items() if "keyword.replace(" in js))
+def test_keyword_escape_matches_literally(name, tmp_path):
+    line = re.search(r"const kw = keyword\.replace\(.*?\);", JS[name]).group(0)
+    keyword = "a.b[c]*(d)\\e$"
+    script = (f"const keyword = {json.dumps(keyword)};\n{line}\n"
+              f"const re = new RegExp(kw, 'gi');\n"
+              f"console.log(JSON.stringify([re.test({json.dumps('x ' + keyword + ' y')}), "
+              f"new RegExp(kw, 'gi').test('x aXb[c]*(d)\\\\e$ y')]));")
+    result = _node(script, tmp_path)
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout) == [True, False]
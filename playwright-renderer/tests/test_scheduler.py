@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+import pytest
+
+from lib.scheduler import (DeadlineExceeded, Overloaded, PRIORITY_HTML, PRIORITY_SCREENSHOT,
+                           RenderScheduler)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def _hold(scheduler, order, name, priority, release: asyncio.Event, deadline=None):
+    async with scheduler.slot(priority, deadline):
+        order.append(name)
+        await release.wait()
+
+
+def test_waiters_served_by_priority_then_arrival():
+    async def main():
+        scheduler = RenderScheduler(1)
+        order, gate, done = [], asyncio.Event(), asyncio.Event()
+        done.set()
+        first = asyncio.create_task(_hold(scheduler, order, "first", PRIORITY_SCREENSHOT, gate))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(_hold(scheduler, order, name, prio, done))
+                   for name, prio in (("shot-1", PRIORITY_SCREENSHOT), ("html-1", PRIORITY_HTML),
+                                      ("shot-2", PRIORITY_SCREENSHOT), ("html-2", PRIORITY_HTML))]
+        await asyncio.sleep(0)
+        assert scheduler.queue_depth() == 4
+        gate.set()
+        await asyncio.gather(first, *waiters)
+        return order, scheduler
+    order, scheduler = run(main())
+    assert order == ["first", "html-1", "html-2", "shot-1", "shot-2"]
+    assert scheduler.active == 0 and scheduler.admitted == 5
+
+
+def test_sheds_when_deadline_already_passed():
+    async def main():
+        scheduler = RenderScheduler(2)
+        with pytest.raises(Overloaded) as exc:
+            async with scheduler.slot(PRIORITY_HTML, deadline=time.monotonic() - 1):
+                pass
+        return scheduler, exc.value
+    scheduler, exc = run(main())
+    assert scheduler.shed == 1 and scheduler.active == 0
+    assert exc.retry_after >= 1
+
+
+def test_sheds_when_estimated_wait_exceeds_deadline():
+    async def main():
+        scheduler = RenderScheduler(1, initial_service_sec=10.0)
+        gate = asyncio.Event()
+        holder = asyncio.create_task(_hold(scheduler, [], "holder", PRIORITY_HTML, gate))
+        await asyncio.sleep(0)
+        assert scheduler.estimate_wait(PRIORITY_HTML) == pytest.approx(10.0)
+        with pytest.raises(Overloaded):
+            async with scheduler.slot(PRIORITY_HTML, deadline=time.monotonic() + 1):
+                pass
+        gate.set()
+        await holder
+        return scheduler
+    scheduler = run(main())
+    assert scheduler.shed == 1 and scheduler.active == 0
+
+
+def test_deadline_passing_while_queued_raises_and_slot_stays_usable():
+    async def main():
+        scheduler = RenderScheduler(1, initial_service_sec=0.0)
+        gate = asyncio.Event()
+        holder = asyncio.create_task(_hold(scheduler, [], "holder", PRIORITY_HTML, gate))
+        await asyncio.sleep(0)
+        with pytest.raises(DeadlineExceeded):
+            async with scheduler.slot(PRIORITY_SCREENSHOT, deadline=time.monotonic() + 0.05):
+                pass
+        gate.set()
+        await holder
+        # the slot is free again for the next caller
+        async with scheduler.slot(PRIORITY_HTML):
+            pass
+        return scheduler
+    scheduler = run(main())
+    assert scheduler.expired == 1 and scheduler.active == 0
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def main():
+        scheduler = RenderScheduler(1)
+        gate = asyncio.Event()
+        order = []
+        holder = asyncio.create_task(_hold(scheduler, order, "holder", PRIORITY_HTML, gate))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(_hold(scheduler, order, "waiter", PRIORITY_HTML, gate))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert scheduler.queue_depth() == 0
+        gate.set()
+        await holder
+        return scheduler, order
+    scheduler, order = run(main())
+    assert order == ["holder"]
+    assert scheduler.cancelled == 1 and scheduler.active == 0
+
+
+def test_stats_shape():
+    stats = RenderScheduler(3).stats()
+    assert stats["concurrency"] == 3
+    assert set(stats["queue_depth"]) == {"html", "screenshot"}
+    assert stats["wait_ms_p50"] == 0 and stats["admitted"] == 0
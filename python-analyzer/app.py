@@ -58,6 +58,14 @@ async def lifespan(app: FastAPI):
     yield
     # Shutdown (if needed)
     logging.info("[shutdown] Python Analyzer shutting down...")
+    try:
+        from core.core_analyzer import shutdown_pg_flusher
+        await shutdown_pg_flusher()
+    except Exception as exc:
+        logging.exception("[shutdown] hit flush failed: %s", exc)
+    from config.settings import async_engine
+    if async_engine is not None:
+        await async_engine.dispose()
 
 app = FastAPI(title="python-analyzer", lifespan=lifespan)
 
@@ -33,6 +33,14 @@ try:
 except ImportError:
     _HAS_OPENSEARCH = False
 
+# Async database access: SQLAlchemy asyncio over asyncpg (optional)
+try:
+    import asyncpg  # noqa: F401
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    _HAS_ASYNCPG = True
+except ImportError:
+    _HAS_ASYNCPG = False
+
 # Get global configuration
 _config: Optional[AppConfig] = None
 
@@ -98,6 +106,48 @@ def get_db():
     finally:
         db.close()
 
+# ---------------- ASYNC DATABASE INITIALIZATION ----------------
+# Separate pool on asyncpg for the analyzer's hot paths and report reads
+# (see libs/async_db.py); None when disabled (DB_ASYNC=0) or asyncpg is missing.
+async_engine = None
+AsyncSessionLocal = None
+
+def _init_async_database():
+    """Initialize the asyncpg engine: sized pool, statement timeout, prepared statement cache."""
+    global async_engine, AsyncSessionLocal
+    
+    db_config = _get_config().database
+    if not db_config.use_async:
+        return
+    if not _HAS_ASYNCPG:
+        logger.warning("⚠️ asyncpg not installed - database access stays on the sync engine")
+        return
+    try:
+        async_engine = create_async_engine(
+            db_config.async_url,
+            pool_pre_ping=True,
+            pool_size=db_config.async_pool_size,
+            max_overflow=db_config.async_max_overflow,
+            pool_recycle=db_config.pool_recycle,
+            pool_timeout=db_config.pool_timeout,
+            connect_args={
+                "timeout": db_config.connect_timeout,
+                "server_settings": {
+                    "statement_timeout": str(db_config.statement_timeout_ms),
+                    "application_name": f"analyzer-{_get_config().service.instance_id}-async",
+                },
+            },
+        )
+        AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+        logger.info(f"✅ Async database engine ready (pool={db_config.async_pool_size}+{db_config.async_max_overflow}, "
+                    f"statement_timeout={db_config.statement_timeout_ms}ms)")
+    except Exception as e:
+        logger.warning(f"⚠️ Async database engine unavailable: {e}")
+        async_engine = None
+        AsyncSessionLocal = None
+
+_init_async_database()
+
 # ---------------- REDIS CLIENT INITIALIZATION ----------------
 redis_client: Optional[redis.Redis] = None
 
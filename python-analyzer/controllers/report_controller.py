@@ -1,46 +1,126 @@
 import os
 import io
 import csv
+import gzip
 import json
+import zlib
 import urllib.parse
 from fastapi import HTTPException
-from fastapi.responses import JSONResponse, Response
-from sqlalchemy import select, distinct
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from sqlalchemy import select, distinct, func, cast
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Session
-from config.settings import UPI_MAP, get_db
-from models.hit_model import Hit, Result
+from starlette.concurrency import run_in_threadpool
+from config.settings import UPI_MAP, SessionLocal
+from libs.async_db import run_db
+from libs.archive import list_archived_results, read_archived_report, read_archived_result
+from models.hit_model import Hit, Result, ResultUrl
 
 
-def export_hits_controller():
-    """Export aggregated crawl results from PostgreSQL (hits table) as CSV."""
+# CSV export: rows come off a server-side cursor EXPORT_YIELD_PER at a time and
+# leave in chunks of about EXPORT_CHUNK_BYTES, so memory does not grow with the export
+EXPORT_YIELD_PER = int(os.environ.get("EXPORT_YIELD_PER", "5000"))
+EXPORT_CHUNK_BYTES = int(os.environ.get("EXPORT_CHUNK_BYTES", str(256 * 1024)))
+
+HIT_EXPORT_COLUMNS = (
+    Hit.id, Hit.task_id, Hit.main_url, Hit.sub_url, Hit.category, Hit.matched_keyword,
+    Hit.snippet, Hit.screenshot_path, Hit.timestamp, Hit.source, Hit.confident_score,
+)
+RESULT_EXPORT_HEADER = (
+    "main_url", "task_id", "total_matches", "total_urls", "categories", "keywords", "raw_data_url", "timestamp",
+)
+
+
+def _export_query(kind: str, task_id: str | None, category: str | None, since: int | None, until: int | None):
+    if kind == "hits":
+        # id order streams off the (id, timestamp) primary key of each partition, no sort
+        stmt = select(*HIT_EXPORT_COLUMNS).order_by(Hit.id)
+        model = Hit
+        if category:
+            stmt = stmt.where(Hit.category == category)
+    else:
+        stmt = select(
+            Result.main_url, Result.task_id,
+            func.coalesce(Result.total_matches, func.coalesce(func.json_array_length(Result.keyword_match), 0)),
+            func.coalesce(Result.total_urls, func.coalesce(func.json_array_length(Result.sub_urls), 0)),
+            Result.categories, Result.keyword_counts, Result.keyword_match, Result.raw_data_url, Result.timestamp,
+        ).order_by(Result.id)
+        model = Result
+        if category:
+            stmt = stmt.where(cast(Result.categories, JSONB).contains([category]))
+    if task_id:
+        stmt = stmt.where(model.task_id == task_id)
+    if since is not None:
+        stmt = stmt.where(model.timestamp >= since)
+    if until is not None:
+        stmt = stmt.where(model.timestamp < until)
+    return stmt.execution_options(yield_per=EXPORT_YIELD_PER)
+
+
+def _result_csv_row(row) -> list:
+    main_url_, task_id, total_matches, total_urls, categories, keyword_counts, keyword_match, raw_data_url, ts = row
+    if not keyword_counts and keyword_match:  # rows written before keyword_counts existed
+        keyword_counts = {}
+        for kw in keyword_match:
+            keyword_counts[kw] = keyword_counts.get(kw, 0) + 1
+    keywords = ";".join(f"{kw}:{n}" for kw, n in (keyword_counts or {}).items())
+    return [main_url_, task_id, total_matches, total_urls, ";".join(categories or []), keywords, raw_data_url, ts]
+
+
+def iter_export_csv(kind: str = "hits", task_id: str | None = None, category: str | None = None,
+                    since: int | None = None, until: int | None = None, compress: bool = False):
+    """
+    Yield the CSV export (bytes, gzipped when compress) chunk by chunk.
+    Blocking: runs on a sync session, which stays open until the generator is
+    exhausted or closed (StreamingResponse closes it if the client goes away).
+    """
+    stmt = _export_query(kind, task_id, category, since, until)
+    gz = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None  # wbits 31: gzip container
     buf = io.StringIO()
     w = csv.writer(buf)
-    w.writerow([
-        "master_url", "sub_urls", "total_matches", "processed_pages",
-        "categories", "keywords", "sources", "snippets", "timestamp"
-    ])
+    w.writerow([c.key for c in HIT_EXPORT_COLUMNS] if kind == "hits" else RESULT_EXPORT_HEADER)
 
+    def chunk() -> bytes:
+        data = buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+        return gz.compress(data) if gz else data
+
+    db = SessionLocal()
     try:
-        db: Session = next(get_db())  # ✅ Lazy initialization
-        rows = []  # Replace with actual model query if needed
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"DB error: {e}")
+        for row in db.execute(stmt):
+            w.writerow(row if kind == "hits" else _result_csv_row(row))
+            if buf.tell() >= EXPORT_CHUNK_BYTES:
+                data = chunk()
+                if data:
+                    yield data
+        data = chunk()
+        if gz:
+            data += gz.flush()
+        if data:
+            yield data
+    finally:
+        db.close()
+
 
-    for r in rows:
-        w.writerow([
-            r.master_url,
-            json.dumps(r.sub_urls, ensure_ascii=False),
-            r.total_matches,
-            r.processed_pages,
-            ";".join(r.categories or []),
-            ";".join(r.keywords or []),
-            ";".join(r.sources or []),
-            json.dumps(r.snippets, ensure_ascii=False),
-            r.timestamp,
-        ])
+def export_hits_controller(kind: str = "hits", task_id: str | None = None, category: str | None = None,
+                           since: int | None = None, until: int | None = None, compress: bool = False):
+    """
+    Stream hits (one row per validated hit) or results (one row per main_url) from
+    PostgreSQL as CSV, filtered by task_id / category / timestamp range [since, until).
+    """
+    if kind not in ("hits", "results"):
+        raise HTTPException(status_code=400, detail="kind must be 'hits' or 'results'")
+    if since is not None and until is not None and until <= since:
+        raise HTTPException(status_code=400, detail="until must be after since")
 
-    headers = {"Content-Disposition": 'attachment; filename=\"hits_export.csv\"'}
-    return Response(content=buf.getvalue(), media_type="text/csv", headers=headers)
+    filename = f"{kind}_export.csv" + (".gz" if compress else "")
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    return StreamingResponse(
+        iter_export_csv(kind, task_id, category, since, until, compress),
+        media_type="application/gzip" if compress else "text/csv; charset=utf-8",
+        headers=headers,
+    )
 
 
 def report_upi_csv_controller():
@@ -81,45 +161,95 @@ def report_upi_json_controller():
     return JSONResponse(content=data)
 
 
-def list_report_tasks_controller():
-    """List all unique main URLs from the Results table (one row per main_url)."""
-    try:
-        db: Session = next(get_db())  # ✅ Lazy session creation
-        # Get all Results (one row per main_url - master data)
-        stmt = select(Result).order_by(Result.timestamp.desc())
-        results = db.execute(stmt).scalars().all()
-        
+async def list_report_tasks_controller(include_archived: bool = False):
+    """
+    List all unique main URLs from the Results table (one row per main_url).
+    include_archived adds the results moved to the Parquet archive (libs/archive.py).
+    """
+    # DB reads stay on run_db (the async engine when enabled); building the
+    # response from the rows runs in the thread pool, off the event loop
+    def _task_rows(db: Session) -> list:
+        # Get all Results (one row per main_url - master data); counts only, never the
+        # per-page lists (rows written before total_* existed are counted in SQL)
+        stmt = select(
+            Result.main_url,
+            Result.task_id,
+            func.coalesce(Result.total_matches, func.coalesce(func.json_array_length(Result.keyword_match), 0)),
+            func.coalesce(Result.total_urls, func.coalesce(func.json_array_length(Result.sub_urls), 0)),
+            Result.categories,
+            Result.timestamp,
+        ).order_by(Result.timestamp.desc())
+        return db.execute(stmt).all()
+
+    def _tasks(rows: list) -> list:
         tasks = []
-        for r in results:
+        for main_url_, task_id, total_matches, total_urls, categories, timestamp in rows:
             tasks.append({
-                "main_url": r.main_url,
-                "task_id": r.task_id,
-                "total_matches": len(r.keyword_match) if r.keyword_match else 0,  # All matches (before validation)
-                "total_urls": len(r.sub_urls) if r.sub_urls else 0,
-                "categories": r.categories if r.categories else [],
-                "timestamp": r.timestamp,
+                "main_url": main_url_,
+                "task_id": task_id,
+                "total_matches": total_matches,  # All matches (before validation)
+                "total_urls": total_urls,
+                "categories": categories if categories else [],
+                "timestamp": timestamp,
             })
+        return tasks
+
+    try:
+        tasks = await run_in_threadpool(_tasks, await run_db(_task_rows))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"DB error: {e}")
 
+    if include_archived:
+        try:
+            archived = await run_in_threadpool(list_archived_results)
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"Archive error: {e}")
+        live = {t["main_url"] for t in tasks}
+        tasks += [{**row, "archived": True} for row in archived if row["main_url"] not in live]
+        tasks.sort(key=lambda t: t["timestamp"] or 0, reverse=True)
+
     return JSONResponse(content={"tasks": tasks})
 
 
-def get_report_by_main_url_controller(main_url: str):
+async def get_report_by_main_url_controller(main_url: str):
     """Retrieve detailed report for a given main_url.
     Returns both Results data (all matches before validation) and Hits data (validated matches after spaCy).
+    Archived rows (libs/archive.py) are read back when the manifest lists the main_url:
+    the archived result if there is no live one, and archived hits alongside live hits.
     """
+    decoded_url = urllib.parse.unquote(main_url)
+
     try:
-        db: Session = next(get_db())  # ✅ Lazy session creation
-        decoded_url = urllib.parse.unquote(main_url)
-        
+        archived_result, archived_urls, archived_hits = await run_in_threadpool(read_archived_report, decoded_url)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Archive error: {e}")
+
+    # DB reads stay on run_db (the async engine when enabled); shaping the rows of
+    # a large domain into the report runs in the thread pool, off the event loop
+    def _report_rows(db: Session) -> tuple:
         # Get Results data (ALL matches before validation - master data)
         result_stmt = select(Result).where(Result.main_url == decoded_url)
         result_data = db.execute(result_stmt).scalars().first()
-        
-        # Get Hits data (ONLY validated matches after spaCy)
-        hit_stmt = select(Hit).where(Hit.main_url == decoded_url)
-        hits = db.execute(hit_stmt).scalars().all()
+        url_rows = None
+        if result_data is not None and result_data.total_matches is not None:
+            url_rows = db.execute(
+                select(ResultUrl.sub_url, ResultUrl.matches)
+                .where(ResultUrl.main_url == decoded_url)
+                .order_by(ResultUrl.id)
+            ).all()
+        # Get Hits data (ONLY validated matches after spaCy); plain rows, no ORM objects
+        hit_stmt = select(Hit.id, Hit.task_id, Hit.sub_url, Hit.category, Hit.matched_keyword, Hit.snippet,
+                          Hit.screenshot_path, Hit.timestamp, Hit.source, Hit.confident_score
+                          ).where(Hit.main_url == decoded_url)
+        return result_data, url_rows, db.execute(hit_stmt).all()
+
+    def _report(result_data, url_rows, hits) -> dict:
+        from_archive = result_data is None and archived_result is not None
+        if from_archive:
+            result_data = archived_result
+        if archived_hits:
+            live_ids = {h.id for h in hits}  # rows archived but not deleted yet
+            hits = [h for h in archived_hits if h.id not in live_ids] + list(hits)
 
         # ✅ Handle "no report found" case
         if not result_data:
@@ -127,23 +257,40 @@ def get_report_by_main_url_controller(main_url: str):
             raise HTTPException(status_code=404, detail=f"No report found for main_url: {decoded_url}")
 
         # Prepare Results data (ALL matches before validation)
-        # Note: keyword_match is a list that may contain duplicate keywords across pages
-        # total_matches_all should be the actual count of ALL matches found
-        keyword_list = result_data.keyword_match if result_data.keyword_match else []
-        # Calculate total matches: count all items in keyword_match (including duplicates)
-        # This represents ALL matches found before validation, not just unique keywords
-        total_matches_all = len(keyword_list)  # Total count of all matches (before validation)
+        # Rows written before total_matches existed keep one keyword_match entry per
+        # match and the sub_urls list inline; newer rows keep counts
+        legacy = result_data.total_matches is None
+        if legacy:
+            keyword_list = result_data.keyword_match if result_data.keyword_match else []
+            keyword_counts = {}
+            for kw in keyword_list:
+                keyword_counts[kw] = keyword_counts.get(kw, 0) + 1
+            sub_urls = result_data.sub_urls if result_data.sub_urls else []
+            url_matches = {}
+            total_matches_all = len(keyword_list)  # Total count of all matches (before validation)
+        else:
+            keyword_counts = result_data.keyword_counts or {}
+            keyword_list = sorted(keyword_counts, key=keyword_counts.get, reverse=True)
+            if from_archive:
+                url_rows = list(archived_urls.items())
+            sub_urls = [u for u, _ in url_rows]
+            url_matches = {u: n for u, n in url_rows if n}
+            total_matches_all = result_data.total_matches
         
         results_data = {
             "task_id": result_data.task_id,
             "main_url": result_data.main_url,
-            "sub_urls": result_data.sub_urls if result_data.sub_urls else [],
-            "keyword_match": keyword_list,  # ALL keywords found (may contain duplicates across pages)
+            "sub_urls": sub_urls,
+            "url_matches": url_matches,  # sub_url -> matches, pages with matches only
+            "keyword_match": keyword_list,  # distinct keywords, most matched first (older rows: one per match)
+            "keyword_counts": keyword_counts,
             "categories": result_data.categories if result_data.categories else [],  # ALL categories found
-            "raw_data": result_data.raw_data or "",  # All snippets from matches (before validation)
+            "raw_data": result_data.raw_data or "",  # inline snippets (older rows, or MinIO was down)
+            "raw_data_url": result_data.raw_data_url,  # snippets in MinIO: GET /report/snippets
             "total_matches_all": total_matches_all,  # All matches (before validation) - count of all keyword occurrences
-            "total_urls": len(result_data.sub_urls) if result_data.sub_urls else 0,
+            "total_urls": result_data.total_urls if not legacy else len(sub_urls),
             "timestamp": result_data.timestamp,
+            "archived": from_archive,
         }
 
         # Prepare Hits data (ONLY validated matches after spaCy)
@@ -166,7 +313,7 @@ def get_report_by_main_url_controller(main_url: str):
         
         # Validation: validated hits should never exceed all matches
         # If they do, use the actual count from keyword_match as the source of truth
-        if total_validated > total_all_matches and keyword_list:
+        if legacy and total_validated > total_all_matches and keyword_list:
             # Recalculate using the actual list length
             total_all_matches = len(keyword_list)
             results_data["total_matches_all"] = total_all_matches
@@ -186,22 +333,72 @@ def get_report_by_main_url_controller(main_url: str):
             message = f"Found {total_validated} validated policy violations (out of {total_all_matches} initial matches)"
             description = f"This domain had {total_all_matches} initial matches. After spaCy validation, {total_validated} matches were confirmed as violations."
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"DB error: {e}")
-
-    return JSONResponse(
-        content={
+        return {
             "main_url": decoded_url,
             "status": status,
             "message": message,
             "description": description,
             "total_hits": total_validated,  # Validated hits (after spaCy)
             "total_matches_all": total_all_matches,  # All matches (before validation)
+            "archived_hits": len(archived_hits),  # of total_hits, read from the Parquet archive
             "results": results_data,  # Results table data (ALL matches before validation)
             "hits": hits_data,  # Hits table data (ONLY validated matches after spaCy)
             # Legacy field for backward compatibility
             "reports": hits_data,
         }
-    )
+
+    try:
+        content = await run_in_threadpool(_report, *await run_db(_report_rows))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"DB error: {e}")
+
+    return JSONResponse(content=content)
+
+
+def skipped_screenshots_controller(task_id: str, limit: int = 100):
+    """List screenshots the budget policy skipped for a task (oldest first)."""
+    from libs.dlq import dlq
+    return dlq.skipped_screenshots(task_id, max(0, min(limit, 1000)))
+
+
+async def request_skipped_screenshots_controller(task_id: str, limit: int = 100):
+    """Capture up to `limit` previously skipped screenshots of a task now."""
+    from core.core_analyzer import request_skipped_screenshots
+    if limit <= 0:
+        raise HTTPException(status_code=400, detail="limit must be positive")
+    return await request_skipped_screenshots(task_id, min(limit, 1000))
+
+
+async def get_result_snippets_controller(main_url: str):
+    """Return the snippets of a main_url's result as plain text (from MinIO, or inline on older rows)."""
+    from config.settings import minio_client, MINIO_BUCKET
+    decoded_url = urllib.parse.unquote(main_url)
+    try:
+        row = await run_db(lambda db: db.execute(
+            select(Result.raw_data_url, Result.raw_data).where(Result.main_url == decoded_url)
+        ).first())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"DB error: {e}")
+    if not row:
+        try:
+            archived, _ = await run_in_threadpool(read_archived_result, decoded_url)
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"Archive error: {e}")
+        row = (archived.raw_data_url, archived.raw_data) if archived is not None else None
+    if not row:
+        raise HTTPException(status_code=404, detail=f"No report found for main_url: {decoded_url}")
+
+    raw_data_url, raw_data = row
+    if not raw_data_url:
+        return Response(content=raw_data or "", media_type="text/plain; charset=utf-8")
+    if minio_client is None:
+        raise HTTPException(status_code=503, detail="Object storage unavailable")
+    object_name = raw_data_url.split(f"{MINIO_BUCKET}/", 1)[-1]
+    try:
+        data = await run_in_threadpool(minio_client.get_object, MINIO_BUCKET, object_name)
+        text = gzip.decompress(data).decode("utf-8")
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Storage error: {e}")
+    return Response(content=text, media_type="text/plain; charset=utf-8")
@@ -15,10 +15,10 @@ Features:
 from __future__ import annotations
 
 # ========= Stdlib =========
-import os, io, re, gc, time, json, asyncio, threading, requests, hashlib, base64, uuid
-from typing import Dict, Any, List, Tuple
-from dataclasses import dataclass
-from collections import defaultdict
+import os, io, re, gc, time, json, asyncio, threading, requests, hashlib, base64, uuid, socket, itertools
+from typing import Dict, Any, List, Optional, Set, Tuple
+from dataclasses import dataclass, field
+from collections import defaultdict, Counter
 from urllib.parse import urlparse, urlsplit, parse_qs
 from concurrent.futures import ThreadPoolExecutor
 
@@ -36,6 +36,8 @@ from PIL import Image
 import pytesseract  # type: ignore
 import regex as regx  # type: ignore
 import yaml  # type: ignore
+from sqlalchemy import text as sql_text
+from sqlalchemy.orm import Session
 
 # QR (optional)
 try:
@@ -54,20 +56,31 @@ except Exception:
 
 # ========= Local project imports =========
 from config.settings import (
-    SessionLocal,
     MAX_IMGS as CFG_MAX_IMGS,
     MAX_IMG_BYTES as CFG_MAX_IMG_BYTES,
     opensearch_client,
     minio_client,
     MINIO_BUCKET,
     MINIO_ENDPOINT,
+    redis_client,
+    cache,
 )
-from models.hit_model import Result, Hit
-from libs.screenshot import capture_screenshot
+from models.hit_model import Hit, HitRecord
+from models.database_init import maintain_hit_partitions
+from libs.screenshot import capture_screenshot, check_visibility
+from libs.screenshot_stream import ScreenshotStream, create_stream
+from libs.screenshot_budget import ScreenshotBudget, domain_of
 from libs.renderer_integration import create_renderer_client
+from libs.js_predictor import (RenderHistory, predict, LANE_STATIC, LANE_RENDER_FIRST, LANE_RENDER_PARALLEL,
+                               THIN_RENDER_THRESHOLD)
 from libs.opensearch_indexer import OpenSearchIndexer
 from libs.dlq import dlq, FailedHit, FailedScreenshot
-from libs.metrics import increment_metric, get_all_metrics, export_metrics
+from libs.hit_writer import write_hits
+from libs.async_db import run_db, async_enabled
+from libs.result_writer import write_result
+from libs.match_index import MatchIndex
+from libs.archive import archive_cold_data, ARCHIVE_AFTER_DAYS
+from libs.metrics import increment_metric, get_metric, set_metric, observe_metric, get_all_metrics, export_metrics
 
 # ========= Tunables / Env =========
 # Dynamic resource allocation: Adapt to available CPU cores
@@ -76,18 +89,73 @@ MAX_CONCURRENT_PAGES   = int(os.environ.get("MAX_CONCURRENT_PAGES", str(min(_AVA
 CPU_WORKERS            = int(os.environ.get("CPU_WORKERS", str(min(_AVAILABLE_CPUS, 6))))  # Dynamic: up to 6, or CPU count
 IO_WORKERS             = int(os.environ.get("IO_WORKERS", str(min(_AVAILABLE_CPUS * 4, 32))))  # Dynamic: 4x CPU cores, max 32
 MAX_SCREENSHOT_WORKERS = int(os.environ.get("MAX_SCREENSHOT_WORKERS", str(min(_AVAILABLE_CPUS, 5))))  # Dynamic: up to CPU count, max 5
+# Check keyword visibility (no image) before screenshotting; only confident, visible hits get a screenshot.
+# Off by default until the renderer's /render/visibility path is verified end to end in a deployment.
+VISIBILITY_CHECK       = os.environ.get("VISIBILITY_CHECK", "false").lower() in ("1", "true", "yes")
+SCREENSHOT_MIN_CONFIDENCE = float(os.environ.get("SCREENSHOT_MIN_CONFIDENCE", "0.9"))
+VISIBLE_CONFIDENCE_BOOST  = float(os.environ.get("VISIBLE_CONFIDENCE_BOOST", "0.1"))
+HIDDEN_CONFIDENCE_FACTOR  = float(os.environ.get("HIDDEN_CONFIDENCE_FACTOR", "0.5"))
+# Coalesce screenshot jobs for the same page into one multi-keyword capture
+SCREENSHOT_COALESCE_WINDOW_MS    = int(os.environ.get("SCREENSHOT_COALESCE_WINDOW_MS", "300"))
+SCREENSHOT_COALESCE_MAX_KEYWORDS = int(os.environ.get("SCREENSHOT_COALESCE_MAX_KEYWORDS", "10"))
+# Screenshots finished before their hit was flushed wait this long for its id, then go to the DLQ
+SCREENSHOT_PARK_TIMEOUT_SEC      = float(os.environ.get("SCREENSHOT_PARK_TIMEOUT_SEC", "300"))
+SCREENSHOT_UPDATE_CHUNK          = int(os.environ.get("SCREENSHOT_UPDATE_CHUNK", "1000"))
+# "memory": in-process queue (default); "redis": Redis stream shared by all replicas, survives restarts
+SCREENSHOT_QUEUE_BACKEND         = os.environ.get("SCREENSHOT_QUEUE_BACKEND", "memory").lower()
+SCREENSHOT_STREAM_KEY            = os.environ.get("SCREENSHOT_STREAM_KEY", "screenshots:jobs")
+SCREENSHOT_STREAM_GROUP          = os.environ.get("SCREENSHOT_STREAM_GROUP", "screenshot-workers")
+# Unacknowledged entries idle this long are taken over from (presumably dead) consumers
+SCREENSHOT_STREAM_CLAIM_IDLE_MS  = int(os.environ.get("SCREENSHOT_STREAM_CLAIM_IDLE_MS", "180000"))
+# Stream entries a replica holds unacknowledged at once
+SCREENSHOT_STREAM_PREFETCH       = int(os.environ.get("SCREENSHOT_STREAM_PREFETCH", str(MAX_SCREENSHOT_WORKERS * SCREENSHOT_COALESCE_MAX_KEYWORDS)))
+# Screenshot budget (0 = unlimited): pages per task, pages per domain within a task (shrinks to
+# the floor as load rises), and the load (queue fill / renderer latency) at which only pages with
+# keywords new for their domain are still captured. Skipped jobs can be requested later.
+SCREENSHOT_TASK_BUDGET           = int(os.environ.get("SCREENSHOT_TASK_BUDGET", "500"))
+SCREENSHOT_DOMAIN_BUDGET         = int(os.environ.get("SCREENSHOT_DOMAIN_BUDGET", "50"))
+SCREENSHOT_DOMAIN_BUDGET_MIN     = int(os.environ.get("SCREENSHOT_DOMAIN_BUDGET_MIN", "5"))
+SCREENSHOT_SAMPLING_LOAD         = float(os.environ.get("SCREENSHOT_SAMPLING_LOAD", "0.5"))
+SCREENSHOT_TARGET_LATENCY_SEC    = float(os.environ.get("SCREENSHOT_TARGET_LATENCY_SEC", "15"))
+# Reuse screenshots across tasks while a page's analyzed text is unchanged
+SCREENSHOT_REUSE                 = os.environ.get("SCREENSHOT_REUSE", "true").lower() in ("1", "true", "yes")
+SCREENSHOT_REUSE_TTL_SEC         = int(os.environ.get("SCREENSHOT_REUSE_TTL_SEC", str(7 * 24 * 3600)))
 
 OCR_MIN_DIM            = int(os.environ.get("OCR_MIN_DIM", "200"))
 IMG_HTTP_TIMEOUT_SEC   = float(os.environ.get("IMG_HTTP_TIMEOUT_SEC", "8"))
 
 HIT_BATCH_SIZE         = int(os.environ.get("HIT_BATCH_SIZE", "200"))
 PG_FLUSH_INTERVAL_SEC  = float(os.environ.get("PG_FLUSH_INTERVAL_SEC", "1.0"))
+# Hit insert path: copy_staging (COPY + ON CONFLICT merge), copy (COPY into hits) or orm
+HIT_WRITER             = os.environ.get("HIT_WRITER", "copy_staging").lower()
+# Batches written at once on DB_POOL while the next one fills
+PG_FLUSH_CONCURRENCY   = int(os.environ.get("PG_FLUSH_CONCURRENCY", "2"))
+PG_FLUSH_MAX_BATCH_BYTES = int(os.environ.get("PG_FLUSH_MAX_BATCH_BYTES", str(8 * 1024 * 1024)))
+# statement_timeout for a flush's write; the server aborts it, the client never cancels it
+PG_FLUSH_TIMEOUT_SEC   = float(os.environ.get("PG_FLUSH_TIMEOUT_SEC", "30"))
+# Backpressure: above this many queued + in-flight hit bytes, record_hit waits up to
+# HIT_ENQUEUE_WAIT_SEC for room, then spills the hit to the DLQ
+HIT_QUEUE_MAX_BYTES    = int(os.environ.get("HIT_QUEUE_MAX_BYTES", str(64 * 1024 * 1024)))
+HIT_ENQUEUE_WAIT_SEC   = float(os.environ.get("HIT_ENQUEUE_WAIT_SEC", "5"))
+# Creates upcoming hits partitions and applies retention (models/database_init.py)
+HITS_PARTITION_CHECK_SEC = float(os.environ.get("HITS_PARTITION_CHECK_SEC", str(6 * 3600)))
+# Moves hits/results older than ARCHIVE_AFTER_DAYS to Parquet in MinIO (libs/archive.py)
+ARCHIVE_INTERVAL_SEC   = float(os.environ.get("ARCHIVE_INTERVAL_SEC", str(24 * 3600)))
 
 MAX_IMGS               = int(os.environ.get("MAX_IMGS", str(CFG_MAX_IMGS)))
 MAX_IMG_BYTES          = int(os.environ.get("MAX_IMG_BYTES", str(CFG_MAX_IMG_BYTES)))
 
 RENDERER_URL           = os.environ.get("RENDERER_URL", "http://localhost:9000")
 PW_DOMAINS_FILE        = os.environ.get("PW_DOMAINS_FILE", "/data/playwright_domains.txt")
+# Ask the renderer for in-browser extracted text instead of the full DOM on escalation
+RENDERER_TEXT_MODE     = os.environ.get("RENDERER_TEXT_MODE", "true").lower() in ("1", "true", "yes")
+# Coalesce concurrent render fallbacks into one streaming /render/batch call
+RENDER_BATCH           = os.environ.get("RENDER_BATCH", "true").lower() in ("1", "true", "yes")
+RENDER_BATCH_WINDOW_MS = int(os.environ.get("RENDER_BATCH_WINDOW_MS", "50"))
+RENDER_BATCH_MAX       = int(os.environ.get("RENDER_BATCH_MAX", "16"))
+# Route pages to static / render-parallel / render-first lanes from static HTML features
+JS_PREDICTOR           = os.environ.get("JS_PREDICTOR", "true").lower() in ("1", "true", "yes")
+DOMAIN_STATS_FILE      = os.environ.get("DOMAIN_STATS_FILE", os.path.join(os.path.dirname(PW_DOMAINS_FILE), "domain_stats.json"))
 
 # ========= spaCy NLP Validation Control =========
 # Set to True to enable spaCy NLP validation, False to skip NLP validation
@@ -132,6 +200,84 @@ try:
 except Exception as e:
     print(f"[renderer:error] Failed to initialize: {e}", flush=True)
 
+# ========= Render batching =========
+def _resolve(fut: asyncio.Future, value) -> None:
+    if not fut.done():
+        fut.set_result(value)
+
+class _RenderBatcher:
+    """
+    Collects render fallbacks issued within RENDER_BATCH_WINDOW_MS (or until
+    RENDER_BATCH_MAX are pending) and sends them as one /render/batch request.
+    A single IO_POOL thread reads the NDJSON stream and resolves each caller's
+    future as its line arrives, instead of one blocked thread per URL.
+    """
+
+    def __init__(self, window_sec: float, max_size: int):
+        self.window_sec = window_sec
+        self.max_size = max_size
+        self._pending: Dict[str, List[Tuple[str, asyncio.Future]]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+
+    async def render(self, url: str, mode: str) -> Optional[Dict[str, Any]]:
+        """Render result dict for url (as returned by /render), or None on failure."""
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        pending = self._pending.setdefault(mode, [])
+        pending.append((url, fut))
+        if len(pending) >= self.max_size:
+            self._flush(mode)
+        elif mode not in self._timers:
+            self._timers[mode] = loop.call_later(self.window_sec, self._flush, mode)
+        return await fut
+
+    def _flush(self, mode: str) -> None:
+        timer = self._timers.pop(mode, None)
+        if timer:
+            timer.cancel()
+        batch = self._pending.pop(mode, [])
+        if batch:
+            loop = asyncio.get_running_loop()
+            increment_metric("render_batches")
+            increment_metric("render_batch_urls", len(batch))
+            loop.run_in_executor(IO_POOL, self._stream, loop, mode, batch)
+
+    def _stream(self, loop: asyncio.AbstractEventLoop, mode: str, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        urls: List[str] = []
+        waiting: Dict[int, List[asyncio.Future]] = {}
+        index_of: Dict[str, int] = {}
+        for url, fut in batch:
+            if url not in index_of:
+                index_of[url] = len(urls)
+                urls.append(url)
+            waiting.setdefault(index_of[url], []).append(fut)
+        try:
+            for item in renderer_client.render_batch(urls, mode=mode):
+                result = item if item.get("ok") else None
+                if result is None:
+                    print(f"[render:batch:fail] {item.get('url')} -> {item.get('error')}", flush=True)
+                for fut in waiting.pop(item.get("index"), []):
+                    loop.call_soon_threadsafe(_resolve, fut, result)
+        except Exception as e:
+            print(f"[render:batch:error] {len(urls)} urls -> {e}", flush=True)
+        finally:
+            # anything the stream never answered counts as a failed render
+            for futs in waiting.values():
+                for fut in futs:
+                    loop.call_soon_threadsafe(_resolve, fut, None)
+
+_render_batcher = _RenderBatcher(RENDER_BATCH_WINDOW_MS / 1000, RENDER_BATCH_MAX)
+
+async def _render_page(url: str, mode: str) -> Optional[Dict[str, Any]]:
+    """Render fallback via the batcher, or one /render call per URL when RENDER_BATCH is off."""
+    if RENDER_BATCH:
+        return await _render_batcher.render(url, mode)
+    loop = asyncio.get_event_loop()
+    if mode == "text":
+        return await loop.run_in_executor(IO_POOL, lambda: renderer_client.render_text(url))
+    content = await loop.run_in_executor(IO_POOL, lambda: renderer_client.render_html(url))
+    return {"ok": True, "url": url, "content": content} if content else None
+
 # ========= OpenSearch Indexer =========
 opensearch_indexer = None
 try:
@@ -146,7 +292,8 @@ except Exception as e:
 MAIN_LOOP: asyncio.AbstractEventLoop | None = None
 # Dynamic queue size: Scale based on available CPU cores (more CPU = larger queues)
 _DYNAMIC_QUEUE_SIZE = min(_AVAILABLE_CPUS * 500, 4000)  # 500x CPU cores, max 4000
-hit_queue: asyncio.Queue[Hit]  = asyncio.Queue(maxsize=_DYNAMIC_QUEUE_SIZE)
+# (enqueued_at, size_bytes, hit); bounded by bytes (HIT_QUEUE_MAX_BYTES), not item count
+hit_queue: asyncio.Queue[Tuple[float, int, HitRecord]] = asyncio.Queue()
 
 @dataclass
 class ScreenshotJob:
@@ -154,17 +301,36 @@ class ScreenshotJob:
     keyword: str
     main_url: str
     task_id: str
+    confidence: float = 1.0
+    # the queued hit; its id is set when pg_flusher inserts it (None for DLQ retries)
+    hit: Optional[HitRecord] = None
+    # Redis stream entry id (SCREENSHOT_QUEUE_BACKEND=redis), acknowledged once the job is done
+    stream_id: Optional[str] = None
+    # requested on demand after a budget skip: not subject to the budget again
+    forced: bool = False
+    # hash of the analyzed page text, for the screenshot reuse index
+    content_hash: Optional[str] = None
 
 _screenshot_queue: asyncio.Queue[ScreenshotJob] | None = None
 
 # Matching & batch accumulators
-_match_lock = threading.Lock()
+# (url, keyword) pairs already recorded per task (keyed by main_url), lock-striped by task
+MATCH_INDEX_STRIPES      = int(os.environ.get("MATCH_INDEX_STRIPES", "64"))
+MATCH_INDEX_MAX_PER_TASK = int(os.environ.get("MATCH_INDEX_MAX_PER_TASK", "100000"))  # 0 = unbounded
+_match_index = MatchIndex(MATCH_INDEX_STRIPES, MATCH_INDEX_MAX_PER_TASK)
+_html_lock = threading.Lock()  # guards _html_storage / _html_saved
 _batch_lock = threading.Lock()
-match_buffer: dict[str, dict] = defaultdict(lambda: {"sub_urls": set(), "matches": []})
 _batch_accumulator: dict[str, dict] = defaultdict(lambda: {
     "total_pages": 0, "total_matches": 0, "categories": set(),
-    "keywords": [], "snippets": [], "sub_urls": [], "last_batch": 0
+    "keyword_counts": Counter(), "url_matches": {},  # keyword -> matches, sub_url -> matches
+    "snippets": [], "snippet_bytes": 0, "last_batch": 0
 })
+# snippets kept per task for the result's raw data (stored gzipped in MinIO)
+RESULT_SNIPPETS_MAX_BYTES = int(os.environ.get("RESULT_SNIPPETS_MAX_BYTES", str(16 * 1024 * 1024)))
+# inline raw_data cap, used only when MinIO is unavailable
+RESULT_RAW_DATA_INLINE_MAX = 1000000
+# statement_timeout for the result upsert; like hit flushes, never cancelled client-side
+RESULT_WRITE_TIMEOUT_SEC = float(os.environ.get("RESULT_WRITE_TIMEOUT_SEC", "30"))
 # HTML storage: track URLs with hits and their HTML content
 # Use OrderedDict for LRU behavior
 from collections import OrderedDict
@@ -175,98 +341,422 @@ _DYNAMIC_HTML_STORAGE = min(_AVAILABLE_CPUS * 125, 1000)  # 125x CPU cores, max
 _HTML_STORAGE_MAX_SIZE = int(os.environ.get("HTML_STORAGE_MAX_SIZE", str(_DYNAMIC_HTML_STORAGE)))
 
 # ========= Screenshot workers =========
+@dataclass
+class ScreenshotGroup:
+    """Screenshot jobs for one page, served by a single multi-keyword capture."""
+    sub_url: str
+    main_url: str
+    task_id: str
+    jobs: List[ScreenshotJob]
+    captured: List[str] = field(default_factory=list)  # keywords the stored screenshot covers
+
+    def keywords(self) -> List[str]:
+        return list(dict.fromkeys(j.keyword for j in self.jobs))
+
+    @property
+    def forced(self) -> bool:
+        return any(j.forced for j in self.jobs)
+
+# (priority, seq, group): forced groups first, then most new keywords, then highest confidence
+_screenshot_groups: asyncio.PriorityQueue[Tuple[Tuple, int, ScreenshotGroup]] | None = None
+_group_seq = itertools.count()
+_screenshot_coalescing = 0  # jobs held in an open coalescing window
+# task_id -> screenshot jobs in the local pipeline (queued, coalescing or being captured)
+_screenshot_task_jobs: Dict[str, int] = defaultdict(int)
+# completed tasks whose budget is forgotten once their screenshot jobs drain
+_budget_finished_tasks: Set[str] = set()
+
+_screenshot_budget = ScreenshotBudget(
+    task_cap=SCREENSHOT_TASK_BUDGET,
+    domain_cap=SCREENSHOT_DOMAIN_BUDGET,
+    domain_floor=SCREENSHOT_DOMAIN_BUDGET_MIN,
+    sampling_load=SCREENSHOT_SAMPLING_LOAD,
+    target_latency_sec=SCREENSHOT_TARGET_LATENCY_SEC,
+)
+
+def _group_priority(group: ScreenshotGroup) -> Tuple:
+    confidence = max(j.confidence for j in group.jobs)
+    return (0 if group.forced else 1,) + _screenshot_budget.priority(
+        group.task_id, domain_of(group.sub_url), group.keywords(), confidence)
+
+def _track_screenshot_job(task_id: str) -> None:
+    _screenshot_task_jobs[task_id] += 1
+
+def _screenshot_jobs_done(task_id: str, count: int) -> None:
+    left = _screenshot_task_jobs.get(task_id, 0) - count
+    if left > 0:
+        _screenshot_task_jobs[task_id] = left
+        return
+    _screenshot_task_jobs.pop(task_id, None)
+    if task_id in _budget_finished_tasks:
+        _budget_finished_tasks.discard(task_id)
+        _screenshot_budget.forget(task_id)
+
+def _forget_screenshot_budget(task_id: str) -> None:
+    """Drop a completed task's budget now, or once its queued screenshot jobs have drained."""
+    if _screenshot_task_jobs.get(task_id):
+        _budget_finished_tasks.add(task_id)
+    else:
+        _screenshot_budget.forget(task_id)
+
+def _admit_group(group: ScreenshotGroup) -> bool:
+    """Apply the screenshot budget; skipped jobs are recorded for on-demand capture."""
+    if group.forced:
+        increment_metric("screenshots_forced", len(group.jobs))
+        return True
+    capacity = 2 * max(1, _screenshot_queue.maxsize)
+    load = _screenshot_budget.load((_screenshot_queue.qsize() + _screenshot_groups.qsize()) / capacity)
+    set_metric("screenshot_load", round(load, 2))
+    set_metric("screenshot_domain_budget", _screenshot_budget.domain_limit(load))
+    reason = _screenshot_budget.admit(group.task_id, domain_of(group.sub_url), group.keywords(), load)
+    if reason is None:
+        return True
+    increment_metric(f"screenshots_skipped_{reason}", len(group.jobs))
+    print(f"[screenshot:skip] {group.sub_url} reason={reason} keywords={len(group.keywords())} load={load:.2f}", flush=True)
+    for job in group.jobs:
+        dlq.record_skipped_screenshot(FailedScreenshot(
+            sub_url=job.sub_url,
+            keyword=job.keyword,
+            main_url=job.main_url,
+            task_id=job.task_id,
+            error=reason,
+        ))
+    return False
+
+async def _screenshot_coalescer():
+    """
+    Groups screenshot jobs by (task_id, sub_url) for SCREENSHOT_COALESCE_WINDOW_MS
+    after the first job of a page arrives (or until SCREENSHOT_COALESCE_MAX_KEYWORDS
+    distinct keywords are pending) and hands each group to the workers.
+    """
+    global _screenshot_coalescing
+    assert _screenshot_queue is not None and _screenshot_groups is not None
+    window = SCREENSHOT_COALESCE_WINDOW_MS / 1000
+    open_groups: Dict[Tuple[str, str], Tuple[float, ScreenshotGroup]] = {}
+    while True:
+        try:
+            timeout = None
+            if open_groups:
+                timeout = max(0.0, min(t for t, _ in open_groups.values()) - time.monotonic())
+            try:
+                job = await asyncio.wait_for(_screenshot_queue.get(), timeout)
+            except asyncio.TimeoutError:
+                job = None
+            if job is not None:
+                key = (job.task_id, job.sub_url)
+                if key not in open_groups:
+                    open_groups[key] = (time.monotonic() + window,
+                                        ScreenshotGroup(job.sub_url, job.main_url, job.task_id, []))
+                open_groups[key][1].jobs.append(job)
+                _screenshot_coalescing += 1
+                _screenshot_queue.task_done()
+
+            now = time.monotonic()
+            due = [k for k, (deadline, g) in open_groups.items()
+                   if deadline <= now or len(g.keywords()) >= SCREENSHOT_COALESCE_MAX_KEYWORDS]
+            if not due:
+                continue
+            jobs_in_window = 0
+            for key in due:
+                _, group = open_groups.pop(key)
+                jobs_in_window += len(group.jobs)
+                await _screenshot_groups.put((_group_priority(group), next(_group_seq), group))
+                _screenshot_coalescing -= len(group.jobs)
+            increment_metric("screenshot_jobs_coalesced", jobs_in_window)
+            increment_metric("screenshot_groups", len(due))
+            set_metric("screenshot_coalesce_ratio", round(jobs_in_window / len(due), 2))
+        except Exception as e:
+            print(f"[screenshot:coalesce:error] {e}", flush=True)
+            await asyncio.sleep(0.25)
+
 async def _screenshot_worker():
-    assert _screenshot_queue is not None
+    assert _screenshot_groups is not None
     while True:
-        job = await _screenshot_queue.get()
+        _, _, group = await _screenshot_groups.get()
+        parked: List[ScreenshotJob] = []
+        admitted = False
         try:
-            await _process_screenshot_job(job)
+            admitted = _admit_group(group)
+            if admitted:
+                parked = await _process_screenshot_group(group)
         except Exception as e:
-            print(f"[screenshot:error] {job.sub_url} -> {e}", flush=True)
+            print(f"[screenshot:error] {group.sub_url} -> {e}", flush=True)
         finally:
-            _screenshot_queue.task_done()
+            # the budget keeps the slot only if the page was actually captured
+            if admitted and not group.forced:
+                _screenshot_budget.settle(group.task_id, domain_of(group.sub_url), group.captured)
+            _screenshot_jobs_done(group.task_id, len(group.jobs))
+            # parked jobs are acknowledged once their path is written
+            parked_ids = {id(j) for j in parked}
+            await _ack_stream_jobs([j for j in group.jobs if id(j) not in parked_ids])
+            _screenshot_groups.task_done()
+
+# ========= Redis stream backend =========
+_screenshot_stream: ScreenshotStream | None = None
+_STREAM_CONSUMER = f"{socket.gethostname()}-{os.getpid()}"
+# entry id -> hit record for jobs this replica produced, so it can still update by primary key
+_stream_hits: OrderedDict[str, HitRecord] = OrderedDict()
+_stream_lock = threading.Lock()
+_stream_inflight = 0  # entries read from the stream and not yet acknowledged
+
+def _enqueue_screenshot(job: ScreenshotJob) -> None:
+    """Queue a screenshot job on the configured backend. Raises asyncio.QueueFull when it cannot be queued."""
+    if _screenshot_stream is not None:
+        try:
+            entry_id = _screenshot_stream.add({
+                "sub_url": job.sub_url, "keyword": job.keyword, "main_url": job.main_url,
+                "task_id": job.task_id, "confidence": str(job.confidence),
+                "forced": "1" if job.forced else "0",
+                "content_hash": job.content_hash or "",
+            })
+        except Exception as e:
+            # Redis trouble: keep the job in-process rather than lose it
+            increment_metric("screenshot_stream_errors")
+            print(f"[screenshot:stream:error] add {job.sub_url} -> {e}", flush=True)
+        else:
+            if job.hit is not None:
+                with _stream_lock:
+                    _stream_hits[entry_id] = job.hit
+                    while len(_stream_hits) > _DYNAMIC_QUEUE_SIZE:
+                        _stream_hits.popitem(last=False)
+            return
+    _screenshot_queue.put_nowait(job)
+    _track_screenshot_job(job.task_id)
 
-async def _process_screenshot_job(job: ScreenshotJob):
+def _job_from_entry(entry_id: str, fields: Dict[str, str]) -> ScreenshotJob | None:
+    try:
+        job = ScreenshotJob(
+            sub_url=fields["sub_url"],
+            keyword=fields["keyword"],
+            main_url=fields["main_url"],
+            task_id=fields["task_id"],
+            confidence=float(fields.get("confidence", 1.0)),
+            stream_id=entry_id,
+            forced=fields.get("forced") == "1",
+            content_hash=fields.get("content_hash") or None,
+        )
+    except (KeyError, ValueError):
+        return None
+    with _stream_lock:
+        job.hit = _stream_hits.pop(entry_id, None)
+    return job
+
+async def _ack_stream_jobs(jobs: List[ScreenshotJob]) -> None:
+    global _stream_inflight
+    ids = [j.stream_id for j in jobs if j.stream_id]
+    if not ids or _screenshot_stream is None:
+        return
+    _stream_inflight -= len(ids)
     loop = asyncio.get_event_loop()
-    max_retries = 3
-    retry_delay = 2.0
-    
-    for attempt in range(max_retries):
+    try:
+        await loop.run_in_executor(IO_POOL, lambda: _screenshot_stream.ack(ids))
+    except Exception as e:
+        # unacknowledged entries are reclaimed and redone after SCREENSHOT_STREAM_CLAIM_IDLE_MS
+        increment_metric("screenshot_stream_errors")
+        print(f"[screenshot:stream:error] ack {len(ids)} -> {e}", flush=True)
+
+async def _screenshot_stream_consumer():
+    """
+    Feeds stream entries into the local coalescing pipeline, holding at most
+    SCREENSHOT_STREAM_PREFETCH unacknowledged, and every half claim interval
+    takes over entries that dead consumers left pending.
+    """
+    global _stream_inflight
+    assert _screenshot_stream is not None and _screenshot_queue is not None
+    loop = asyncio.get_event_loop()
+    last_claim = 0.0
+    while True:
         try:
-            data = await loop.run_in_executor(IO_POOL, lambda: capture_screenshot(job.sub_url, job.keyword))
-            if not data:
-                if attempt < max_retries - 1:
-                    await asyncio.sleep(retry_delay * (attempt + 1))
+            room = SCREENSHOT_STREAM_PREFETCH - _stream_inflight
+            if room <= 0:
+                await asyncio.sleep(0.1)
+                continue
+            entries = []
+            if time.monotonic() - last_claim >= SCREENSHOT_STREAM_CLAIM_IDLE_MS / 2000:
+                last_claim = time.monotonic()
+                entries = await loop.run_in_executor(
+                    IO_POOL, lambda: _screenshot_stream.reclaim(_STREAM_CONSUMER, room))
+                if entries:
+                    increment_metric("screenshot_stream_reclaimed", len(entries))
+                    print(f"[screenshot:stream:reclaim] {len(entries)} entries", flush=True)
+                set_metric("screenshot_stream_backlog", await loop.run_in_executor(IO_POOL, _screenshot_stream.backlog))
+            if not entries:
+                entries = await loop.run_in_executor(
+                    IO_POOL, lambda: _screenshot_stream.read(_STREAM_CONSUMER, room, 1000))
+            for entry_id, fields in entries:
+                job = _job_from_entry(entry_id, fields)
+                if job is None:
+                    print(f"[screenshot:stream:bad_entry] {entry_id} {fields}", flush=True)
+                    await loop.run_in_executor(IO_POOL, lambda: _screenshot_stream.ack([entry_id]))
                     continue
-                else:
-                    increment_metric("screenshot_failures")
-                    failed_screenshot = FailedScreenshot(
-                        sub_url=job.sub_url,
-                        keyword=job.keyword,
-                        main_url=job.main_url,
-                        task_id=job.task_id,
-                        error="screenshot_capture_failed",
-                        retry_count=attempt + 1
-                    )
-                    dlq.enqueue_screenshot(failed_screenshot)
-                    return
+                _stream_inflight += 1
+                increment_metric("screenshot_stream_read")
+                _track_screenshot_job(job.task_id)
+                await _screenshot_queue.put(job)
+        except Exception as e:
+            increment_metric("screenshot_stream_errors")
+            print(f"[screenshot:stream:error] {e}", flush=True)
+            await asyncio.sleep(1.0)
 
-            storage_url = await loop.run_in_executor(IO_POOL, lambda: _store_screenshot(job, data))
-            if not storage_url:
-                if attempt < max_retries - 1:
-                    await asyncio.sleep(retry_delay * (attempt + 1))
-                    continue
-                else:
-                    increment_metric("screenshot_failures")
-                    increment_metric("minio_errors")
-                    failed_screenshot = FailedScreenshot(
-                        sub_url=job.sub_url,
-                        keyword=job.keyword,
-                        main_url=job.main_url,
-                        task_id=job.task_id,
-                        error="screenshot_storage_failed",
-                        retry_count=attempt + 1
-                    )
-                    dlq.enqueue_screenshot(failed_screenshot)
-                    return
+async def _visibility_filter(group: ScreenshotGroup) -> Tuple[List[ScreenshotJob], Optional[Dict[str, Any]]]:
+    """
+    Cheap visibility check (all keywords of the page at once) before a screenshot:
+    visible keywords raise the hit's confidence, hidden ones (SEO text, zero-size,
+    transparent) lower it. Returns the jobs that should still get a screenshot, and
+    the screenshot when the same render took it: the renderer captures the page
+    when a keyword that would pass the gate once visible is visible (or not
+    literal page text), so a captured hit costs one page load, not two.
+    """
+    loop = asyncio.get_event_loop()
+    candidates = list(dict.fromkeys(
+        j.keyword for j in group.jobs if min(1.0, j.confidence + VISIBLE_CONFIDENCE_BOOST) >= SCREENSHOT_MIN_CONFIDENCE))
+    started = time.monotonic()
+    res = await loop.run_in_executor(
+        IO_POOL, lambda: check_visibility(group.sub_url, group.keywords(), screenshot_keywords=candidates or None))
+    if res is None:
+        # failed once (not retried): every job is screenshotted as without the check
+        increment_metric("visibility_failures")
+        return list(group.jobs), None
+    shot = res if res.get("screenshot_b64") else None
+    if shot:
+        _screenshot_budget.observe_latency(time.monotonic() - started)
+        increment_metric("visibility_screenshots")
+    per_keyword = res.get("keywords") or {}
+    keep: List[ScreenshotJob] = []
+    for job in group.jobs:
+        info = per_keyword.get(job.keyword)
+        if not info or not info.get("matches"):
+            # the keyword is not literal page text (e.g. "upi-handle"): screenshot as before
+            increment_metric("visibility_inconclusive")
+            keep.append(job)
+            continue
+
+        visible = bool(info.get("visible"))
+        if visible:
+            confidence = min(1.0, job.confidence + VISIBLE_CONFIDENCE_BOOST)
+            increment_metric("visibility_visible")
+        else:
+            confidence = job.confidence * HIDDEN_CONFIDENCE_FACTOR
+            increment_metric("visibility_hidden")
+        await _park_hit_score(job, confidence)
+
+        if visible and confidence >= SCREENSHOT_MIN_CONFIDENCE:
+            keep.append(job)
+            continue
+        increment_metric("screenshots_skipped_visibility")
+        print(f"[screenshot:skip] {job.sub_url} - {job.keyword} visible={visible} confidence={confidence:.2f}", flush=True)
+    return keep, (shot if keep else None)
+
+def _dead_letter(jobs: List[ScreenshotJob], error: str, retry_count: int) -> None:
+    for job in jobs:
+        dlq.enqueue_screenshot(FailedScreenshot(
+            sub_url=job.sub_url,
+            keyword=job.keyword,
+            main_url=job.main_url,
+            task_id=job.task_id,
+            error=error,
+            retry_count=retry_count,
+        ))
+
+async def _process_screenshot_group(group: ScreenshotGroup) -> List[ScreenshotJob]:
+    """
+    One capture + upload for all keywords of a page, fanned out to each job's hit.
+    Returns the jobs whose path was parked for the batched update.
+    """
+    loop = asyncio.get_event_loop()
+    jobs, data = await _visibility_filter(group) if VISIBILITY_CHECK else (group.jobs, None)
+    if not jobs:
+        return []
+    keywords = list(dict.fromkeys(j.keyword for j in jobs))
+    lead = jobs[0]
+    max_retries = 3
+    retry_delay = 2.0
 
-            # Transaction: assign screenshot to hit (with retry)
-            success = await loop.run_in_executor(DB_POOL, lambda: _assign_screenshot_to_hit(job, storage_url))
-            if success:
-                return  # Success
+    storage_url = None
+    error = "screenshot_capture_failed"
+    if data:
+        # full-page screenshot from the visibility render serves every kept keyword
+        storage_url = await loop.run_in_executor(IO_POOL, lambda: _store_screenshot(lead, data))
+        error = "screenshot_storage_failed"
+    for attempt in range(max_retries):
+        if storage_url:
+            break
+        try:
+            started = time.monotonic()
+            data = await loop.run_in_executor(
+                IO_POOL,
+                lambda: capture_screenshot(group.sub_url, lead.keyword,
+                                           keywords=keywords if len(keywords) > 1 else None),
+            )
+            _screenshot_budget.observe_latency(time.monotonic() - started)
+            if data:
+                storage_url = await loop.run_in_executor(IO_POOL, lambda: _store_screenshot(lead, data))
+                error = "screenshot_capture_failed" if storage_url else "screenshot_storage_failed"
             else:
-                if attempt < max_retries - 1:
-                    await asyncio.sleep(retry_delay * (attempt + 1))
-                    continue
-                else:
-                    increment_metric("screenshot_failures")
-                    failed_screenshot = FailedScreenshot(
-                        sub_url=job.sub_url,
-                        keyword=job.keyword,
-                        main_url=job.main_url,
-                        task_id=job.task_id,
-                        error="screenshot_db_assignment_failed",
-                        retry_count=attempt + 1
-                    )
-                    dlq.enqueue_screenshot(failed_screenshot)
-                    return
+                error = "screenshot_capture_failed"
         except Exception as e:
-            if attempt < max_retries - 1:
-                await asyncio.sleep(retry_delay * (attempt + 1))
-                continue
-            else:
-                increment_metric("screenshot_failures")
-                failed_screenshot = FailedScreenshot(
-                    sub_url=job.sub_url,
-                    keyword=job.keyword,
-                    main_url=job.main_url,
-                    task_id=job.task_id,
-                    error=str(e),
-                    retry_count=attempt + 1
-                )
-                dlq.enqueue_screenshot(failed_screenshot)
-                print(f"[screenshot:error] {job.sub_url} -> {e} (all retries exhausted)", flush=True)
-                return
+            error = str(e)
+            print(f"[screenshot:error] {group.sub_url} attempt {attempt + 1}/{max_retries} -> {e}", flush=True)
+        if storage_url:
+            break
+        if attempt < max_retries - 1:
+            await asyncio.sleep(retry_delay * (attempt + 1))
+
+    if not storage_url:
+        increment_metric("screenshot_failures")
+        if error == "screenshot_storage_failed":
+            increment_metric("minio_errors")
+        _dead_letter(jobs, error, max_retries)
+        return []
+    increment_metric("screenshot_captures")
+    group.captured = keywords
+    if SCREENSHOT_REUSE:
+        image_bytes = len(data.get("screenshot_b64") or "") * 3 // 4
+        loop.run_in_executor(IO_POOL, _index_screenshot, jobs, storage_url, image_bytes)
+
+    # hits queued by this process are updated by primary key in the next batched UPDATE
+    parked = [j for j in jobs if j.hit is not None]
+    for job in parked:
+        _park_screenshot_path(job, storage_url)
+    pending = [j for j in jobs if j.hit is None]
+    if not pending:
+        return parked
+
+    # DLQ retries (and jobs from other replicas) have no hit reference: look the hit up
+    # (with retry for hits not flushed yet)
+    for attempt in range(max_retries):
+        pending = await run_db(_assign_screenshot_to_hits, pending, storage_url, executor=DB_POOL)
+        if not pending:
+            return parked
+        if attempt < max_retries - 1:
+            await asyncio.sleep(retry_delay * (attempt + 1))
+    increment_metric("screenshot_failures")
+    _dead_letter(pending, "screenshot_db_assignment_failed", max_retries)
+    return parked
+
+async def request_skipped_screenshots(task_id: str, limit: int = 100) -> Dict[str, Any]:
+    """Queue up to `limit` screenshots the budget skipped for a task, bypassing the budget."""
+    await _ensure_screenshot_workers()
+    queued = 0
+    skipped = dlq.pop_skipped_screenshots(task_id, limit)
+    for i, item in enumerate(skipped):
+        job = ScreenshotJob(
+            sub_url=item.sub_url,
+            keyword=item.keyword,
+            main_url=item.main_url,
+            task_id=item.task_id,
+            forced=True,
+        )
+        try:
+            _enqueue_screenshot(job)
+            queued += 1
+        except asyncio.QueueFull:
+            # put the rest back for a later request
+            for rest in skipped[i:]:
+                dlq.record_skipped_screenshot(rest)
+            break
+    increment_metric("screenshots_requested", queued)
+    return {"task_id": task_id, "queued": queued, "remaining": dlq.skipped_screenshots(task_id, 0).get("count", 0)}
 
 # ========= DLQ Retry Worker =========
 async def _dlq_retry_worker():
@@ -279,22 +769,10 @@ async def _dlq_retry_worker():
             failed_hit = dlq.dequeue_hit()
             if failed_hit and failed_hit.retry_count < 5:
                 try:
-                    hit = Hit(
-                        task_id=failed_hit.task_id,
-                        main_url=failed_hit.main_url,
-                        sub_url=failed_hit.sub_url,
-                        category=failed_hit.category,
-                        matched_keyword=failed_hit.matched_keyword,
-                        snippet=failed_hit.snippet,
-                        screenshot_path=None,
-                        timestamp=failed_hit.timestamp,
-                        source=failed_hit.source,
-                        confident_score=failed_hit.confident_score
-                    )
-                    try:
-                        hit_queue.put_nowait(hit)
+                    hit = failed_hit.to_record()
+                    if _enqueue_hit(hit):
                         print(f"[dlq:retry:hit:success] {failed_hit.sub_url} - {failed_hit.matched_keyword}", flush=True)
-                    except asyncio.QueueFull:
+                    else:
                         # Re-queue with incremented retry count
                         failed_hit.retry_count += 1
                         dlq.enqueue_hit(failed_hit)
@@ -316,7 +794,7 @@ async def _dlq_retry_worker():
                     )
                     try:
                         if _screenshot_queue:
-                            _screenshot_queue.put_nowait(job)
+                            _enqueue_screenshot(job)
                             print(f"[dlq:retry:screenshot:success] {failed_screenshot.sub_url} - {failed_screenshot.keyword}", flush=True)
                         else:
                             failed_screenshot.retry_count += 1
@@ -386,35 +864,112 @@ def _store_screenshot(job: ScreenshotJob, payload: Dict[str, Any]) -> str | None
     
     return None
 
-def _assign_screenshot_to_hit(job: ScreenshotJob, storage_url: str) -> bool:
-    """Assign screenshot to hit. Returns True on success, False on failure."""
-    db = SessionLocal()
+def _update_hits_by_id(db: Session, column: str, sql_type: str, rows: Dict[Tuple[int, int], Any],
+                       only_null: bool = False) -> Optional[int]:
+    """
+    Set one column by hit primary key (id, timestamp) with one UPDATE ... FROM (VALUES ...)
+    per chunk; the timestamp lets the planner prune to the hit's partition.
+    Returns the number of rows updated, or None if the transaction failed.
+    """
     try:
-        hit = (
-            db.query(Hit)
+        items = list(rows.items())
+        updated = 0
+        for start in range(0, len(items), SCREENSHOT_UPDATE_CHUNK):
+            chunk = items[start:start + SCREENSHOT_UPDATE_CHUNK]
+            params: Dict[str, Any] = {}
+            values = []
+            for i, ((hit_id, ts), value) in enumerate(chunk):
+                params[f"id{i}"] = hit_id
+                params[f"ts{i}"] = ts
+                params[f"v{i}"] = value
+                values.append(f"(CAST(:id{i} AS BIGINT), CAST(:ts{i} AS BIGINT), CAST(:v{i} AS {sql_type}))")
+            result = db.execute(
+                sql_text(
+                    f"UPDATE {Hit.__tablename__} AS h SET {column} = v.value "
+                    f"FROM (VALUES {', '.join(values)}) AS v(id, ts, value) "
+                    f"WHERE h.id = v.id AND h.timestamp = v.ts" + (f" AND h.{column} IS NULL" if only_null else "")
+                ),
+                params,
+            )
+            updated += result.rowcount or 0
+        db.commit()
+        return updated
+    except Exception as exc:
+        db.rollback()
+        print(f"[hits:db:error] {column} batch of {len(rows)} -> {exc}", flush=True)
+        increment_metric("db_timeouts")
+        return None
+
+def _update_screenshot_paths(db: Session, rows: Dict[Tuple[int, int], str]) -> Optional[int]:
+    """Set screenshot_path (where still unset) by (hit id, timestamp); None if the transaction failed."""
+    return _update_hits_by_id(db, "screenshot_path", "TEXT", rows, only_null=True)
+
+def _update_hit_scores(db: Session, rows: Dict[Tuple[int, int], int]) -> Optional[int]:
+    """Set confident_score by (hit id, timestamp); None if the transaction failed."""
+    return _update_hits_by_id(db, "confident_score", "INTEGER", rows)
+
+def _assign_screenshot_to_hits(db: Session, jobs: List[ScreenshotJob], storage_url: str) -> List[ScreenshotJob]:
+    """Assign one screenshot to each job's hit in a single transaction. Returns the jobs left unassigned."""
+    try:
+        missing: List[ScreenshotJob] = []
+        for job in jobs:
+            hit = (
+                db.query(Hit)
+                .filter(
+                    Hit.task_id == job.task_id,
+                    Hit.sub_url == job.sub_url,
+                    Hit.matched_keyword == job.keyword,
+                    Hit.screenshot_path.is_(None),
+                )
+                .order_by(Hit.id.desc())
+                .first()
+            )
+            if not hit:
+                print(f"[screenshot:db:warn] No hit found for {job.sub_url} - {job.keyword}", flush=True)
+                missing.append(job)
+                continue
+            hit.screenshot_path = storage_url
+        db.commit()
+        if len(missing) < len(jobs):
+            print(f"[screenshot:stored] {jobs[0].sub_url} hits={len(jobs) - len(missing)} -> {storage_url}", flush=True)
+        return missing
+    except Exception as exc:
+        db.rollback()
+        print(f"[screenshot:db:error] {jobs[0].sub_url} -> {exc}", flush=True)
+        increment_metric("db_timeouts")
+        return jobs
+
+def _update_latest_hit_score(db: Session, job: ScreenshotJob, score: int) -> bool:
+    """
+    Set confident_score on the newest hit of the job's (task, page, keyword), for
+    jobs without a hit reference (DLQ retries, other replicas). True if a row changed.
+    """
+    try:
+        latest = (
+            db.query(Hit.id)
             .filter(
                 Hit.task_id == job.task_id,
                 Hit.sub_url == job.sub_url,
                 Hit.matched_keyword == job.keyword,
-                Hit.screenshot_path.is_(None),
             )
             .order_by(Hit.id.desc())
-            .first()
+            .limit(1)
+            .scalar_subquery()
+        )
+        updated = (
+            db.query(Hit)
+            .filter(Hit.id == latest)
+            .update({Hit.confident_score: score}, synchronize_session=False)
         )
-        if not hit:
-            print(f"[screenshot:db:warn] No hit found for {job.sub_url} - {job.keyword}", flush=True)
-            return False
-        hit.screenshot_path = storage_url
         db.commit()
-        print(f"[screenshot:stored] {job.sub_url} -> {storage_url}", flush=True)
-        return True
+        if not updated:
+            print(f"[visibility:db:warn] No hit found for {job.sub_url} - {job.keyword}", flush=True)
+        return bool(updated)
     except Exception as exc:
         db.rollback()
-        print(f"[screenshot:db:error] {job.sub_url} -> {exc}", flush=True)
+        print(f"[visibility:db:error] {job.sub_url} -> {exc}", flush=True)
         increment_metric("db_timeouts")
         return False
-    finally:
-        db.close()
 
 def _safe_slug(value: str) -> str:
     value = (value or "").lower()
@@ -437,13 +992,115 @@ def _minio_public_url(object_name: str) -> str:
     endpoint = MINIO_ENDPOINT.split("://")[-1].rstrip("/")
     return f"{endpoint}/{MINIO_BUCKET}/{object_name}" if endpoint else f"{MINIO_BUCKET}/{object_name}"
 
+# ========= Screenshot path updates =========
+# (job, storage_url, parked_at) for screenshots waiting to be written to their hit
+_parked_paths: List[Tuple[ScreenshotJob, str, float]] = []
+# (hit, confident_score, parked_at) for visibility-adjusted scores waiting for their hit's id
+_parked_scores: List[Tuple[HitRecord, int, float]] = []
+
+async def _park_hit_score(job: ScreenshotJob, confidence: float) -> None:
+    """
+    Store a visibility-adjusted confidence on the job's hit. The hit is usually
+    still queued, so the score waits (like screenshot paths) for its id and is
+    written by primary key in the next batch; only that hit is changed.
+    """
+    score = int(round(max(0.0, min(1.0, confidence)) * 100))
+    if job.hit is None:
+        await run_db(_update_latest_hit_score, job, score, executor=DB_POOL)
+        return
+    _parked_scores.append((job.hit, score, time.monotonic()))
+    increment_metric("hit_scores_parked")
+
+async def _apply_parked_scores() -> None:
+    """Write every parked score whose hit has an id; drop the ones that waited too long."""
+    now = time.monotonic()
+    ready, waiting = [], []
+    expired = 0
+    for entry in _parked_scores:
+        hit, _, parked_at = entry
+        if now - parked_at > SCREENSHOT_PARK_TIMEOUT_SEC:
+            expired += 1
+        elif hit.id is not None:
+            ready.append(entry)
+        else:
+            waiting.append(entry)
+    _parked_scores[:] = waiting
+    if expired:
+        increment_metric("hit_score_park_timeouts", expired)
+    if not ready:
+        return
+    updated = await run_db(_update_hit_scores, {(hit.id, hit.timestamp): score for hit, score, _ in ready}, executor=DB_POOL)
+    if updated is None:
+        # keep them for the next interval (until they expire)
+        _parked_scores.extend(ready)
+        return
+    increment_metric("hit_scores_updated", updated)
+
+async def _apply_parked_paths() -> None:
+    """Write every parked path whose hit has an id; expire the ones that waited too long."""
+    now = time.monotonic()
+    ready, waiting, expired = [], [], []
+    for entry in _parked_paths:
+        job, _, parked_at = entry
+        if now - parked_at > SCREENSHOT_PARK_TIMEOUT_SEC:
+            expired.append(entry)
+        elif job.hit.id is not None:
+            ready.append(entry)
+        else:
+            waiting.append(entry)
+    _parked_paths[:] = waiting
+
+    if expired:
+        increment_metric("screenshot_park_timeouts", len(expired))
+        increment_metric("screenshot_failures", len(expired))
+        _dead_letter([job for job, _, _ in expired], "screenshot_hit_not_flushed", 1)
+        await _ack_stream_jobs([job for job, _, _ in expired])
+    if not ready:
+        return
+
+    rows = {(job.hit.id, job.hit.timestamp): storage_url for job, storage_url, _ in ready}
+    updated = await run_db(_update_screenshot_paths, rows, executor=DB_POOL)
+    if updated is None:
+        # keep them for the next interval (until they expire)
+        _parked_paths.extend(ready)
+        return
+    increment_metric("screenshot_path_batches")
+    increment_metric("screenshot_paths_updated", updated)
+    await _ack_stream_jobs([job for job, _, _ in ready])
+    print(f"[screenshot:stored] batch hits={updated}/{len(rows)}", flush=True)
+
+async def screenshot_path_flusher():
+    """Applies parked screenshot paths and hit scores once per PG_FLUSH_INTERVAL_SEC."""
+    while True:
+        await asyncio.sleep(PG_FLUSH_INTERVAL_SEC)
+        try:
+            await _apply_parked_paths()
+        except Exception as e:
+            print(f"[screenshot:paths:error] {e}", flush=True)
+        try:
+            await _apply_parked_scores()
+        except Exception as e:
+            print(f"[visibility:scores:error] {e}", flush=True)
+
 async def _ensure_screenshot_workers():
-    global _screenshot_queue
+    global _screenshot_queue, _screenshot_groups, _screenshot_stream
     if _screenshot_queue is not None:
         return
     # Dynamic screenshot queue: Scale based on available CPU cores
     _DYNAMIC_SCREENSHOT_QUEUE = min(_AVAILABLE_CPUS * 125, 1000)  # 125x CPU cores, max 1000
     _screenshot_queue = asyncio.Queue(maxsize=_DYNAMIC_SCREENSHOT_QUEUE)
+    _screenshot_groups = asyncio.PriorityQueue(maxsize=_DYNAMIC_SCREENSHOT_QUEUE)
+    asyncio.create_task(_screenshot_coalescer())
+    asyncio.create_task(screenshot_path_flusher())
+    if SCREENSHOT_QUEUE_BACKEND == "redis":
+        _screenshot_stream = create_stream(redis_client, SCREENSHOT_STREAM_KEY, SCREENSHOT_STREAM_GROUP,
+                                           SCREENSHOT_STREAM_CLAIM_IDLE_MS)
+        if _screenshot_stream is not None:
+            asyncio.create_task(_screenshot_stream_consumer())
+            print(f"[screenshot:stream] key={SCREENSHOT_STREAM_KEY} group={SCREENSHOT_STREAM_GROUP} "
+                  f"consumer={_STREAM_CONSUMER} prefetch={SCREENSHOT_STREAM_PREFETCH}", flush=True)
+        else:
+            print("[screenshot:stream] Redis unavailable, using the in-process queue", flush=True)
     for _ in range(MAX_SCREENSHOT_WORKERS):
         asyncio.create_task(_screenshot_worker())
     # Start DLQ retry worker
@@ -451,97 +1108,205 @@ async def _ensure_screenshot_workers():
     print(f"[screenshot:workers] started={MAX_SCREENSHOT_WORKERS}", flush=True)
 
 # ========= PostgreSQL bulk flusher =========
+_hit_bytes = 0         # bytes of hits queued, batched or being written
+_hits_enqueued = 0
+_hits_done = 0         # written or dead-lettered
+_hit_bytes_cond = threading.Condition()
+_pg_stop = asyncio.Event()
+_pg_flusher_task: asyncio.Task | None = None
+_pg_inflight: set[asyncio.Task] = set()
+
+def _hit_size(hit: HitRecord) -> int:
+    # rough in-memory footprint: the text fields plus per-object overhead
+    return 200 + sum(len(v or "") for v in (hit.task_id, hit.main_url, hit.sub_url, hit.category,
+                                            hit.matched_keyword, hit.snippet, hit.screenshot_path))
+
+def _enqueue_hit(hit: HitRecord) -> bool:
+    """
+    Queue a hit for pg_flusher. Off the event loop, waits up to HIT_ENQUEUE_WAIT_SEC
+    while the queue is over HIT_QUEUE_MAX_BYTES. Returns False if there is no room,
+    or if called off the loop before pg_flusher has started (the caller dead-letters it).
+    """
+    global _hit_bytes, _hits_enqueued
+    size = _hit_size(hit)
+    try:
+        asyncio.get_running_loop()
+        on_loop = True
+    except RuntimeError:
+        on_loop = False
+    if not on_loop and MAIN_LOOP is None:
+        # asyncio.Queue is not thread-safe and no loop is there to hand the hit to
+        increment_metric("hits_enqueued_without_loop")
+        return False
+    with _hit_bytes_cond:
+        if _hit_bytes + size > HIT_QUEUE_MAX_BYTES and not on_loop:
+            increment_metric("pg_backpressure_waits")
+            _hit_bytes_cond.wait_for(lambda: _hit_bytes + size <= HIT_QUEUE_MAX_BYTES, HIT_ENQUEUE_WAIT_SEC)
+        if _hit_bytes + size > HIT_QUEUE_MAX_BYTES:
+            return False
+        _hit_bytes += size
+        _hits_enqueued += 1
+    item = (time.monotonic(), size, hit)
+    if on_loop:
+        hit_queue.put_nowait(item)
+    else:
+        MAIN_LOOP.call_soon_threadsafe(hit_queue.put_nowait, item)
+    return True
+
+def _release_hits(count: int, size: int) -> None:
+    global _hit_bytes, _hits_done
+    with _hit_bytes_cond:
+        _hit_bytes -= size
+        _hits_done += count
+        _hit_bytes_cond.notify_all()
+    set_metric("pg_queue_bytes", _hit_bytes)
+
+async def _write_batch(batch: List[Tuple[float, int, HitRecord]], slots: asyncio.Semaphore):
+    try:
+        started = time.monotonic()
+        await _flush_pg([hit for _, _, hit in batch])
+        done = time.monotonic()
+        observe_metric("pg_flush_ms", (done - started) * 1000)
+        for enqueued_at, _, _ in batch:
+            observe_metric("pg_hit_latency_ms", (done - enqueued_at) * 1000)
+    finally:
+        _release_hits(len(batch), sum(size for _, size, _ in batch))
+        slots.release()
+
 async def pg_flusher():
-    buf: List[Hit] = []
-    last = time.time()
+    """
+    Cuts a batch at HIT_BATCH_SIZE hits, PG_FLUSH_MAX_BATCH_BYTES, or
+    PG_FLUSH_INTERVAL_SEC after its first hit, whichever comes first, and writes
+    it in the background; up to PG_FLUSH_CONCURRENCY batches are in flight while
+    the next one fills. Returns once _pg_stop is set and everything queued is handed off.
+    """
+    slots = asyncio.Semaphore(PG_FLUSH_CONCURRENCY)
+    buf: List[Tuple[float, int, HitRecord]] = []
+    buf_bytes = 0
+    deadline = 0.0
     while True:
         try:
-            item = await hit_queue.get()
-            buf.append(item)
-            hit_queue.task_done()
-            now = time.time()
-            if len(buf) >= HIT_BATCH_SIZE or (now - last) >= PG_FLUSH_INTERVAL_SEC:
-                await _flush_pg(buf); buf.clear(); last = now
+            timeout = max(0.0, deadline - time.monotonic()) if buf else PG_FLUSH_INTERVAL_SEC
+            try:
+                item = await asyncio.wait_for(hit_queue.get(), timeout)
+            except asyncio.TimeoutError:
+                item = None
+            now = time.monotonic()
+            if item is not None:
+                hit_queue.task_done()
+                if not buf:
+                    deadline = now + PG_FLUSH_INTERVAL_SEC
+                buf.append(item)
+                buf_bytes += item[1]
+                observe_metric("pg_queue_wait_ms", (now - item[0]) * 1000)
+
+            stopping = _pg_stop.is_set()
+            if buf and (len(buf) >= HIT_BATCH_SIZE or buf_bytes >= PG_FLUSH_MAX_BATCH_BYTES
+                        or now >= deadline or (stopping and hit_queue.empty())):
+                # all writers busy: stop consuming, so the queue (and record_hit) feel it
+                await slots.acquire()
+                batch, buf, buf_bytes = buf, [], 0
+                task = asyncio.create_task(_write_batch(batch, slots))
+                _pg_inflight.add(task)
+                task.add_done_callback(_pg_inflight.discard)
+            if stopping and not buf and hit_queue.empty():
+                return
         except Exception as e:
             print(f"[pg_flusher:error] {e}", flush=True)
             await asyncio.sleep(0.25)
 
-async def _flush_pg(batch: List[Hit]):
+async def shutdown_pg_flusher(timeout: float = 30.0):
+    """Flush everything queued and wait for in-flight batches (app shutdown)."""
+    if _pg_flusher_task is None:
+        return
+    _pg_stop.set()
+    try:
+        await asyncio.wait_for(asyncio.shield(_pg_flusher_task), timeout)
+    except asyncio.TimeoutError:
+        print(f"[pg_flusher:shutdown:timeout] {hit_queue.qsize()} hits still queued", flush=True)
+    if _pg_inflight:
+        await asyncio.wait(list(_pg_inflight), timeout=timeout)
+    print(f"[pg_flusher:stopped] pending_bytes={_hit_bytes}", flush=True)
+
+async def _flush_pg(batch: List[HitRecord]):
     """
-    Flush hits to database - run blocking DB ops in thread pool.
-    This prevents the event loop from blocking during large bulk inserts.
+    Flush hits to database - on the async engine, or in the thread pool without it.
+    Either way the event loop is not blocked during large bulk inserts.
     """
     if not batch:
         return
     
-    loop = asyncio.get_event_loop()
-    
-    def _do_flush():
-        """Blocking database bulk insert - runs in thread pool"""
-        db = SessionLocal()
+    def _do_flush(db: Session):
+        """Database bulk insert (run_db: AsyncSession.run_sync or DB_POOL thread)"""
         try:
-            db.bulk_save_objects(batch)
-            db.commit()
-            print(f"[pg:bulk] {len(batch)} hits", flush=True)
+            # bounded server-side so a slow write is rolled back, not cut off mid-COPY
+            db.execute(sql_text(f"SET LOCAL statement_timeout = {int(PG_FLUSH_TIMEOUT_SEC * 1000)}"))
+            # every path fills in hit.id, which parked screenshot paths wait for
+            started = time.perf_counter()
+            path = write_hits(db, batch, HIT_WRITER)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            increment_metric(f"pg_flush_{path}")
+            if path != HIT_WRITER:
+                increment_metric("pg_flush_fallbacks")
+            print(f"[pg:bulk] {len(batch)} hits via {path} in {elapsed_ms:.1f}ms", flush=True)
             return True
         except Exception as e:
             print(f"[pg:error] {e}", flush=True)
             db.rollback()
             raise
-        finally:
-            db.close()
     
+    flush = asyncio.ensure_future(run_db(_do_flush, executor=DB_POOL))
     try:
-        # Run in thread pool with 30-second timeout
-        await asyncio.wait_for(
-            loop.run_in_executor(DB_POOL, _do_flush),
-            timeout=30.0
-        )
-    except asyncio.TimeoutError:
-        increment_metric("db_timeouts")
-        print(f"[pg:timeout] - flush exceeded 30 seconds for {len(batch)} hits", flush=True)
-        # Add failed hits to DLQ
-        for hit in batch:
-            failed_hit = FailedHit(
-                task_id=hit.task_id,
-                main_url=hit.main_url,
-                sub_url=hit.sub_url,
-                category=hit.category,
-                matched_keyword=hit.matched_keyword,
-                snippet=hit.snippet,
-                timestamp=hit.timestamp,
-                source=hit.source,
-                confident_score=hit.confident_score or 0,
-                error="db_flush_timeout",
-                retry_count=0
-            )
-            dlq.enqueue_hit(failed_hit)
+        try:
+            # cancelling here would abort the COPY mid-transaction (asyncpg) or leave it
+            # running unseen (thread); only report the slow flush and keep waiting
+            await asyncio.wait_for(asyncio.shield(flush), timeout=PG_FLUSH_TIMEOUT_SEC)
+        except asyncio.TimeoutError:
+            increment_metric("pg_flush_slow")
+            print(f"[pg:slow] flush of {len(batch)} hits still running after {PG_FLUSH_TIMEOUT_SEC:.0f}s", flush=True)
+            await flush
     except Exception as e:
         increment_metric("db_timeouts")
         print(f"[pg:flush:exception] {e}", flush=True)
         # Add failed hits to DLQ
         for hit in batch:
-            failed_hit = FailedHit(
-                task_id=hit.task_id,
-                main_url=hit.main_url,
-                sub_url=hit.sub_url,
-                category=hit.category,
-                matched_keyword=hit.matched_keyword,
-                snippet=hit.snippet,
-                timestamp=hit.timestamp,
-                source=hit.source,
-                confident_score=hit.confident_score or 0,
-                error=str(e),
-                retry_count=0
-            )
+            failed_hit = FailedHit.from_record(hit, error=str(e))
             dlq.enqueue_hit(failed_hit)
 
+async def hit_partition_maintainer():
+    """Keeps hits partitions created ahead and expired ones detached, every HITS_PARTITION_CHECK_SEC."""
+    while True:
+        await asyncio.sleep(HITS_PARTITION_CHECK_SEC)
+        try:
+            await asyncio.get_running_loop().run_in_executor(DB_POOL, maintain_hit_partitions)
+            increment_metric("hits_partition_checks")
+        except Exception as e:
+            print(f"[pg:partitions:error] {e}", flush=True)
+
+async def cold_data_archiver():
+    """Runs the Parquet archive job every ARCHIVE_INTERVAL_SEC (only started with ARCHIVE_AFTER_DAYS set)."""
+    while True:
+        await asyncio.sleep(ARCHIVE_INTERVAL_SEC)
+        try:
+            moved = await asyncio.get_running_loop().run_in_executor(DB_POOL, archive_cold_data)
+            for table, rows in moved.items():
+                increment_metric(f"archived_{table}", rows)
+            if moved:
+                print(f"[archive] moved {moved}", flush=True)
+        except Exception as e:
+            print(f"[archive:error] {e}", flush=True)
+
 async def _ensure_bg_workers():
-    global MAIN_LOOP
+    global MAIN_LOOP, _pg_flusher_task
     if MAIN_LOOP is not None: return
     MAIN_LOOP = asyncio.get_running_loop()
-    asyncio.create_task(pg_flusher())
+    _pg_flusher_task = asyncio.create_task(pg_flusher())
+    asyncio.create_task(hit_partition_maintainer())
+    if ARCHIVE_AFTER_DAYS > 0:
+        asyncio.create_task(cold_data_archiver())
+    print(f"[db] hot paths on {'the async engine (asyncpg)' if async_enabled() else 'DB_POOL threads'}", flush=True)
     await _ensure_screenshot_workers()
+    await _ensure_render_workers()
     print("[background:workers] started", flush=True)
 
 # ========= Helpers =========
@@ -865,8 +1630,8 @@ def get_spacy_status() -> Dict[str, Any]:
         }
 
 # ========= Text extraction =========
-def extract_text(html: str) -> tuple[str, HTMLParser]:
-    tree = HTMLParser(html)
+def extract_text(html: str, tree: HTMLParser | None = None) -> tuple[str, HTMLParser]:
+    tree = tree if tree is not None else HTMLParser(html)
     parts: List[str] = []
     for node in tree.css("body :not(script):not(style):not(nav):not(footer)"):
         try:
@@ -876,6 +1641,27 @@ def extract_text(html: str) -> tuple[str, HTMLParser]:
         if len(parts) >= 20000: break
     return " ".join(parts), tree
 
+def _extract_text_timed(html: str, tree: HTMLParser | None = None) -> tuple[str, HTMLParser]:
+    """extract_text() plus parse cost accounting, used to estimate CPU saved by text-mode renders."""
+    start = time.perf_counter()
+    out = extract_text(html, tree)
+    increment_metric("extract_text_ms", (time.perf_counter() - start) * 1000)
+    increment_metric("extract_text_bytes", len(html))
+    return out
+
+def _parse_and_predict(html: str, domain: str) -> tuple[HTMLParser, Dict[str, Any]]:
+    """Parse once for the heavy-JS predictor; the tree is reused by extract_text()."""
+    start = time.perf_counter()
+    tree = HTMLParser(html)
+    # parse time is part of extract_text()'s cost (see _estimated_parse_ms)
+    increment_metric("extract_text_ms", (time.perf_counter() - start) * 1000)
+    return tree, predict(html, tree, domain, _render_history)
+
+def _estimated_parse_ms(n_bytes: int) -> float:
+    """Parse time extract_text() would need for n_bytes of HTML, from the observed ms/byte."""
+    parsed = get_metric("extract_text_bytes")
+    return n_bytes * get_metric("extract_text_ms") / parsed if parsed else 0.0
+
 # ========= OCR + QR =========
 def _ocr_image(img: Image.Image) -> str:
     try:
@@ -900,10 +1686,14 @@ def _try_qr_opencv(img: Image.Image) -> List[str]:
         return []
 
 def ocr_and_qr(url: str, tree: HTMLParser, task_id:str|None=None, master:str|None=None) -> List[Tuple[str, str, str]]:
+    srcs = [img.attributes.get("src") or "" for img in tree.css("img")]
+    return ocr_and_qr_srcs(url, srcs, task_id=task_id, master=master)
+
+def ocr_and_qr_srcs(url: str, srcs: List[str], task_id:str|None=None, master:str|None=None) -> List[Tuple[str, str, str]]:
     results: List[Tuple[str,str,str]] = []
-    for i, img in enumerate(tree.css("img")):
+    for i, raw_src in enumerate(srcs):
         if i >= MAX_IMGS: break
-        src = _absolute_img_src(url, img.attributes.get("src") or "")
+        src = _absolute_img_src(url, raw_src)
         if not src: continue
         try:
             with _SESS.get(src, timeout=IMG_HTTP_TIMEOUT_SEC, stream=True) as r:
@@ -1004,15 +1794,65 @@ def _save_html_to_minio(url: str, html: str) -> str | None:
     return None
 
 # ========= Hit recording (DB-only) =========
+# ========= Screenshot reuse index =========
+_reuse_lock = threading.Lock()
+_reused_pages: OrderedDict[Tuple[str, str], None] = OrderedDict()  # (task_id, url) already counted
+
+def _content_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8", "ignore"), digest_size=16).hexdigest()
+
+def _normalize_url(url: str) -> str:
+    """Scheme-less, lower-cased host, no fragment, trailing slash or utm_* params; sorted query."""
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    query = "&".join(sorted(q for q in parts.query.split("&") if q and not q.lower().startswith("utm_")))
+    path = parts.path.rstrip("/") or "/"
+    return f"{host}{path}?{query}" if query else f"{host}{path}"
+
+def _reuse_key(url: str, keyword: str, content_hash: str) -> str:
+    digest = hashlib.sha256(f"{_normalize_url(url)}\n{keyword}\n{content_hash}".encode("utf-8")).hexdigest()
+    return f"screenshot:reuse:{digest}"
+
+def _index_screenshot(jobs: List[ScreenshotJob], storage_url: str, image_bytes: int) -> None:
+    for job in jobs:
+        if job.content_hash:
+            cache.set(_reuse_key(job.sub_url, job.keyword, job.content_hash),
+                      {"url": storage_url, "bytes": image_bytes, "task_id": job.task_id},
+                      ttl=SCREENSHOT_REUSE_TTL_SEC)
+
+def _reused_screenshot(url: str, keyword: str, content_hash: str, task_id: str) -> str | None:
+    """Stored screenshot of the same page content for this keyword, if any."""
+    entry = cache.get(_reuse_key(url, keyword, content_hash))
+    if not entry or not entry.get("url"):
+        return None
+    increment_metric("screenshots_reused")
+    with _reuse_lock:
+        first_for_page = (task_id, url) not in _reused_pages
+        if first_for_page:
+            _reused_pages[(task_id, url)] = None
+            while len(_reused_pages) > _DYNAMIC_QUEUE_SIZE:
+                _reused_pages.popitem(last=False)
+    if first_for_page:
+        # one capture (and upload) per page, since jobs of a page are coalesced
+        increment_metric("screenshot_reuse_render_calls_avoided")
+        increment_metric("screenshot_reuse_bytes_avoided", int(entry.get("bytes") or 0))
+    return entry["url"]
+
 def record_hit(url:str, cat:str, k:str, snip:str, src:str,
                master:str|None=None, confidence:float=1.0,
-               task_id:str|None=None):
+               task_id:str|None=None, content_hash:str|None=None):
     if not master: master = url
     snip = _clean(snip)
     ts = int(time.time())
     
+    if not _match_index.add(master, url, k):
+        increment_metric("match_duplicates_skipped")
+        return
+
     # Save HTML to MinIO on first hit for this URL
-    with _match_lock:
+    with _html_lock:
         # Check if this is the first hit for this URL
         if url not in _html_saved and url in _html_storage:
             html_content = _html_storage.get(url)
@@ -1020,27 +1860,39 @@ def record_hit(url:str, cat:str, k:str, snip:str, src:str,
                 # Save HTML in thread pool (non-blocking)
                 IO_POOL.submit(_save_html_to_minio, url, html_content)
                 _html_saved.add(url)
-        
-        bucket = match_buffer[master]
-        for e in bucket["matches"]:
-            if e["url"] == url and e["keyword"] == k:
-                return
-        bucket["sub_urls"].add(url)
-        bucket["matches"].append({
-            "url": url, "category": cat, "keyword": k, "snippet": snip,
-            "timestamp": ts, "source": src, "confidence": confidence
-        })
     
+    # unchanged page content: point at the screenshot an earlier scan stored
+    reused = None
+    if SCREENSHOT_REUSE and content_hash and confidence >= 0.7:
+        reused = _reused_screenshot(url, k, content_hash, task_id or "unknown")
+
+    # hit first: the screenshot job keeps a reference and updates it by id once flushed
+    hit = HitRecord(
+        task_id=task_id or "unknown",
+        main_url=master,
+        sub_url=url,
+        category=cat,
+        matched_keyword=k,
+        snippet=snip[:500],
+        screenshot_path=reused,
+        timestamp=ts,
+        source=src,
+        confident_score=int(max(0.0, min(1.0, confidence))*100)
+    )
+
     # screenshot enqueue (confidence gate)
-    if confidence >= 0.7 and _screenshot_queue is not None:
+    if confidence >= 0.7 and _screenshot_queue is not None and not reused:
         job = ScreenshotJob(
             sub_url=url,
             keyword=k,
             main_url=master,
             task_id=task_id or "unknown",
+            confidence=confidence,
+            hit=hit,
+            content_hash=content_hash,
         )
         try:
-            _screenshot_queue.put_nowait(job)
+            _enqueue_screenshot(job)
             increment_metric("total_screenshots_processed")
         except asyncio.QueueFull:
             increment_metric("screenshots_dropped")
@@ -1056,43 +1908,19 @@ def record_hit(url:str, cat:str, k:str, snip:str, src:str,
             )
             dlq.enqueue_screenshot(failed_screenshot)
     # DB enqueue
-    hit = Hit(
-        task_id=task_id or "unknown",
-        main_url=master,
-        sub_url=url,
-        category=cat,
-        matched_keyword=k,
-        snippet=snip[:500],
-        screenshot_path=None,
-        timestamp=ts,
-        source=src,
-        confident_score=int(max(0.0, min(1.0, confidence))*100)
-    )
-    try:
-        hit_queue.put_nowait(hit)
+    if _enqueue_hit(hit):
         increment_metric("total_hits_processed")
-    except asyncio.QueueFull:
+    else:
         increment_metric("hits_dropped")
         increment_metric("queue_overflow_count")
         print(f"[pg:queue_full] Hit dropped, adding to DLQ: {url} - {k}", flush=True)
         # Add to DLQ instead of silently dropping
-        failed_hit = FailedHit(
-            task_id=task_id or "unknown",
-            main_url=master,
-            sub_url=url,
-            category=cat,
-            matched_keyword=k,
-            snippet=snip[:500],
-            timestamp=ts,
-            source=src,
-            confident_score=int(max(0.0, min(1.0, confidence))*100),
-            error="hit_queue_full",
-            retry_count=0
-        )
+        failed_hit = FailedHit.from_record(hit, error="hit_queue_full")
         dlq.enqueue_hit(failed_hit)
 
 # ========= Matching (with spaCy validation) =========
-def match_text(url:str, text:str, master:str|None=None, task_id:str|None=None) -> List[Tuple[str,str,str]]:
+def match_text(url:str, text:str, master:str|None=None, task_id:str|None=None,
+               content_hash:str|None=None) -> List[Tuple[str,str,str]]:
     """
     Find all matches in text and return ALL matches (before validation) for Results table.
     ALL matches are saved to Results table (before validation) - master data.
@@ -1166,7 +1994,7 @@ def match_text(url:str, text:str, master:str|None=None, task_id:str|None=None) -
             elif term in ["bitcoin", "ethereum"]:
                 source = "regex"
             
-            record_hit(url, cat, term, snip, source, master, spacy_score, task_id=task_id)
+            record_hit(url, cat, term, snip, source, master, spacy_score, task_id=task_id, content_hash=content_hash)
     
     # Return ALL matches (before validation) for Results table
     # Results table stores ALL matches as master data (one row per main_url)
@@ -1191,6 +2019,165 @@ def add_pw_domain(dom: str):
         f.write(dom + "\n")
     print(f"[playwright:add] {dom}", flush=True)
 
+# ========= Page analysis =========
+async def _analyze_text(url: str, text: str, srcs: List[str], main_url: str, task_id: str) -> List[Tuple[str,str,str]]:
+    results = await asyncio.get_event_loop().run_in_executor(
+        CPU_POOL, lambda: match_text(url, text, master=main_url, task_id=task_id, content_hash=_content_hash(text)))
+    if any(c == "payments" for _, c, _ in results):
+        results += await asyncio.get_event_loop().run_in_executor(CPU_POOL, lambda: ocr_and_qr_srcs(url, srcs, task_id=task_id, master=main_url))
+    return results
+
+async def _analyze_html(url: str, content: str, main_url: str, task_id: str,
+                        tree: HTMLParser | None = None) -> Tuple[List[Tuple[str,str,str]], str]:
+    text, tree = await asyncio.get_event_loop().run_in_executor(CPU_POOL, lambda: _extract_text_timed(content, tree))
+    srcs = [img.attributes.get("src") or "" for img in tree.css("img")]
+    return await _analyze_text(url, text, srcs, main_url, task_id), text
+
+async def _render_and_analyze(url: str, main_url: str, task_id: str) -> Optional[Tuple[List[Tuple[str,str,str]], str]]:
+    """Render via the renderer and analyze the result; returns (results, text) or None if the render failed."""
+    if RENDERER_TEXT_MODE:
+        rendered = await _render_page(url, "text")
+        if not rendered:
+            return None
+        rtext = rendered.get("text") or ""
+        dom_bytes = int(rendered.get("dom_bytes") or 0)
+        text_bytes = len(rtext.encode("utf-8"))
+        saved_ms = _estimated_parse_ms(dom_bytes)
+        increment_metric("render_text_mode_renders")
+        increment_metric("render_text_mode_bytes", text_bytes)
+        increment_metric("render_text_mode_dom_bytes", dom_bytes)
+        increment_metric("render_text_mode_cpu_saved_ms", saved_ms)
+        print(f"[render:text] {url} -> {text_bytes}B text vs {dom_bytes}B DOM, "
+              f"~{saved_ms:.1f}ms parse saved", flush=True)
+        return await _analyze_text(url, rtext, rendered.get("images") or [], main_url, task_id), rtext
+
+    rendered = await _render_page(url, "html")
+    rendered_html = (rendered or {}).get("content")
+    if not (rendered_html and "<html" in rendered_html.lower()):
+        return None
+    with _html_lock:
+        _html_storage[url] = rendered_html
+    return await _analyze_html(url, rendered_html, main_url, task_id)
+
+# ========= Render escalation queue =========
+# Heavy-JS pages are rendered by their own workers so page analysis never waits
+# on the renderer; results are merged into the task accumulator as they arrive
+# and batch completion waits for the task's outstanding renders.
+RENDER_WORKERS          = int(os.environ.get("RENDER_WORKERS", str(RENDER_BATCH_MAX)))
+RENDER_QUEUE_SIZE       = int(os.environ.get("RENDER_QUEUE_SIZE", "500"))
+RENDER_WAIT_TIMEOUT_SEC = float(os.environ.get("RENDER_WAIT_TIMEOUT_SEC", "300"))
+
+@dataclass
+class RenderJob:
+    url: str
+    main_url: str
+    task_id: str
+    static_text_len: int
+    lane: str = LANE_STATIC
+    # render-first pages were not analyzed statically; fall back to this HTML if the render
+    # fails or finds nothing
+    static_html: str | None = None
+
+# per-domain render usefulness, feeds the heavy-JS predictor
+_render_history = RenderHistory(DOMAIN_STATS_FILE)
+
+_render_queue: asyncio.Queue[RenderJob] | None = None
+_render_pending: Dict[str, int] = defaultdict(int)  # task_id -> renders queued or running
+_render_idle: asyncio.Condition | None = None
+
+async def _ensure_render_workers():
+    global _render_queue, _render_idle
+    if _render_queue is not None:
+        return
+    _render_queue = asyncio.Queue(maxsize=RENDER_QUEUE_SIZE)
+    _render_idle = asyncio.Condition()
+    for _ in range(RENDER_WORKERS):
+        asyncio.create_task(_render_worker())
+    print(f"[render:workers] started={RENDER_WORKERS}", flush=True)
+
+async def _escalate_render(job: RenderJob):
+    await _ensure_render_workers()
+    _render_pending[job.task_id] += 1
+    increment_metric("render_escalations")
+    if _render_queue.full():
+        # bounded queue: page workers only wait here when the renderer is far behind
+        increment_metric("render_queue_full")
+    await _render_queue.put(job)
+
+async def _render_worker():
+    assert _render_queue is not None
+    while True:
+        job = await _render_queue.get()
+        try:
+            rres = None
+            try:
+                rendered = await _render_and_analyze(job.url, job.main_url, job.task_id)
+                if rendered:
+                    rres, rtext = rendered
+                    _render_history.record(_domain_of(job.url), bool(rres) or len(rtext) > job.static_text_len)
+                    if rres:
+                        add_pw_domain(_domain_of(job.url))
+                        _merge_render_results(job.task_id, job.url, rres)
+                        print(f"[render:success] {job.url} -> {len(rres)} results from rendered page", flush=True)
+                    elif len(rtext) > job.static_text_len:
+                        add_pw_domain(_domain_of(job.url))
+                        print(f"[render:content] {job.url} -> rendered page has more content ({len(rtext)} vs {job.static_text_len} chars)", flush=True)
+            except Exception as e:
+                increment_metric("renderer_timeouts")
+                print(f"[render:fail] {job.url} -> {e}", flush=True)
+            # render-first pages were not analyzed statically: a failed render, or one with
+            # no matches (consent or bot wall), falls back to the static HTML
+            if not rres and job.static_html:
+                increment_metric("js_render_first_fallbacks")
+                sres, _ = await _analyze_html(job.url, job.static_html, job.main_url, job.task_id)
+                _merge_render_results(job.task_id, job.url, sres)
+        except Exception as e:
+            print(f"[render:fallback:fail] {job.url} -> {e}", flush=True)
+        finally:
+            _render_queue.task_done()
+            async with _render_idle:
+                _render_pending[job.task_id] -= 1
+                if _render_pending[job.task_id] <= 0:
+                    _render_pending.pop(job.task_id, None)
+                _render_idle.notify_all()
+
+def _accumulate(acc: dict, results: List[Tuple[str,str,str]], url_matches: Dict[str, int]):
+    """Fold page results into a task accumulator; caller holds _batch_lock."""
+    acc["total_matches"] += len(results)
+    acc["categories"].update(c for _, c, _ in results)
+    acc["keyword_counts"].update(k for k, _, _ in results)
+    for url, n in url_matches.items():
+        acc["url_matches"][url] = acc["url_matches"].get(url, 0) + n
+    for _, _, snip in results:
+        if acc["snippet_bytes"] >= RESULT_SNIPPETS_MAX_BYTES:
+            increment_metric("result_snippets_dropped")
+            continue
+        acc["snippets"].append(snip)
+        acc["snippet_bytes"] += len(snip)
+
+def _merge_render_results(task_id: str, url: str, results: List[Tuple[str,str,str]]):
+    """Add late render results to the task accumulator (the hits themselves are already recorded)."""
+    with _batch_lock:
+        if task_id not in _batch_accumulator:
+            print(f"[render:late] task={task_id} already completed, {len(results)} results not in summary", flush=True)
+            return
+        _accumulate(_batch_accumulator[task_id], results, {url: len(results)})
+
+async def _wait_for_renders(task_id: str):
+    """Block until the task has no queued or running renders (bounded by RENDER_WAIT_TIMEOUT_SEC)."""
+    if _render_idle is None or not _render_pending.get(task_id):
+        return
+    start = time.time()
+    try:
+        async with _render_idle:
+            await asyncio.wait_for(
+                _render_idle.wait_for(lambda: not _render_pending.get(task_id)),
+                timeout=RENDER_WAIT_TIMEOUT_SEC,
+            )
+        print(f"[render:wait] task={task_id} renders done after {time.time() - start:.1f}s", flush=True)
+    except asyncio.TimeoutError:
+        print(f"[render:wait:timeout] task={task_id} {_render_pending.get(task_id, 0)} renders still pending", flush=True)
+
 async def _process_page_async(p:dict, main_url:str, task_id:str) -> List[Tuple[str,str,str]]:
     url  = p.get("final_url") or p.get("url")
     html = p.get("html") or p.get("html_content") or p.get("HTML") or p.get("htmlContent") or ""
@@ -1207,7 +2194,7 @@ async def _process_page_async(p:dict, main_url:str, task_id:str) -> List[Tuple[s
 
     # Store HTML content for potential saving when hits are detected
     # Limit storage size to prevent memory issues
-    with _match_lock:
+    with _html_lock:
         # LRU cache: move to end if exists, add to end if new
         if url in _html_storage:
             _html_storage.move_to_end(url)
@@ -1221,42 +2208,37 @@ async def _process_page_async(p:dict, main_url:str, task_id:str) -> List[Tuple[s
     domain = _domain_of(url)
     force_render = domain in load_pw_domains()
 
-    async def process_html(content: str):
-        text, tree = await asyncio.get_event_loop().run_in_executor(CPU_POOL, lambda: extract_text(content))
-        results = await asyncio.get_event_loop().run_in_executor(CPU_POOL, lambda: match_text(url, text, master=main_url, task_id=task_id))
-        if any(c == "payments" for _, c, _ in results):
-            results += await asyncio.get_event_loop().run_in_executor(CPU_POOL, lambda: ocr_and_qr(url, tree, task_id=task_id, master=main_url))
-        return results, text
+    if not renderer_client:
+        results, _ = await _analyze_html(url, html, main_url, task_id)
+        return results
+
+    # Predict from static features whether this page needs a render, before analyzing it
+    tree, lane, static_len, js_score = None, LANE_STATIC, 0, None
+    if JS_PREDICTOR:
+        tree, pred = await asyncio.get_event_loop().run_in_executor(CPU_POOL, lambda: _parse_and_predict(html, domain))
+        lane, static_len, js_score = pred["lane"], pred["features"].text_bytes, pred["score"]
+    if force_render and lane == LANE_STATIC:
+        lane = LANE_RENDER_PARALLEL
+    increment_metric(f"js_lane_{lane}")
+
+    if lane == LANE_RENDER_FIRST:
+        # shell page: skip the static pass; the render worker falls back to it if the render fails
+        print(f"[render:trigger] {url} -> render-first, queueing {'text' if RENDERER_TEXT_MODE else 'HTML'} render", flush=True)
+        await _escalate_render(RenderJob(url=url, main_url=main_url, task_id=task_id,
+                                         static_text_len=static_len, lane=lane, static_html=html))
+        return []
 
-    results, text = await process_html(html)
+    results, text = await _analyze_html(url, html, main_url, task_id, tree=tree)
 
-    # Detect heavy JS sites and escalate to Playwright renderer
-    is_heavy_js = force_render or (not results and len(text) < 200)
+    # Render-parallel pages are always rendered; static ones only when the static pass came up
+    # thin and the predictor does not rule out JS. Either way the page worker does not wait.
+    thin = not results and len(text) < 200
+    is_heavy_js = lane == LANE_RENDER_PARALLEL or (thin and (js_score is None or js_score >= THIN_RENDER_THRESHOLD))
     
-    if renderer_client and is_heavy_js:
-        try:
-            print(f"[render:trigger] {url} -> heavy JS detected, requesting HTML render", flush=True)
-            
-            rendered_html = await asyncio.get_event_loop().run_in_executor(
-                IO_POOL, lambda: renderer_client.render_html(url)
-            )
-            
-            if rendered_html and "<html" in rendered_html.lower():
-                rres, rtext = await process_html(rendered_html)
-                
-                with _match_lock:
-                    _html_storage[url] = rendered_html
-                
-                if rres:
-                    add_pw_domain(domain)
-                    results.extend(rres)
-                    print(f"[render:success] {url} -> {len(rres)} results from rendered HTML", flush=True)
-                elif len(rtext) > len(text):
-                    add_pw_domain(domain)
-                    print(f"[render:content] {url} -> rendered HTML has more content ({len(rtext)} vs {len(text)} chars)", flush=True)
-        except Exception as e:
-            increment_metric("renderer_timeouts")
-            print(f"[render:fail] {url} -> {e}", flush=True)
+    if is_heavy_js:
+        print(f"[render:trigger] {url} -> heavy JS detected ({lane}), queueing {'text' if RENDERER_TEXT_MODE else 'HTML'} render", flush=True)
+        await _escalate_render(RenderJob(url=url, main_url=main_url, task_id=task_id,
+                                         static_text_len=len(text), lane=lane))
     return results
 
 # ========= Graceful draining =========
@@ -1271,82 +2253,123 @@ async def _drain_queues():
                 print(f"[drain:timeout] {label} ({size} left)", flush=True)
                 break
 
+    if _screenshot_stream is not None:
+        # shared stream: wait (bounded) until no job is left unacknowledged
+        loop = asyncio.get_event_loop()
+        start = time.time()
+        while time.time() - start < 60:
+            try:
+                if not await loop.run_in_executor(IO_POOL, _screenshot_stream.backlog):
+                    break
+            except Exception:
+                break
+            await asyncio.sleep(0.5)
     if _screenshot_queue is not None:
         await _drain(_screenshot_queue, "screenshots", 60)
-    await _drain(hit_queue, "pg", 30)
+        # jobs still waiting in a coalescing window
+        start = time.time()
+        while _screenshot_coalescing and time.time() - start < 5:
+            await asyncio.sleep(0.05)
+        await _drain(_screenshot_groups, "screenshot_groups", 60)
+    # hits queued so far are written (or dead-lettered), including batched and in-flight ones
+    target = _hits_enqueued
+    start = time.time()
+    while _hits_done < target:
+        if time.time() - start > 30:
+            print(f"[drain:timeout] pg ({target - _hits_done} left)", flush=True)
+            break
+        await asyncio.sleep(0.1)
+    # screenshot paths parked for hits that were just flushed
+    start = time.time()
+    while (_parked_paths or _parked_scores) and time.time() - start < 10:
+        await asyncio.sleep(0.25)
     await asyncio.sleep(0)
 
 # ========= Persist summary =========
-async def _persist_result(task_id: str, main_url: str, sub_urls: List[str],
-                          kws: List[str], cats: List[str], total_matches: int = None,
+def _build_result_object_name(main_url: str, task_id: str) -> str:
+    return f"results/{_safe_slug(main_url)}/{_safe_slug(task_id)}-snippets.txt.gz"
+
+def _store_snippets(task_id: str, main_url: str, snippets: List[str]) -> str | None:
+    """Upload the task's snippets gzipped to MinIO; returns the storage URL or None."""
+    if not snippets or minio_client is None:
+        return None
+    import gzip
+    data = gzip.compress("\n---SNIPPET---\n".join(snippets).encode("utf-8"), compresslevel=6)
+    object_name = _build_result_object_name(main_url, task_id)
+    try:
+        minio_client.upload_object(MINIO_BUCKET, object_name, io.BytesIO(data), len(data),
+                                   content_type="text/plain")
+    except Exception as exc:
+        increment_metric("minio_errors")
+        print(f"[result:snippets:error] {main_url} -> {exc}", flush=True)
+        return None
+    increment_metric("result_snippet_bytes", len(data))
+    return _minio_public_url(object_name)
+
+async def _persist_result(task_id: str, main_url: str, url_matches: Dict[str, int],
+                          keyword_counts: Dict[str, int], cats: List[str], total_matches: int,
                           snippets: List[str] = None):
     """
-    Persist result - run blocking DB ops in thread pool to avoid blocking event loop.
+    Persist result - snippet upload in the IO pool, the upsert on the async engine
+    (or DB_POOL without it), so the event loop is never blocked.
     This ensures other routes remain responsive during large ingests.
     
     Args:
         task_id: Task identifier
         main_url: Main URL being analyzed
-        sub_urls: List of sub URLs scanned
-        kws: List of keywords found (may contain duplicates across pages)
+        url_matches: sub URL scanned -> matches found on it
+        keyword_counts: keyword -> matches (before validation)
         cats: List of categories found
-        total_matches: Total count of ALL matches (before validation). If None, uses len(kws).
-        snippets: List of all snippets found (for raw_data field)
+        total_matches: Total count of ALL matches (before validation)
+        snippets: snippets found, stored in MinIO behind Result.raw_data_url
     """
     loop = asyncio.get_event_loop()
     
-    # Use provided total_matches or fallback to len(kws)
-    total_count = total_matches if total_matches is not None else len(kws)
-    
-    # Prepare raw_data: Join all snippets with separator
-    raw_data_content = ""
-    if snippets and len(snippets) > 0:
-        # Join snippets with a clear separator for easy parsing
-        raw_data_content = "\n---SNIPPET---\n".join(snippets)
-        # Limit total size to prevent database issues (max 1MB)
-        if len(raw_data_content) > 1000000:
-            raw_data_content = raw_data_content[:1000000] + "\n... (truncated)"
+    def _raw_data():
+        """Blocking upload of the snippets; inline raw_data only if MinIO is unavailable."""
+        raw_data_url = _store_snippets(task_id, main_url, snippets or [])
+        raw_data = None
+        if snippets and not raw_data_url:
+            # MinIO unavailable: keep a bounded inline copy as before
+            raw_data = "\n---SNIPPET---\n".join(snippets)
+            if len(raw_data) > RESULT_RAW_DATA_INLINE_MAX:
+                raw_data = raw_data[:RESULT_RAW_DATA_INLINE_MAX] + "\n... (truncated)"
+        return raw_data_url, raw_data
     
-    def _do_persist():
-        """Blocking database operation - runs in thread pool.
+    def _do_persist(db: Session, raw_data_url: str | None, raw_data: str | None):
+        """Database upsert (run_db).
         Saves ALL matches (before spaCy validation) to Results table.
         Results table: one row per main_url (master data with all matches).
         """
-        db = SessionLocal()
         try:
-            # Use merge to ensure one row per main_url
-            # This saves ALL matches (before spaCy validation) as master data
-            result = Result(
-                task_id=task_id,
-                main_url=main_url,
-                sub_urls=sub_urls,
-                keyword_match=kws,  # ALL keywords found (before validation) - may contain duplicates
-                categories=cats,     # ALL categories found (before validation)
-                raw_data=raw_data_content,  # All snippets from matches (before validation)
-                cleaned_data="",  # Not required for now
-                timestamp=int(time.time())
-            )
-            # Merge ensures one row per main_url (updates if exists, inserts if new)
-            db.merge(result)
-            db.commit()
-            print(f"[db:result:ok] {task_id} main_url={main_url} ({len(sub_urls)} urls, {total_count} total matches BEFORE validation, {len(kws)} keywords in list)", flush=True)
+            # bounded server-side: a slow upsert is rolled back whole, not cut off half way
+            db.execute(sql_text(f"SET LOCAL statement_timeout = {int(RESULT_WRITE_TIMEOUT_SEC * 1000)}"))
+            started = time.perf_counter()
+            write_result(db, task_id, main_url, url_matches, keyword_counts, cats, total_matches,
+                         raw_data_url=raw_data_url, raw_data=raw_data)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            observe_metric("result_write_ms", elapsed_ms)
+            print(f"[db:result:ok] {task_id} main_url={main_url} ({len(url_matches)} urls, {total_matches} total matches BEFORE validation, {len(keyword_counts)} distinct keywords) in {elapsed_ms:.1f}ms", flush=True)
             return True
         except Exception as e:
             print(f"[db:result:error] {task_id} -> {e}", flush=True)
             db.rollback()
             raise
-        finally:
-            db.close()
     
+    async def _persist():
+        raw_data_url, raw_data = await loop.run_in_executor(IO_POOL, _raw_data)
+        await run_db(_do_persist, raw_data_url, raw_data, executor=DB_POOL)
+    
+    persist = asyncio.ensure_future(_persist())
     try:
-        # Run in thread pool with 30-second timeout
-        await asyncio.wait_for(
-            loop.run_in_executor(DB_POOL, _do_persist),
-            timeout=30.0
-        )
-    except asyncio.TimeoutError:
-        increment_metric("db_timeouts")
-        print(f"[db:timeout] {task_id} - database persist exceeded 30 seconds", flush=True)
+        try:
+            # as in _flush_pg: cancelling would leave results/result_urls half written
+            # or the connection in an unknown state; only report the slow write
+            await asyncio.wait_for(asyncio.shield(persist), timeout=RESULT_WRITE_TIMEOUT_SEC)
+        except asyncio.TimeoutError:
+            increment_metric("result_write_slow")
+            print(f"[db:slow] {task_id} - result persist still running after {RESULT_WRITE_TIMEOUT_SEC:.0f}s", flush=True)
+            await persist
     except Exception as e:
         increment_metric("db_timeouts")
         print(f"[db:persist:exception] {task_id} -> {e}", flush=True)
@@ -1400,14 +2423,16 @@ async def process_ingest_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
     
     print(f"[ingest:debug] task={task_id} main={main_url}: Processing {len(pages)} pages, first page URL: {pages[0].get('url') or pages[0].get('final_url') or 'N/A'}", flush=True)
 
-    with _match_lock:
-        if batch_num == 1:
-            match_buffer.pop(main_url, None)
-        match_buffer[main_url]["task_id"] = task_id
+    if batch_num == 1:
+        _match_index.clear(main_url)
+    with _batch_lock:
+        # create the accumulator up front so deferred render results can merge into it
+        _batch_accumulator[task_id]
 
     sem = asyncio.Semaphore(MAX_CONCURRENT_PAGES)
     all_results: List[Tuple[str, str, str]] = []
     sub_urls: List[str] = []
+    url_matches: Dict[str, int] = {}
     processed_count = 0
     error_count = 0
 
@@ -1418,7 +2443,9 @@ async def process_ingest_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
                 res = await _process_page_async(page, main_url, task_id)
                 all_results.extend(res)
                 u = page.get("final_url") or page.get("url")
-                if u: sub_urls.append(u)
+                if u:
+                    sub_urls.append(u)
+                    url_matches[u] = url_matches.get(u, 0) + len(res)
                 processed_count += 1
                 if processed_count % 100 == 0:
                     print(f"[ingest:progress] task={task_id} main={main_url}: Processed {processed_count}/{total_pages} pages, found {len(all_results)} matches so far", flush=True)
@@ -1445,35 +2472,34 @@ async def process_ingest_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
 
     print(f"[ingest:debug] task={task_id} main={main_url}: Finished processing pages. Processed={processed_count}, Errors={error_count}, Results={len(all_results)}, SubURLs={len(sub_urls)}", flush=True)
     
-    cats = sorted({c for _, c, _ in all_results})
     kws = [k for k, _, _ in all_results]
-    snippets = [s for _, _, s in all_results]  # Collect all snippets for raw_data
 
     with _batch_lock:
         acc = _batch_accumulator[task_id]
         acc["total_pages"]   += len(sub_urls)
-        acc["total_matches"] += len(kws)
-        acc["categories"].update(cats)
-        acc["keywords"].extend(kws)
-        acc["snippets"].extend(snippets)  # Accumulate snippets
-        acc["sub_urls"].extend(sub_urls)
+        _accumulate(acc, all_results, url_matches)
         acc["last_batch"]     = batch_num
 
-    print(f"[ingest:debug] task={task_id} main={main_url}: Accumulated stats - pages={acc['total_pages']}, matches={acc['total_matches']}, categories={len(acc['categories'])}, snippets={len(acc.get('snippets', []))}, is_complete={is_complete}", flush=True)
+    print(f"[ingest:debug] task={task_id} main={main_url}: Accumulated stats - pages={acc['total_pages']}, matches={acc['total_matches']}, categories={len(acc['categories'])}, snippets={len(acc['snippets'])}, is_complete={is_complete}", flush=True)
 
     # Let queues drain a bit
     await _drain_queues()
 
     if is_complete:
+        # deferred renders for this task contribute to the final summary
+        await _wait_for_renders(task_id)
+        IO_POOL.submit(_render_history.save)
         with _batch_lock:
             acc = _batch_accumulator[task_id]
             final_cats = sorted(acc["categories"])
-            final_kws  = acc["keywords"]
-            final_snippets = acc.get("snippets", [])  # Get all accumulated snippets
-            final_urls = acc["sub_urls"]
+            final_kw_counts = acc["keyword_counts"]
+            final_snippets = acc["snippets"]
+            final_url_matches = acc["url_matches"]
+            final_urls = list(final_url_matches)
             total_all_matches = acc["total_matches"]  # Total count of ALL matches (before validation)
 
-        await _persist_result(task_id, main_url, final_urls, final_kws, final_cats, total_all_matches, final_snippets)
+        await _persist_result(task_id, main_url, final_url_matches, final_kw_counts, final_cats,
+                              total_all_matches, final_snippets)
 
         # Index to OpenSearch for dashboards
         try:
@@ -1482,9 +2508,9 @@ async def process_ingest_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
                     "session_id": task_id,
                     "main_url": main_url,
                     "total_pages": len(final_urls),
-                    "total_matches": len(final_kws),
+                    "total_matches": total_all_matches,
                     "categories": final_cats,
-                    "keywords": final_kws,
+                    "keywords": sorted(final_kw_counts),
                     "status": "completed"
                 }
                 opensearch_indexer.index_session_result(result_data)
@@ -1495,8 +2521,9 @@ async def process_ingest_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
         # Cleanup
         with _batch_lock:
             _batch_accumulator.pop(task_id, None)
-        with _match_lock:
-            match_buffer.pop(main_url, None)
+        _forget_screenshot_budget(task_id)
+        _match_index.clear(main_url)
+        with _html_lock:
             # Clean up HTML storage for URLs in this batch
             # URLs with hits are already saved to MinIO, so we can remove them from memory
             for url in final_urls:
@@ -1509,12 +2536,12 @@ async def process_ingest_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
         elif len(final_urls) > 100:
             gc.collect(1)  # Generation 1 collection
 
-        print(f"[ingest:complete] {task_id} batches={batch_num} pages={len(final_urls)} matches={len(final_kws)}", flush=True)
+        print(f"[ingest:complete] {task_id} batches={batch_num} pages={len(final_urls)} matches={total_all_matches}", flush=True)
         return {
             "task_id": task_id,
             "main_url": main_url,
             "total_pages": len(final_urls),
-            "total_matches": len(final_kws),
+            "total_matches": total_all_matches,
             "total_batches": batch_num,
             "categories": final_cats,
             "spacy_validation_enabled": bool(ENABLE_SPACY_VALIDATION and USE_SPACY and _SPACY_MODEL is not None),
@@ -1523,7 +2550,7 @@ async def process_ingest_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
 
     # Incremental update - cleanup HTML for processed URLs in this batch
     # (even if batch is incomplete, we can free memory for processed URLs)
-    with _match_lock:
+    with _html_lock:
         for url in sub_urls:
             # Only remove if URL has been saved or if we need space
             if url in _html_saved or len(_html_storage) > _HTML_STORAGE_MAX_SIZE * 0.8:
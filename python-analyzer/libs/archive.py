@@ -0,0 +1,415 @@
+"""
+Cold-data archive: aged hits and results as Parquet in the MinIO bucket.
+
+`archive_cold_data()` moves rows older than ARCHIVE_AFTER_DAYS out of Postgres:
+
+- hits:    one file per (day, category) -
+           archive/hits/day=YYYY-MM-DD/category=<category>/part-<first id>.parquet
+           On the partitioned table, whole partitions that end before the cutoff
+           are detached as hits_archive_* tables (as partition retention does,
+           models/database_init.py), exported, and dropped; no rows are DELETEd
+           from live partitions. Only hits_default (and an unpartitioned hits)
+           is exported and deleted day by day.
+- results: one file per day - archive/results/day=YYYY-MM-DD/part-<first id>.parquet,
+           with the result_urls counts folded in as url_matches (JSON); the
+           snippets object behind raw_data_url is copied under archive/snippets/
+           and the archived row points there
+
+archive/manifest.json lists every file with its table, day, row count,
+timestamp range and main_urls. A file is uploaded and listed in the manifest
+before its rows are deleted, in that order, and file names depend only on the
+rows in them, so a run that fails half way is simply repeated. Runs are
+serialized across replicas with a Postgres advisory lock.
+
+`read_archived_report(main_url)` / `list_archived_results()` serve the report
+endpoints: the manifest (cached ARCHIVE_MANIFEST_TTL_SEC) says which files
+mention a main_url, and only those are read.
+
+pyarrow is optional; without it, or without MinIO, archiving is off and
+reads return nothing.
+"""
+
+import io
+import itertools
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.orm import Session
+
+import config.settings as settings
+from config.settings import MINIO_BUCKET, engine
+from models.database_init import detach_hit_partitions, hits_is_partitioned
+from models.hit_model import Hit, Result, ResultUrl
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    _HAS_PYARROW = True
+except ImportError:  # pragma: no cover - optional dependency
+    pa = pq = None
+    _HAS_PYARROW = False
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", "0"))          # 0 = archiving off
+ARCHIVE_PREFIX = os.environ.get("ARCHIVE_PREFIX", "archive").strip("/")
+ARCHIVE_BATCH_ROWS = int(os.environ.get("ARCHIVE_BATCH_ROWS", "50000"))       # rows per Parquet row group
+ARCHIVE_COMPRESSION = os.environ.get("ARCHIVE_COMPRESSION", "zstd")
+ARCHIVE_MANIFEST_TTL_SEC = float(os.environ.get("ARCHIVE_MANIFEST_TTL_SEC", "60"))
+
+MANIFEST_OBJECT = f"{ARCHIVE_PREFIX}/manifest.json"
+_LOCK_KEY = 0x61726368  # pg advisory lock id ("arch")
+_DAY = 86400
+
+HIT_COLUMNS = ("id", "task_id", "main_url", "sub_url", "category", "matched_keyword", "snippet",
+               "screenshot_path", "timestamp", "source", "confident_score")
+RESULT_COLUMNS = ("id", "task_id", "main_url", "categories", "keyword_counts", "url_matches",
+                  "total_matches", "total_urls", "raw_data_url", "raw_data", "timestamp")
+
+if _HAS_PYARROW:
+    HIT_SCHEMA = pa.schema([
+        ("id", pa.int64()), ("task_id", pa.string()), ("main_url", pa.string()), ("sub_url", pa.string()),
+        ("category", pa.string()), ("matched_keyword", pa.string()), ("snippet", pa.string()),
+        ("screenshot_path", pa.string()), ("timestamp", pa.int64()), ("source", pa.string()),
+        ("confident_score", pa.int32()),
+    ])
+    # JSON columns (categories, keyword_counts, url_matches) are stored as JSON text
+    RESULT_SCHEMA = pa.schema([
+        ("id", pa.int64()), ("task_id", pa.string()), ("main_url", pa.string()), ("categories", pa.string()),
+        ("keyword_counts", pa.string()), ("url_matches", pa.string()), ("total_matches", pa.int64()),
+        ("total_urls", pa.int64()), ("raw_data_url", pa.string()), ("raw_data", pa.string()),
+        ("timestamp", pa.int64()),
+    ])
+
+
+def archive_enabled() -> bool:
+    """Archive files can be written and read (pyarrow installed, MinIO connected)."""
+    return _HAS_PYARROW and settings.minio_client is not None
+
+
+def _day(ts: int) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d")
+
+
+def _safe(value: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in (value or "none"))[:64]
+
+
+# ---------------- manifest ----------------
+_manifest: Optional[Dict[str, Any]] = None
+_manifest_loaded = 0.0
+_manifest_lock = threading.Lock()
+
+
+def _empty_manifest() -> Dict[str, Any]:
+    return {"version": 1, "updated": 0, "files": {}}
+
+
+def load_manifest(max_age: float = ARCHIVE_MANIFEST_TTL_SEC) -> Dict[str, Any]:
+    """The archive manifest ({"files": {object: entry}}), cached for max_age seconds."""
+    global _manifest, _manifest_loaded
+    if not archive_enabled():
+        return _empty_manifest()
+    with _manifest_lock:
+        if _manifest is not None and time.time() - _manifest_loaded < max_age:
+            return _manifest
+        client = settings.minio_client
+        if client.object_exists(MINIO_BUCKET, MANIFEST_OBJECT):
+            _manifest = json.loads(client.get_object(MINIO_BUCKET, MANIFEST_OBJECT))
+        else:
+            _manifest = _empty_manifest()
+        _manifest_loaded = time.time()
+        return _manifest
+
+
+def _save_manifest(manifest: Dict[str, Any]) -> None:
+    global _manifest, _manifest_loaded
+    manifest["updated"] = int(time.time())
+    data = json.dumps(manifest, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    settings.minio_client.upload_object(MINIO_BUCKET, MANIFEST_OBJECT, io.BytesIO(data), len(data),
+                                        content_type="application/json")
+    with _manifest_lock:
+        _manifest, _manifest_loaded = manifest, time.time()
+
+
+def archived_objects(table: str, main_url: Optional[str] = None) -> List[str]:
+    """Archive files of `table` ("hits" / "results"), optionally only those mentioning main_url."""
+    files = load_manifest()["files"]
+    return sorted(name for name, entry in files.items()
+                  if entry["table"] == table and (main_url is None or main_url in entry["main_urls"]))
+
+
+# ---------------- writing ----------------
+def _upload_parquet(object_name: str, schema, batches: Iterable[Dict[str, list]]) -> int:
+    """Write column batches as row groups of one Parquet file (on disk) and upload it; returns rows."""
+    rows = 0
+    with tempfile.TemporaryDirectory(prefix="archive-") as tmp:
+        path = os.path.join(tmp, "part.parquet")
+        with pq.ParquetWriter(path, schema, compression=ARCHIVE_COMPRESSION) as writer:
+            for columns in batches:
+                writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+                rows += len(columns["id"])
+        with open(path, "rb") as f:
+            settings.minio_client.upload_object(MINIO_BUCKET, object_name, f, os.path.getsize(path),
+                                                content_type="application/vnd.apache.parquet")
+    return rows
+
+
+class _Span:
+    """Row count, id / timestamp range and main_urls of the rows written to one file."""
+
+    def __init__(self):
+        self.rows = 0
+        self.first_id = self.last_id = None
+        self.min_ts = self.max_ts = None
+        self.main_urls = set()
+
+    def add(self, row_id: int, ts: int, main_url: str) -> None:
+        self.rows += 1
+        self.first_id = row_id if self.first_id is None else min(self.first_id, row_id)
+        self.last_id = row_id if self.last_id is None else max(self.last_id, row_id)
+        self.min_ts = ts if self.min_ts is None else min(self.min_ts, ts)
+        self.max_ts = ts if self.max_ts is None else max(self.max_ts, ts)
+        self.main_urls.add(main_url)
+
+    def entry(self, table: str, day: str, category: Optional[str] = None) -> Dict[str, Any]:
+        return {"table": table, "day": day, "category": category, "rows": self.rows,
+                "min_ts": self.min_ts, "max_ts": self.max_ts, "main_urls": sorted(self.main_urls)}
+
+
+def _column_batches(rows: Iterable[tuple], names: Tuple[str, ...], span: _Span):
+    """Group streamed rows into ARCHIVE_BATCH_ROWS column dicts, recording them in span."""
+    i_id, i_ts, i_url = names.index("id"), names.index("timestamp"), names.index("main_url")
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, ARCHIVE_BATCH_ROWS))
+        if not chunk:
+            return
+        for r in chunk:
+            span.add(r[i_id], r[i_ts], r[i_url])
+        yield {name: [r[j] for r in chunk] for j, name in enumerate(names)}
+
+
+def _archive_hits_day(conn, source: str, lo: int, manifest: Dict[str, Any]) -> Tuple[int, Optional[int]]:
+    """Stream the hits of one day from `source` into one file per category; returns (rows, last id)."""
+    stream = conn.execution_options(stream_results=True, yield_per=ARCHIVE_BATCH_ROWS).execute(text(
+        f"SELECT {', '.join(HIT_COLUMNS)} FROM {source} "
+        f"WHERE timestamp >= :lo AND timestamp < :hi ORDER BY category, id"), {"lo": lo, "hi": lo + _DAY})
+    total, last_id = 0, None
+    for category, rows in itertools.groupby((tuple(r) for r in stream), key=lambda r: r[4]):
+        span = _Span()
+        # named after the first row; the span is only complete once the file is written
+        rows = iter(rows)
+        first = next(rows)
+        object_name = (f"{ARCHIVE_PREFIX}/hits/day={_day(lo)}/category={_safe(category)}/"
+                       f"part-{first[0]}.parquet")
+        _upload_parquet(object_name, HIT_SCHEMA, _column_batches(itertools.chain([first], rows), HIT_COLUMNS, span))
+        manifest["files"][object_name] = span.entry("hits", _day(lo), category)
+        total += span.rows
+        last_id = span.last_id if last_id is None else max(last_id, span.last_id)
+    return total, last_id
+
+
+def _hit_sources(conn, partitioned: bool) -> List[str]:
+    """
+    The live table exported and deleted day by day (hits_default when hits is
+    partitioned, else hits), then the detached partitions (hits_archive_YYYYMMDD),
+    exported whole and dropped.
+    """
+    return ["hits_default" if partitioned else "hits"] + list(conn.execute(text(
+        "SELECT c.relname FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+        "WHERE c.relkind = 'r' AND c.relname LIKE 'hits\\_archive\\_%' AND n.nspname = current_schema() "
+        "ORDER BY c.relname")).scalars())
+
+
+def _archive_hits(cutoff_day: int, manifest: Dict[str, Any]) -> int:
+    archived = 0
+    with engine.connect() as conn:
+        partitioned = bool(hits_is_partitioned(conn))
+    if partitioned:
+        # whole partitions before the cutoff: detached now, exported and dropped below
+        detached_now = detach_hit_partitions(cutoff_day)
+        if detached_now:
+            logger.info(f"Detached for archiving: {', '.join(detached_now)}")
+    with engine.connect() as conn:
+        sources = _hit_sources(conn, partitioned)
+    for source in sources:
+        detached = source.startswith("hits_archive_")
+        bound = None if detached else cutoff_day
+        while True:
+            with engine.connect() as conn:
+                oldest = conn.execute(text(
+                    f"SELECT min(timestamp) FROM {source}" + ("" if detached else " WHERE timestamp < :cut")
+                ), {} if detached else {"cut": bound}).scalar()
+                if oldest is None:
+                    break
+                lo = oldest - oldest % _DAY
+                rows, last_id = _archive_hits_day(conn, source, lo, manifest)
+            _save_manifest(manifest)
+            with engine.begin() as conn:
+                conn.execute(text(f"DELETE FROM {source} WHERE timestamp >= :lo AND timestamp < :hi "
+                                  f"AND id <= :last"), {"lo": lo, "hi": lo + _DAY, "last": last_id})
+            archived += rows
+            logger.info(f"Archived {rows} hits of {_day(lo)} from {source}")
+        if detached:
+            with engine.begin() as conn:
+                conn.execute(text(f"DROP TABLE {source}"))
+            logger.info(f"Dropped {source} (archived)")
+    return archived
+
+
+def _result_row(result: Result, url_matches: Dict[str, int], raw_data_url: Optional[str]) -> tuple:
+    keyword_counts = result.keyword_counts
+    total_matches, total_urls = result.total_matches, result.total_urls
+    if total_matches is None:  # rows written before the count columns: one list entry per match
+        keyword_counts = {}
+        for kw in result.keyword_match or []:
+            keyword_counts[kw] = keyword_counts.get(kw, 0) + 1
+        url_matches = {url: 0 for url in result.sub_urls or []}
+        total_matches, total_urls = len(result.keyword_match or []), len(url_matches)
+    return (result.id, result.task_id, result.main_url, json.dumps(result.categories or []),
+            json.dumps(keyword_counts or {}, ensure_ascii=False), json.dumps(url_matches, ensure_ascii=False),
+            total_matches, total_urls, raw_data_url, result.raw_data, result.timestamp)
+
+
+def _archive_snippets(raw_data_url: Optional[str]) -> Optional[str]:
+    """
+    Copy a result's snippets object under ARCHIVE_PREFIX/snippets/ (outside the
+    expiring prefixes) and return the URL to keep in the archived row; the
+    original URL if it is already there or the object is gone.
+    """
+    if not raw_data_url:
+        return raw_data_url
+    object_name = raw_data_url.split(f"{MINIO_BUCKET}/", 1)[-1]
+    if object_name.startswith(f"{ARCHIVE_PREFIX}/"):
+        return raw_data_url
+    target = f"{ARCHIVE_PREFIX}/snippets/{object_name}"
+    client = settings.minio_client
+    if not client.object_exists(MINIO_BUCKET, target):
+        if not client.object_exists(MINIO_BUCKET, object_name):
+            logger.warning(f"Snippets object missing, archived as is: {object_name}")
+            return raw_data_url
+        data = client.get_object(MINIO_BUCKET, object_name)
+        client.upload_object(MINIO_BUCKET, target, io.BytesIO(data), len(data), content_type="text/plain")
+    return raw_data_url[:len(raw_data_url) - len(object_name)] + target
+
+
+def _archive_results(cutoff_day: int, manifest: Dict[str, Any]) -> int:
+    archived = 0
+    while True:
+        with Session(engine) as db:
+            oldest = db.execute(select(Result.timestamp).where(Result.timestamp < cutoff_day)
+                                .order_by(Result.timestamp).limit(1)).scalar()
+            if oldest is None:
+                break
+            lo = oldest - oldest % _DAY
+            hi = lo + _DAY
+            results = db.execute(select(Result).where(Result.timestamp >= lo, Result.timestamp < hi)
+                                 .order_by(Result.id)).scalars().all()
+            urls: Dict[str, Dict[str, int]] = {}
+            for main_url, sub_url, matches in db.execute(
+                    select(ResultUrl.main_url, ResultUrl.sub_url, ResultUrl.matches)
+                    .where(ResultUrl.main_url.in_([r.main_url for r in results]))):
+                urls.setdefault(main_url, {})[sub_url] = matches
+            rows = [_result_row(r, urls.get(r.main_url, {}), _archive_snippets(r.raw_data_url)) for r in results]
+
+        object_name = f"{ARCHIVE_PREFIX}/results/day={_day(lo)}/part-{rows[0][0]}.parquet"
+        span = _Span()
+        count = _upload_parquet(object_name, RESULT_SCHEMA, _column_batches(rows, RESULT_COLUMNS, span))
+        manifest["files"][object_name] = span.entry("results", _day(lo))
+        _save_manifest(manifest)
+
+        with engine.begin() as conn:
+            # a rescan since the export moved the row's timestamp on: keep it
+            gone = conn.execute(delete(Result).where(Result.main_url.in_(sorted(span.main_urls)),
+                                                     Result.timestamp < hi)
+                                .returning(Result.main_url)).scalars().all()
+            if gone:
+                conn.execute(delete(ResultUrl).where(ResultUrl.main_url.in_(gone)))
+        archived += count
+        logger.info(f"Archived {count} results of {_day(lo)}")
+    return archived
+
+
+def archive_cold_data(now: Optional[float] = None) -> Dict[str, int]:
+    """Archive hits and results older than ARCHIVE_AFTER_DAYS; returns the rows moved per table."""
+    if ARCHIVE_AFTER_DAYS <= 0 or not archive_enabled():
+        return {}
+    cutoff = (now or time.time()) - ARCHIVE_AFTER_DAYS * _DAY
+    cutoff_day = int(cutoff - cutoff % _DAY)  # whole days only
+    with engine.connect() as lock_conn:
+        if not lock_conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": _LOCK_KEY}).scalar():
+            logger.info("Archive run skipped: another one is in progress")
+            return {}
+        try:
+            manifest = load_manifest(max_age=0)
+            moved = {"hits": _archive_hits(cutoff_day, manifest),
+                     "results": _archive_results(cutoff_day, manifest)}
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _LOCK_KEY})
+            lock_conn.commit()
+    logger.info(f"Archive run before {_day(cutoff_day)}: {moved}")
+    return moved
+
+
+# ---------------- reading ----------------
+def _read(object_name: str, columns=None, main_url: Optional[str] = None):
+    data = settings.minio_client.get_object(MINIO_BUCKET, object_name)
+    filters = [("main_url", "=", main_url)] if main_url is not None else None
+    return pq.read_table(pa.BufferReader(data), columns=columns, filters=filters).to_pylist()
+
+
+def _to_result(row: Dict[str, Any]) -> Result:
+    """A detached Result (never added to a session) from an archived row."""
+    return Result(id=row["id"], task_id=row["task_id"], main_url=row["main_url"],
+                  categories=json.loads(row["categories"]), keyword_counts=json.loads(row["keyword_counts"]),
+                  total_matches=row["total_matches"], total_urls=row["total_urls"],
+                  raw_data_url=row["raw_data_url"], raw_data=row["raw_data"], timestamp=row["timestamp"],
+                  sub_urls=[], keyword_match=[])
+
+
+def read_archived_result(main_url: str) -> Tuple[Optional[Result], Dict[str, int]]:
+    """The latest archived result of main_url (detached, or None) and its url_matches. Blocking."""
+    result, url_matches = None, {}
+    if not archive_enabled():
+        return result, url_matches
+    for name in archived_objects("results", main_url):
+        for row in _read(name, main_url=main_url):
+            if result is None or row["timestamp"] >= result.timestamp:
+                result, url_matches = _to_result(row), json.loads(row["url_matches"])
+    return result, url_matches
+
+
+def read_archived_report(main_url: str) -> Tuple[Optional[Result], Dict[str, int], List[Hit]]:
+    """
+    read_archived_result plus the archived hits of main_url (detached Hit
+    objects, oldest first). Blocking (MinIO reads).
+    """
+    if not archive_enabled():
+        return None, {}, []
+    result, url_matches = read_archived_result(main_url)
+    hits = [Hit(**row) for name in archived_objects("hits", main_url)
+            for row in _read(name, main_url=main_url)]
+    hits.sort(key=lambda h: (h.timestamp, h.id))
+    return result, url_matches, hits
+
+
+def list_archived_results() -> List[Dict[str, Any]]:
+    """Summary rows (as in the task list) of every archived result. Blocking."""
+    if not archive_enabled():
+        return []
+    columns = ["main_url", "task_id", "total_matches", "total_urls", "categories", "timestamp"]
+    latest: Dict[str, Dict[str, Any]] = {}
+    for name in archived_objects("results"):
+        for row in _read(name, columns=columns):
+            if row["main_url"] not in latest or row["timestamp"] >= latest[row["main_url"]]["timestamp"]:
+                row["categories"] = json.loads(row["categories"])
+                latest[row["main_url"]] = row
+    return list(latest.values())
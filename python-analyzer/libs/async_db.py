@@ -0,0 +1,43 @@
+"""
+Database calls from async code.
+
+`run_db(fn, *args)` runs `fn(session, *args)` where `fn` is ordinary
+synchronous Session code:
+
+- async engine available (config.settings.AsyncSessionLocal, asyncpg):
+  AsyncSession.run_sync, so the queries await on the asyncpg pool and the
+  event loop is free while they run; no thread is involved
+- otherwise: a sync session on `executor` (a thread pool), as before
+
+The same function therefore serves both engines. `fn` commits or rolls back
+itself; the session is closed afterwards either way.
+"""
+
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, Callable, Optional
+
+import config.settings as settings
+
+
+def async_enabled() -> bool:
+    return settings.AsyncSessionLocal is not None
+
+
+async def run_db(fn: Callable[..., Any], *args, executor: Optional[Executor] = None,
+                 use_async: Optional[bool] = None) -> Any:
+    """Run fn(session, *args) on the async engine, or on `executor` with a sync session."""
+    if use_async is None:
+        use_async = async_enabled()
+    if use_async:
+        async with settings.AsyncSessionLocal() as db:
+            return await db.run_sync(fn, *args)
+
+    def _sync():
+        db = settings.SessionLocal()
+        try:
+            return fn(db, *args)
+        finally:
+            db.close()
+
+    return await asyncio.get_running_loop().run_in_executor(executor, _sync)
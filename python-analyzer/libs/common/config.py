@@ -4,7 +4,7 @@ Centralized configuration management with validation.
 import os
 import logging
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import Optional, Tuple
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
@@ -23,6 +23,12 @@ class DatabaseConfig:
     pool_timeout: int = 30
     pool_recycle: int = 1800
     connect_timeout: int = 10
+    # async engine (asyncpg) used by the analyzer's hot paths and report reads
+    use_async: bool = True
+    async_pool_size: int = 20
+    async_max_overflow: int = 10
+    statement_timeout_ms: int = 30000
+    prepared_statement_cache_size: int = 256
     
     @property
     def url(self) -> str:
@@ -32,6 +38,15 @@ class DatabaseConfig:
             f"@{self.host}:{self.port}/{self.database}"
         )
     
+    @property
+    def async_url(self) -> str:
+        """Build asyncpg database URL (with the prepared statement cache size)."""
+        return (
+            f"postgresql+asyncpg://{self.user}:{self.password}"
+            f"@{self.host}:{self.port}/{self.database}"
+            f"?prepared_statement_cache_size={self.prepared_statement_cache_size}"
+        )
+    
     @classmethod
     def from_env(cls) -> 'DatabaseConfig':
         """Load from environment variables."""
@@ -53,6 +68,11 @@ class DatabaseConfig:
             pool_timeout=int(os.environ.get("DB_POOL_TIMEOUT", "30")),
             pool_recycle=int(os.environ.get("DB_POOL_RECYCLE", "1800")),
             connect_timeout=int(os.environ.get("DB_CONNECT_TIMEOUT", "10")),
+            use_async=os.environ.get("DB_ASYNC", "1").lower() in ("1", "true", "yes"),
+            async_pool_size=int(os.environ.get("DB_ASYNC_POOL_SIZE", "20")),
+            async_max_overflow=int(os.environ.get("DB_ASYNC_MAX_OVERFLOW", "10")),
+            statement_timeout_ms=int(os.environ.get("DB_STATEMENT_TIMEOUT_MS", "30000")),
+            prepared_statement_cache_size=int(os.environ.get("DB_PREPARED_STATEMENT_CACHE", "256")),
         )
 
 
@@ -86,6 +106,9 @@ class MinioConfig:
     bucket: str = "analyzer-html"
     use_ssl: bool = False
     expiry_days: int = 5
+    # expiry applies under these prefixes only (empty: the whole bucket); archive/ and
+    # results/ (task snippets behind results.raw_data_url) are kept
+    expiry_prefixes: Tuple[str, ...] = ("screenshots/", "html-pages/")
     
     @property
     def secure(self) -> bool:
@@ -102,6 +125,8 @@ class MinioConfig:
             bucket=os.environ.get(f"{prefix}_BUCKET", "analyzer-html"),
             use_ssl=os.environ.get(f"{prefix}_USE_SSL", "false").lower() in ("1", "true", "yes"),
             expiry_days=int(os.environ.get(f"{prefix}_EXPIRY_DAYS", "5")),
+            expiry_prefixes=tuple(p.strip() for p in os.environ.get(
+                f"{prefix}_EXPIRY_PREFIXES", "screenshots/,html-pages/").split(",") if p.strip()),
         )
 
 
@@ -135,6 +160,7 @@ class RendererConfig:
     goto_timeout: int = 120000
     wait_until: str = "load"
     screenshot_endpoint: str = "http://localhost:9000/render-and-screenshot"
+    visibility_endpoint: str = "http://localhost:9000/render/visibility"
     
     @classmethod
     def from_env(cls) -> 'RendererConfig':
@@ -144,6 +170,7 @@ class RendererConfig:
         default_concurrency = calculate_worker_count(multiplier=2, max_workers=8, min_workers=2)
         base_url = os.environ.get("RENDERER_URL", "http://localhost:9000").rstrip("/")
         renderer_ss = os.environ.get("RENDERER_SS", f"{base_url}/render-and-screenshot")
+        renderer_vis = os.environ.get("RENDERER_VISIBILITY", f"{base_url}/render/visibility")
         
         return cls(
             url=base_url,
@@ -152,6 +179,7 @@ class RendererConfig:
             goto_timeout=int(os.environ.get("RENDERER_GOTO_TIMEOUT", "120000")),
             wait_until=os.environ.get("RENDERER_WAIT_UNTIL", "load"),
             screenshot_endpoint=renderer_ss,
+            visibility_endpoint=renderer_vis,
         )
 
 
@@ -6,9 +6,10 @@ Prevents data loss when queues overflow or operations fail.
 import json
 import time
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from dataclasses import dataclass, asdict
 from config.settings import redis_client
+from models.hit_model import HitRecord
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +28,40 @@ class FailedHit:
     error: str
     retry_count: int = 0
     created_at: float = 0.0
+    # id reserved by the failed write: with the timestamp it is the primary key,
+    # so a retry of a batch that did commit is dropped by the staging merge
+    id: Optional[int] = None
+
+    @classmethod
+    def from_record(cls, hit: HitRecord, error: str, retry_count: int = 0) -> "FailedHit":
+        return cls(
+            task_id=hit.task_id,
+            main_url=hit.main_url,
+            sub_url=hit.sub_url,
+            category=hit.category,
+            matched_keyword=hit.matched_keyword,
+            snippet=hit.snippet,
+            timestamp=hit.timestamp,
+            source=hit.source,
+            confident_score=hit.confident_score or 0,
+            error=error,
+            retry_count=retry_count,
+            id=hit.id,
+        )
+
+    def to_record(self) -> HitRecord:
+        return HitRecord(
+            id=self.id,
+            task_id=self.task_id,
+            main_url=self.main_url,
+            sub_url=self.sub_url,
+            category=self.category,
+            matched_keyword=self.matched_keyword,
+            snippet=self.snippet,
+            timestamp=self.timestamp,
+            source=self.source,
+            confident_score=self.confident_score,
+        )
 
 @dataclass
 class FailedScreenshot:
@@ -45,6 +80,8 @@ class DeadLetterQueue:
     
     HIT_QUEUE_KEY = "dlq:hits"
     SCREENSHOT_QUEUE_KEY = "dlq:screenshots"
+    # screenshots skipped by the budget policy, per task, for on-demand capture later
+    SKIPPED_SCREENSHOT_KEY = "skipped:screenshots:{task_id}"
     MAX_RETRIES = 5
     TTL_DAYS = 30
     
@@ -117,6 +154,46 @@ class DeadLetterQueue:
             logger.error(f"[dlq:screenshot:dequeue:error] {e}")
             return None
     
+    def record_skipped_screenshot(self, screenshot: FailedScreenshot) -> bool:
+        """Remember a screenshot the budget policy skipped (reason in `error`)."""
+        if not self.enabled:
+            return False
+        
+        try:
+            screenshot.created_at = time.time()
+            key = self.SKIPPED_SCREENSHOT_KEY.format(task_id=screenshot.task_id)
+            redis_client.lpush(key, json.dumps(asdict(screenshot), default=str))
+            redis_client.expire(key, self.TTL_DAYS * 24 * 3600)
+            return True
+        except Exception as e:
+            logger.error(f"[skipped:screenshot:error] Failed to record: {e}")
+            return False
+    
+    def skipped_screenshots(self, task_id: str, limit: int = 100) -> Dict[str, Any]:
+        """Count and oldest `limit` skipped screenshots of a task."""
+        if not self.enabled:
+            return {"enabled": False, "count": 0, "items": []}
+        
+        try:
+            key = self.SKIPPED_SCREENSHOT_KEY.format(task_id=task_id)
+            items = [json.loads(d) for d in redis_client.lrange(key, -limit, -1)] if limit > 0 else []
+            return {"enabled": True, "count": redis_client.llen(key), "items": items[::-1]}
+        except Exception as e:
+            logger.error(f"[skipped:screenshot:list:error] {e}")
+            return {"enabled": False, "error": str(e), "count": 0, "items": []}
+    
+    def pop_skipped_screenshots(self, task_id: str, limit: int = 100) -> List[FailedScreenshot]:
+        """Remove and return up to `limit` skipped screenshots of a task, oldest first."""
+        if not self.enabled or limit <= 0:
+            return []
+        
+        try:
+            data = redis_client.rpop(self.SKIPPED_SCREENSHOT_KEY.format(task_id=task_id), limit) or []
+            return [FailedScreenshot(**json.loads(d)) for d in data]
+        except Exception as e:
+            logger.error(f"[skipped:screenshot:pop:error] {e}")
+            return []
+    
     def stats(self) -> Dict[str, Any]:
         """Get DLQ statistics."""
         if not self.enabled:
@@ -0,0 +1,156 @@
+"""
+Bulk hit writer using PostgreSQL COPY.
+
+Takes HitRecord objects (models/hit_model.py). Ids are reserved from the hits
+sequence up front and set on the records, so callers get them back without
+RETURNING and a retried batch reuses its ids.
+Rows are then streamed with COPY (CSV over psycopg2, binary records over
+asyncpg when called through an async session's run_sync):
+
+- "copy":         straight into hits; a batch that arrives with ids already
+                  set (a retry, e.g. from the DLQ) goes through staging instead
+- "copy_staging": into a temporary table, merged with
+                  INSERT ... SELECT ... ON CONFLICT DO NOTHING (the primary
+                  key: (id, timestamp) on the partitioned table), so
+                  re-sending a batch that partly landed inserts nothing twice
+- "orm":          Session.bulk_save_objects on Hit objects built from the
+                  records (the previous path)
+
+Any COPY failure rolls back and falls back to the ORM path, which inserts
+hits that already have an id with ON CONFLICT DO NOTHING, so a batch that
+did land is not inserted (or failed) a second time.
+"""
+
+import csv
+import io
+import logging
+from typing import List, Union
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only
+
+from models.hit_model import Hit, HitRecord
+
+logger = logging.getLogger(__name__)
+
+MODES = ("copy_staging", "copy", "orm")
+
+_TABLE = Hit.__tablename__
+_COLUMNS = ("id", "task_id", "main_url", "sub_url", "category", "matched_keyword", "snippet",
+            "screenshot_path", "timestamp", "source", "confident_score")
+_COLUMN_LIST = ", ".join(f'"{c}"' for c in _COLUMNS)
+_NOT_NULL = {c.name for c in Hit.__table__.columns
+             if not c.nullable and not c.primary_key and c.name in _COLUMNS}
+_NOT_NULL_LIST = ", ".join(f'"{c}"' for c in _COLUMNS if c in _NOT_NULL)
+_STAGE = "_hits_stage"
+
+Hits = List[Union[HitRecord, Hit]]
+
+
+def _text(value):
+    # Postgres text cannot hold NUL bytes
+    return value.replace("\x00", "") if isinstance(value, str) else value
+
+
+def _reserve_ids(db: Session, hits: Hits) -> None:
+    """Take ids from the table's sequence for hits that do not have one yet."""
+    missing = [h for h in hits if h.id is None]
+    if not missing:
+        return
+    ids = db.execute(
+        text(f"SELECT nextval(pg_get_serial_sequence('{_TABLE}', 'id')) FROM generate_series(1, :n)"),
+        {"n": len(missing)},
+    ).scalars().all()
+    for hit, hit_id in zip(missing, ids):
+        hit.id = hit_id
+
+
+def _csv(hits: Hits) -> io.StringIO:
+    buf = io.StringIO()
+    # None and "" are both written as an empty field: NULL in nullable columns,
+    # "" in the NOT NULL ones (FORCE_NOT_NULL below)
+    writer = csv.writer(buf, lineterminator="\n")
+    for h in hits:
+        writer.writerow([_text(getattr(h, c)) for c in _COLUMNS])
+    buf.seek(0)
+    return buf
+
+
+def _value(hit, column: str):
+    # same values as the CSV: None becomes "" in the NOT NULL columns
+    value = getattr(hit, column)
+    if value is None:
+        return "" if column in _NOT_NULL else None
+    return _text(value)
+
+
+def _records(hits: Hits) -> List[tuple]:
+    return [tuple(_value(h, c) for c in _COLUMNS) for h in hits]
+
+
+def _copy_rows(db: Session, hits: Hits, target: str) -> None:
+    driver = db.connection().connection.driver_connection
+    if type(driver).__module__.startswith("asyncpg"):
+        # inside AsyncSession.run_sync: await the driver's binary COPY in place
+        await_only(driver.copy_records_to_table(target, records=_records(hits), columns=list(_COLUMNS)))
+        return
+    cur = driver.cursor()
+    try:
+        cur.copy_expert(f"COPY {target} ({_COLUMN_LIST}) FROM STDIN "
+                        f"WITH (FORMAT csv, FORCE_NOT_NULL ({_NOT_NULL_LIST}))", _csv(hits))
+    finally:
+        cur.close()
+
+
+def _copy(db: Session, hits: Hits, staging: bool) -> int:
+    if not staging:
+        _copy_rows(db, hits, _TABLE)
+        return len(hits)
+    db.execute(text(f"CREATE TEMP TABLE IF NOT EXISTS {_STAGE} "
+                    f"(LIKE {_TABLE} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"))
+    _copy_rows(db, hits, _STAGE)
+    merged = db.execute(text(f"INSERT INTO {_TABLE} ({_COLUMN_LIST}) SELECT {_COLUMN_LIST} FROM {_STAGE} "
+                             f"ON CONFLICT DO NOTHING"))
+    return merged.rowcount
+
+
+def write_hits(db: Session, hits: Hits, mode: str = "copy_staging") -> str:
+    """
+    Insert hits and commit; every hit has its id set afterwards.
+    Returns the path that wrote them ("copy", "copy_staging" or "orm").
+    Raises if the ORM path (or fallback) fails too.
+    """
+    if not hits:
+        return mode
+    if mode in ("copy", "copy_staging"):
+        # ids set before reservation: the batch may already be stored, merge it
+        staging = mode == "copy_staging" or any(h.id is not None for h in hits)
+        try:
+            _reserve_ids(db, hits)
+            inserted = _copy(db, hits, staging=staging)
+            db.commit()
+            if inserted < len(hits):
+                logger.info(f"[hit_writer] {len(hits) - inserted} of {len(hits)} hits already stored")
+            return mode
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"[hit_writer] COPY failed, falling back to ORM: {e}")
+    _orm_insert(db, hits)
+    return "orm"
+
+
+def _orm_insert(db: Session, hits: Hits) -> None:
+    # hits with an id (reserved by a failed COPY, or a retry) may already be stored
+    keyed = [h for h in hits if h.id is not None]
+    new = [h for h in hits if h.id is None]
+    if keyed:
+        db.execute(pg_insert(Hit.__table__).on_conflict_do_nothing(),
+                   [{c: _value(h, c) for c in _COLUMNS} for h in keyed])
+    rows = [h.to_orm() if isinstance(h, HitRecord) else h for h in new]
+    if rows:
+        db.bulk_save_objects(rows, return_defaults=True)
+    db.commit()
+    for hit, row in zip(new, rows):
+        hit.id = row.id
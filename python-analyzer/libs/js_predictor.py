@@ -0,0 +1,177 @@
+"""
+Static heavy-JS predictor.
+
+Scores a fetched page from features that are cheap to read off the parsed
+HTML (script vs text volume, framework markers, empty mount nodes, noscript
+warnings) plus the domain's render history, and routes it to a lane:
+
+- static:          analyze the fetched HTML only
+- render_parallel: analyze the fetched HTML and also queue a render
+- render_first:    skip static analysis and queue a render straight away
+
+Kept free of service imports so the offline evaluation (cli/eval_js_predictor.py)
+can use it on captured pages.
+"""
+
+import json
+import math
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Any, Optional
+
+from selectolax.parser import HTMLParser  # type: ignore
+
+LANE_STATIC = "static"
+LANE_RENDER_PARALLEL = "render_parallel"
+LANE_RENDER_FIRST = "render_first"
+
+RENDER_FIRST_THRESHOLD    = float(os.environ.get("JS_RENDER_FIRST_THRESHOLD", "0.85"))
+RENDER_PARALLEL_THRESHOLD = float(os.environ.get("JS_RENDER_PARALLEL_THRESHOLD", "0.5"))
+# static-lane pages whose static pass came up thin are still rendered above this score
+THIN_RENDER_THRESHOLD     = float(os.environ.get("JS_THIN_RENDER_THRESHOLD", "0.25"))
+# renders needed before a domain's history is trusted
+HISTORY_MIN_RENDERS       = int(os.environ.get("JS_HISTORY_MIN_RENDERS", "3"))
+
+# raw-HTML markers of client-side frameworks / hydration payloads
+_FRAMEWORK_MARKERS = (
+    "__NEXT_DATA__", "__NUXT__", "ng-version", "ng-app", "data-reactroot",
+    "__INITIAL_STATE__", "webpackJsonp", "data-v-app", "ember-application", "__sveltekit",
+)
+# mount points that SPAs render into; empty ones mean the content is client-side
+_MOUNT_SELECTORS = ("#root", "#app", "#__next", "#__nuxt", "[data-reactroot]", "app-root", "#ember-application")
+
+
+@dataclass
+class PageFeatures:
+    html_bytes: int
+    text_bytes: int
+    script_bytes: int
+    external_scripts: int
+    framework: bool
+    empty_mount: bool
+    noscript_js: bool
+
+
+def extract_features(html: str, tree: HTMLParser) -> PageFeatures:
+    script_bytes = 0
+    external = 0
+    for node in tree.css("script"):
+        if node.attributes.get("src"):
+            external += 1
+        else:
+            script_bytes += len(node.text(deep=True) or "")
+    style_bytes = sum(len(node.text(deep=True) or "") for node in tree.css("style"))
+
+    body = tree.body
+    body_text = len(body.text(separator=" ", strip=True)) if body is not None else 0
+    # node text includes inline script/style bodies; take them back out
+    text_bytes = max(0, body_text - script_bytes - style_bytes)
+
+    empty_mount = False
+    for sel in _MOUNT_SELECTORS:
+        node = tree.css_first(sel)
+        if node is not None and len(node.text(strip=True)) < 20:
+            empty_mount = True
+            break
+
+    noscript_js = any("javascript" in (n.text() or "").lower() for n in tree.css("noscript"))
+
+    return PageFeatures(
+        html_bytes=len(html),
+        text_bytes=text_bytes,
+        script_bytes=script_bytes,
+        external_scripts=external,
+        framework=any(m in html for m in _FRAMEWORK_MARKERS),
+        empty_mount=empty_mount,
+        noscript_js=noscript_js,
+    )
+
+
+def score(features: PageFeatures, history_rate: Optional[float] = None) -> float:
+    """Probability-like score (0..1) that rendering reveals content the static HTML lacks."""
+    f = features
+    script_ratio = f.script_bytes / max(1, f.script_bytes + f.text_bytes)
+    z = -2.0
+    z += 2.0 * script_ratio
+    z += 0.15 * min(f.external_scripts, 10)
+    z += 1.0 if f.framework else 0.0
+    z += 2.0 if f.empty_mount else 0.0
+    z += 1.0 if f.noscript_js else 0.0
+    if f.text_bytes < 200:
+        z += 1.5
+    elif f.text_bytes > 5000:
+        # substantial server-rendered text (SSR frameworks included)
+        z -= 2.0
+    if history_rate is not None:
+        z += 4.0 * (history_rate - 0.5)
+    return 1.0 / (1.0 + math.exp(-z))
+
+
+def lane_for(p: float) -> str:
+    if p >= RENDER_FIRST_THRESHOLD:
+        return LANE_RENDER_FIRST
+    if p >= RENDER_PARALLEL_THRESHOLD:
+        return LANE_RENDER_PARALLEL
+    return LANE_STATIC
+
+
+class RenderHistory:
+    """
+    Per-domain count of renders and of renders that were useful (found matches
+    or more text than the static page). Persisted as JSON (data/domain_stats.json).
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._dirty = False
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f) or {}
+                self._stats = {d: v for d, v in data.items() if isinstance(v, dict) and "renders" in v}
+            except (OSError, ValueError) as e:
+                print(f"[js_predictor:history:error] cannot load {path}: {e}", flush=True)
+
+    def record(self, domain: str, useful: bool) -> None:
+        if not domain:
+            return
+        with self._lock:
+            s = self._stats.setdefault(domain, {"renders": 0, "useful": 0})
+            s["renders"] += 1
+            s["useful"] += int(useful)
+            self._dirty = True
+
+    def rate(self, domain: str) -> Optional[float]:
+        """Smoothed share of useful renders, or None with too little history."""
+        with self._lock:
+            s = self._stats.get(domain)
+            if not s or s["renders"] < HISTORY_MIN_RENDERS:
+                return None
+            return (s["useful"] + 1) / (s["renders"] + 2)
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {d: dict(v) for d, v in self._stats.items()}
+            self._dirty = False
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"[js_predictor:history:error] cannot save {self.path}: {e}", flush=True)
+
+
+def predict(html: str, tree: HTMLParser, domain: str = "",
+            history: Optional[RenderHistory] = None) -> Dict[str, Any]:
+    """Features, score and lane for one fetched page."""
+    features = extract_features(html, tree)
+    p = score(features, history.rate(domain) if history else None)
+    return {"features": features, "score": p, "lane": lane_for(p)}
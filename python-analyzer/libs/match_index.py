@@ -0,0 +1,55 @@
+"""
+Per-task (url, keyword) index used by record_hit to drop repeat matches.
+
+Each task (keyed by its main_url) has an insertion-ordered set of the
+(url, keyword) pairs already recorded, so the check is one hash lookup.
+Tasks are spread over `stripes` locks by key, so page workers of unrelated
+tasks never wait on each other. A task holds at most `max_per_task` pairs;
+past that the oldest are forgotten (a repeat of one of those is recorded
+again rather than letting memory grow). Kept free of service imports.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+Pair = Tuple[str, str]
+
+
+class MatchIndex:
+
+    def __init__(self, stripes: int = 64, max_per_task: int = 100000):
+        self.max_per_task = max_per_task
+        self._locks: List[threading.Lock] = [threading.Lock() for _ in range(max(1, stripes))]
+        self._tasks: List[Dict[str, "OrderedDict[Pair, None]"]] = [{} for _ in self._locks]
+
+    def _stripe(self, task_key: str) -> int:
+        return hash(task_key) % len(self._locks)
+
+    def add(self, task_key: str, url: str, keyword: str) -> bool:
+        """Record (url, keyword) for the task; False if it was already there."""
+        i = self._stripe(task_key)
+        pair = (url, keyword)
+        with self._locks[i]:
+            seen = self._tasks[i].get(task_key)
+            if seen is None:
+                seen = self._tasks[i][task_key] = OrderedDict()
+            elif pair in seen:
+                return False
+            seen[pair] = None
+            if self.max_per_task and len(seen) > self.max_per_task:
+                seen.popitem(last=False)
+            return True
+
+    def clear(self, task_key: str) -> None:
+        i = self._stripe(task_key)
+        with self._locks[i]:
+            self._tasks[i].pop(task_key, None)
+
+    def size(self, task_key: str) -> int:
+        i = self._stripe(task_key)
+        with self._locks[i]:
+            return len(self._tasks[i].get(task_key, ()))
+
+    def tasks(self) -> int:
+        return sum(len(t) for t in self._tasks)
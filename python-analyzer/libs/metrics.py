@@ -5,7 +5,7 @@ Tracks queue sizes, errors, and performance metrics.
 
 import time
 import threading
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
 from collections import defaultdict
 from config.settings import redis_client
 
@@ -33,6 +33,23 @@ def set_metric(name: str, value: Any):
     with _metrics_lock:
         _metrics[name] = value
 
+# Histogram bucket upper bounds, in milliseconds
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+def observe_metric(name: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+    """Record a value in a histogram metric: {"buckets": {le: cumulative count}, "count", "sum"}."""
+    with _metrics_lock:
+        hist = _metrics.get(name)
+        if not isinstance(hist, dict):
+            hist = {"buckets": {**{str(b): 0 for b in buckets}, "+Inf": 0}, "count": 0, "sum": 0.0}
+            _metrics[name] = hist
+        for b in buckets:
+            if value <= b:
+                hist["buckets"][str(b)] += 1
+        hist["buckets"]["+Inf"] += 1
+        hist["count"] += 1
+        hist["sum"] += value
+
 def get_metric(name: str, default: Any = 0) -> Any:
     """Get a metric value."""
     with _metrics_lock:
@@ -41,7 +58,9 @@ def get_metric(name: str, default: Any = 0) -> Any:
 def get_all_metrics() -> Dict[str, Any]:
     """Get all metrics."""
     with _metrics_lock:
-        return _metrics.copy()
+        # histograms are copied too, so callers never see them change mid-read
+        return {k: ({**v, "buckets": dict(v["buckets"])} if isinstance(v, dict) else v)
+                for k, v in _metrics.items()}
 
 def reset_metrics():
     """Reset all metrics (except counters that should persist)."""
@@ -7,9 +7,10 @@ Playwright Renderer microservice.
 """
 
 import asyncio
+import json
 import logging
 import requests
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator, List
 from urllib.parse import urlencode
 
 logger = logging.getLogger(__name__)
@@ -49,26 +50,26 @@ class RendererClient:
         self.session.mount("http://", adapter)
         self.session.mount("https://", adapter)
     
-    def render_html(self, url: str) -> Optional[str]:
+    def _deadline_ms(self, count: int = 1) -> int:
         """
-        Render a URL and return its HTML content (POST to /render endpoint).
-        
-        Used for JS-heavy pages where initial fetch doesn't have full content.
-        
-        Args:
-            url: URL to render
-            
-        Returns:
-            Rendered HTML content or None if rendering failed
+        Render budget sent to the renderer: slightly under our HTTP timeout per URL.
+        A batch of `count` URLs gets count times that: our read timeout runs
+        between result lines, so we keep waiting as long as renders keep
+        finishing, and each render is still capped by the renderer's own limit.
         """
+        return int(self.timeout * 1000 * 0.9) * max(1, count)
+
+    def _post_render(self, url: str, mode: str) -> Optional[Dict[str, Any]]:
+        """POST to /render and return the JSON body, or None on failure."""
         try:
             render_url = f"{self.renderer_url}/render"
-            logger.debug(f"[renderer] Requesting HTML render: {url}")
+            logger.debug(f"[renderer] Requesting {mode} render: {url}")
             
-            # POST request with JSON payload
+            # POST request with JSON payload; the deadline lets the renderer shed or
+            # drop work we would have stopped waiting for anyway
             resp = self.session.post(
                 render_url,
-                json={"url": url},
+                json={"url": url, "deadline_ms": self._deadline_ms(), "mode": mode},
                 timeout=self.timeout,
                 headers={"Content-Type": "application/json"}
             )
@@ -80,15 +81,7 @@ class RendererClient:
                 error = data.get("error", "unknown error")
                 logger.warning(f"[renderer] Render failed for {url}: {error}")
                 return None
-            
-            html_content = data.get("content")
-            
-            if html_content:
-                logger.info(f"[renderer] Successfully rendered {url} ({len(html_content)} bytes)")
-                return html_content
-            else:
-                logger.warning(f"[renderer] No content returned for {url}")
-                return None
+            return data
                 
         except requests.Timeout:
             logger.error(f"[renderer] Timeout rendering {url} (timeout={self.timeout}s)")
@@ -105,6 +98,92 @@ class RendererClient:
             from libs.metrics import increment_metric
             increment_metric("renderer_timeouts")
             return None
+
+    def render_html(self, url: str) -> Optional[str]:
+        """
+        Render a URL and return its HTML content (POST to /render endpoint).
+        
+        Used for JS-heavy pages where initial fetch doesn't have full content.
+        
+        Args:
+            url: URL to render
+            
+        Returns:
+            Rendered HTML content or None if rendering failed
+        """
+        data = self._post_render(url, "html")
+        if data is None:
+            return None
+        
+        html_content = data.get("content")
+        
+        if html_content:
+            logger.info(f"[renderer] Successfully rendered {url} ({len(html_content)} bytes)")
+            return html_content
+        else:
+            logger.warning(f"[renderer] No content returned for {url}")
+            return None
+
+    def render_text(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Render a URL and return text extracted in the browser (POST to /render, mode=text).
+        
+        Much smaller than the serialized DOM and needs no HTML parsing on our side.
+        
+        Args:
+            url: URL to render
+            
+        Returns:
+            Dictionary with "text", "images", "links" and "dom_bytes" (size of the DOM
+            that render_html would have returned), or None if rendering failed
+        """
+        data = self._post_render(url, "text")
+        if data is None:
+            return None
+        
+        if data.get("text") is None:
+            logger.warning(f"[renderer] No text returned for {url}")
+            return None
+        logger.info(f"[renderer] Successfully rendered {url} as text "
+                    f"({len(data['text'])} chars vs {data.get('dom_bytes', 0)} DOM bytes)")
+        return data
+    
+    def render_batch(self, urls: List[str], mode: str = "text") -> Iterator[Dict[str, Any]]:
+        """
+        Render many URLs over one streaming POST to /render/batch.
+        
+        Yields one result dict per URL as the renderer finishes it (completion
+        order); each carries "index" (position in `urls`), "url" and "ok".
+        Stops early on transport errors; URLs without a yielded result failed.
+        
+        Args:
+            urls: URLs to render
+            mode: "text" (in-browser extraction) or "html"
+        """
+        from libs.metrics import increment_metric
+        try:
+            logger.debug(f"[renderer] Requesting batch {mode} render: {len(urls)} urls")
+            # the read timeout applies between lines, i.e. to the slowest single render
+            with self.session.post(
+                f"{self.renderer_url}/render/batch",
+                json={"urls": urls, "mode": mode, "deadline_ms": self._deadline_ms(len(urls))},
+                timeout=self.timeout,
+                stream=True,
+            ) as resp:
+                resp.raise_for_status()
+                for line in resp.iter_lines():
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        logger.warning(f"[renderer] Bad batch line: {line[:200]!r}")
+        except requests.Timeout:
+            logger.error(f"[renderer] Timeout in batch render ({len(urls)} urls, timeout={self.timeout}s)")
+            increment_metric("renderer_timeouts")
+        except requests.RequestException as e:
+            logger.error(f"[renderer] Batch render failed ({len(urls)} urls): {e}")
+            increment_metric("renderer_timeouts")
     
     def render_and_screenshot(self, url: str, keyword: str, max_matches: int = 5) -> Optional[Dict[str, Any]]:
         """
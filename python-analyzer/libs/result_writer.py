@@ -0,0 +1,56 @@
+"""
+Result writer: one results row per main_url plus its per-page counts.
+
+The summary row is written with a single INSERT ... ON CONFLICT (main_url)
+DO UPDATE, so a rescan replaces the previous summary in place (Session.merge
+looked rows up by id, missed, and then hit the main_url unique constraint).
+Keywords are stored as a {keyword: matches} map instead of one list entry per
+match, and per-page counts go to result_urls, replaced in the same
+transaction. Snippets are not stored here: callers upload them and pass the
+pointer (raw_data_url), or inline raw_data when object storage is down.
+"""
+
+import time
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import delete, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from models.hit_model import Result, ResultUrl
+
+URL_CHUNK = 5000
+
+
+def write_result(db: Session, task_id: str, main_url: str, url_matches: Dict[str, int],
+                 keyword_counts: Dict[str, int], categories: Iterable[str], total_matches: int,
+                 raw_data_url: Optional[str] = None, raw_data: Optional[str] = None,
+                 timestamp: Optional[int] = None) -> None:
+    """Upsert the summary and replace its result_urls rows; commits."""
+    values = {
+        "task_id": task_id,
+        "main_url": main_url,
+        "categories": sorted(set(categories)),
+        "keyword_counts": dict(keyword_counts),
+        "total_matches": total_matches,
+        "total_urls": len(url_matches),
+        "raw_data_url": raw_data_url,
+        "raw_data": raw_data,
+        # superseded by result_urls / keyword_counts / raw_data_url
+        "sub_urls": [],
+        "keyword_match": [],
+        "cleaned_data": "",
+        "timestamp": timestamp or int(time.time()),
+    }
+    stmt = pg_insert(Result).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Result.main_url],
+        set_={name: stmt.excluded[name] for name in values if name != "main_url"},
+    )
+    db.execute(stmt)
+
+    db.execute(delete(ResultUrl).where(ResultUrl.main_url == main_url))
+    rows = [{"main_url": main_url, "sub_url": url, "matches": n} for url, n in url_matches.items()]
+    for i in range(0, len(rows), URL_CHUNK):
+        db.execute(insert(ResultUrl), rows[i:i + URL_CHUNK])
+    db.commit()
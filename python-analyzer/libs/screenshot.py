@@ -5,6 +5,7 @@ Refactored to use common utilities.
 import os
 import requests
 import logging
+from typing import List, Optional
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
@@ -31,10 +32,12 @@ _screenshot_session.mount("http://", _adapter)
 _screenshot_session.mount("https://", _adapter)
 
 
-def capture_screenshot(url: str, keyword: str):
+def capture_screenshot(url: str, keyword: str, keywords: Optional[List[str]] = None):
     """
     Sends a POST request to the renderer to capture a screenshot
     only for matched keyword area.
+    With `keywords`, one screenshot covers all of them and the response carries
+    per-keyword boxes in "boxes_by_keyword".
     Refactored to use centralized config and retry utilities.
     """
     config = get_config()
@@ -47,8 +50,12 @@ def capture_screenshot(url: str, keyword: str):
         "url": url,
         "keyword": keyword,
         "max_matches": 5,
-        "upload": False
+        "upload": False,
+        # renderer sheds (503) or drops queued work we would time out on anyway
+        "deadline_ms": int(timeout * 1000 * 0.9),
     }
+    if keywords:
+        json_payload["keywords"] = keywords
 
     logger.debug(f"[screenshot] POST {endpoint} | payload={json_payload}")
 
@@ -81,3 +88,39 @@ def capture_screenshot(url: str, keyword: str):
     except Exception as e:
         logger.error(f"[screenshot:fatal] {keyword}: {e}")
         return None
+
+
+def check_visibility(url: str, keywords: List[str], screenshot_keywords: Optional[List[str]] = None):
+    """
+    Ask the renderer whether keywords are visibly rendered on the page.
+    Returns the renderer response, whose "keywords" maps each keyword to
+    {visible, matches, visible_matches, boxes}, or None on failure (not retried).
+    With `screenshot_keywords`, the same render also returns a full-page
+    "screenshot_b64" (as capture_screenshot) when one of them is visible or
+    not literal page text; "captured_keywords" lists those.
+    """
+    config = get_config()
+    endpoint = config.renderer.visibility_endpoint
+    timeout = int(os.environ.get("SCREENSHOT_TIMEOUT" if screenshot_keywords else "VISIBILITY_TIMEOUT",
+                                 "90" if screenshot_keywords else "60"))
+
+    json_payload = {
+        "url": url,
+        "keywords": keywords,
+        "max_matches": 5,
+        "deadline_ms": int(timeout * 1000 * 0.9),
+    }
+    if screenshot_keywords:
+        json_payload["screenshot_keywords"] = screenshot_keywords
+
+    # one attempt: on any failure the caller screenshots as before, so a retry
+    # (bad input, a script error, an overloaded renderer) only adds page loads
+    try:
+        resp = _screenshot_session.post(endpoint, json=json_payload, timeout=timeout)
+        resp.raise_for_status()
+        return resp.json()
+    except requests.exceptions.Timeout:
+        logger.warning(f"[visibility:timeout] {url} after {timeout}s")
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.warning(f"[visibility:error] {url} {keywords}: {e}")
+    return None
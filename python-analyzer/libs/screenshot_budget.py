@@ -0,0 +1,104 @@
+"""
+Screenshot budget policy.
+
+Decides, per page (one coalesced screenshot), whether the screenshot is taken:
+
+- per-task cap:   at most `task_cap` screenshots per task
+- per-domain cap: at most `domain_cap` screenshots per domain within a task,
+                  shrinking towards `domain_floor` as load rises
+- sampling:       once load reaches `sampling_load`, only pages that add a
+                  keyword not yet captured for their domain are taken
+
+Load is the larger of the screenshot queue fill (0..1) and renderer latency
+pressure (0 at `target_latency_sec`, 1 at twice that). Pages are ordered by
+`priority` so the most distinct keywords and highest confidence go first.
+A cap of 0 means unlimited. An admitted page holds its slot until `settle()`:
+the slot is kept (and its keywords count as captured) only if the capture
+succeeded, otherwise it is given back. Kept free of service imports.
+"""
+
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+SKIP_TASK_BUDGET = "task_budget"
+SKIP_DOMAIN_BUDGET = "domain_budget"
+SKIP_SAMPLED_OUT = "sampled_out"
+
+
+def domain_of(url: str) -> str:
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class ScreenshotBudget:
+
+    def __init__(self, task_cap: int, domain_cap: int, domain_floor: int,
+                 sampling_load: float, target_latency_sec: float, latency_alpha: float = 0.2):
+        self.task_cap = task_cap
+        self.domain_cap = domain_cap
+        self.domain_floor = min(domain_floor, domain_cap) if domain_cap else domain_floor
+        self.sampling_load = sampling_load
+        self.target_latency_sec = target_latency_sec
+        self.latency_alpha = latency_alpha
+        self.latency_sec: Optional[float] = None  # EWMA of capture latency
+        self._task_counts: Dict[str, int] = defaultdict(int)
+        self._domain_counts: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._captured_keywords: Dict[Tuple[str, str], Set[str]] = defaultdict(set)
+
+    def observe_latency(self, seconds: float) -> None:
+        if self.latency_sec is None:
+            self.latency_sec = seconds
+        else:
+            self.latency_sec += self.latency_alpha * (seconds - self.latency_sec)
+
+    def load(self, queue_fill: float) -> float:
+        pressure = 0.0
+        if self.latency_sec is not None and self.target_latency_sec > 0:
+            pressure = self.latency_sec / self.target_latency_sec - 1.0
+        return max(0.0, min(1.0, max(queue_fill, pressure)))
+
+    def domain_limit(self, load: float) -> int:
+        """Effective per-domain cap at this load (0 = unlimited)."""
+        if not self.domain_cap:
+            return 0
+        return max(self.domain_floor, int(round(self.domain_cap * (1.0 - load))))
+
+    def novelty(self, task_id: str, domain: str, keywords: Iterable[str]) -> int:
+        seen = self._captured_keywords.get((task_id, domain), ())
+        return sum(1 for k in set(keywords) if k not in seen)
+
+    def priority(self, task_id: str, domain: str, keywords: Iterable[str], confidence: float) -> Tuple[int, float]:
+        """Sort key, lowest first: most new keywords, then highest confidence."""
+        return (-self.novelty(task_id, domain, keywords), -confidence)
+
+    def admit(self, task_id: str, domain: str, keywords: Iterable[str], load: float) -> Optional[str]:
+        """None if the screenshot fits the budget (and a slot is held for it), else the skip reason."""
+        keywords = set(keywords)
+        if self.task_cap and self._task_counts[task_id] >= self.task_cap:
+            return SKIP_TASK_BUDGET
+        limit = self.domain_limit(load)
+        if limit and self._domain_counts[(task_id, domain)] >= limit:
+            return SKIP_DOMAIN_BUDGET
+        if load >= self.sampling_load and not self.novelty(task_id, domain, keywords):
+            return SKIP_SAMPLED_OUT
+        self._task_counts[task_id] += 1
+        self._domain_counts[(task_id, domain)] += 1
+        return None
+
+    def settle(self, task_id: str, domain: str, captured: Iterable[str]) -> None:
+        """Close an admitted screenshot: keep its slot for the captured keywords, or release it if none were."""
+        captured = set(captured)
+        if captured:
+            self._captured_keywords[(task_id, domain)].update(captured)
+            return
+        if self._task_counts.get(task_id, 0) > 0:
+            self._task_counts[task_id] -= 1
+        if self._domain_counts.get((task_id, domain), 0) > 0:
+            self._domain_counts[(task_id, domain)] -= 1
+
+    def forget(self, task_id: str) -> None:
+        self._task_counts.pop(task_id, None)
+        for key in [k for k in self._domain_counts if k[0] == task_id]:
+            self._domain_counts.pop(key, None)
+            self._captured_keywords.pop(key, None)
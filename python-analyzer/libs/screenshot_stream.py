@@ -0,0 +1,101 @@
+"""
+Redis Streams backend for screenshot jobs.
+
+Jobs are XADDed to one stream and read through a consumer group, so any
+analyzer replica can take work another one produced and pending jobs survive
+a restart. Entries are acknowledged (and deleted) once processed; entries a
+dead consumer read but never acknowledged are taken over with XAUTOCLAIM
+after `claim_idle_ms`.
+
+Works with any redis-py client (decode_responses on or off); kept free of
+service imports so cli/bench_screenshot_stream.py can drive it directly.
+"""
+
+import logging
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Entry = Tuple[str, Dict[str, str]]
+
+
+def _s(value) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def _entries(raw) -> List[Entry]:
+    out: List[Entry] = []
+    for entry_id, fields in raw or []:
+        if fields is None:
+            # deleted while pending (XAUTOCLAIM on Redis < 7 returns these)
+            continue
+        out.append((_s(entry_id), {_s(k): _s(v) for k, v in fields.items()}))
+    return out
+
+
+class ScreenshotStream:
+    """One stream + consumer group; every method is a blocking redis call."""
+
+    def __init__(self, client, key: str = "screenshots:jobs", group: str = "screenshot-workers",
+                 claim_idle_ms: int = 180000):
+        self.client = client
+        self.key = key
+        self.group = group
+        self.claim_idle_ms = claim_idle_ms
+        self._claim_cursor = "0-0"
+
+    def ensure_group(self) -> None:
+        try:
+            self.client.xgroup_create(self.key, self.group, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def add(self, fields: Dict[str, str]) -> str:
+        return _s(self.client.xadd(self.key, fields))
+
+    def read(self, consumer: str, count: int, block_ms: int = 1000) -> List[Entry]:
+        """New entries for this consumer (blocks up to block_ms when there are none)."""
+        resp = self.client.xreadgroup(self.group, consumer, {self.key: ">"}, count=count, block=block_ms)
+        entries: List[Entry] = []
+        for _stream, raw in resp or []:
+            entries.extend(_entries(raw))
+        return entries
+
+    def reclaim(self, consumer: str, count: int) -> List[Entry]:
+        """Take over entries another consumer read but did not acknowledge within claim_idle_ms."""
+        resp = self.client.xautoclaim(self.key, self.group, consumer, self.claim_idle_ms,
+                                      start_id=self._claim_cursor, count=count)
+        # (next cursor, entries[, deleted ids]) depending on the Redis version
+        self._claim_cursor = _s(resp[0])
+        return _entries(resp[1])
+
+    def ack(self, ids: List[str]) -> None:
+        if not ids:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        pipe.xack(self.key, self.group, *ids)
+        # processed entries are not kept: XLEN stays the number of unfinished jobs
+        pipe.xdel(self.key, *ids)
+        pipe.execute()
+
+    def backlog(self) -> int:
+        """Entries not yet acknowledged (unread + pending)."""
+        return int(self.client.xlen(self.key))
+
+    def pending(self) -> int:
+        info = self.client.xpending(self.key, self.group)
+        return int(info.get("pending", 0) if isinstance(info, dict) else info[0])
+
+
+def create_stream(client, key: str, group: str, claim_idle_ms: int) -> Optional[ScreenshotStream]:
+    """A ScreenshotStream with its consumer group created, or None if Redis is unusable."""
+    if client is None:
+        return None
+    stream = ScreenshotStream(client, key, group, claim_idle_ms)
+    try:
+        stream.ensure_group()
+    except Exception as e:
+        logger.warning(f"[screenshot_stream] cannot create group {group} on {key}: {e}")
+        return None
+    return stream
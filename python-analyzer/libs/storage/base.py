@@ -20,6 +20,11 @@ class StorageClient(ABC):
         """Upload object and return URL."""
         pass
     
+    @abstractmethod
+    def get_object(self, bucket: str, object_name: str) -> bytes:
+        """Download object contents."""
+        pass
+    
     @abstractmethod
     def object_exists(self, bucket: str, object_name: str) -> bool:
         """Check if object exists."""
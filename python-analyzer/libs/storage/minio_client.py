@@ -44,15 +44,20 @@ class MinioStorageClient(StorageClient):
             from xml.etree.ElementTree import Element, SubElement, tostring
             
             rule = Element("LifecycleConfiguration")
-            rule1 = SubElement(rule, "Rule")
-            SubElement(rule1, "ID").text = "AutoDelete"
-            SubElement(rule1, "Status").text = "Enabled"
-            exp = SubElement(rule1, "Expiration")
-            SubElement(exp, "Days").text = str(self.config.expiry_days)
+            # one rule per expiring prefix, so other prefixes (archive/) are kept
+            for i, prefix in enumerate(self.config.expiry_prefixes or ("",)):
+                rule1 = SubElement(rule, "Rule")
+                SubElement(rule1, "ID").text = "AutoDelete" if not prefix else f"AutoDelete-{i}"
+                SubElement(rule1, "Status").text = "Enabled"
+                if prefix:
+                    SubElement(SubElement(rule1, "Filter"), "Prefix").text = prefix
+                exp = SubElement(rule1, "Expiration")
+                SubElement(exp, "Days").text = str(self.config.expiry_days)
             
             xml_config = tostring(rule, encoding="utf-8", method="xml")
             self.client.set_bucket_lifecycle(self.config.bucket, xml_config)
-            logger.info(f"[storage] Lifecycle policy set: {self.config.expiry_days} days")
+            logger.info(f"[storage] Lifecycle policy set: {self.config.expiry_days} days "
+                        f"({', '.join(self.config.expiry_prefixes) or 'whole bucket'})")
         except Exception as e:
             logger.warning(f"[storage] Failed to setup lifecycle: {e}")
     
@@ -97,6 +102,18 @@ class MinioStorageClient(StorageClient):
             operation=f"upload {object_name}"
         )
     
+    def get_object(self, bucket: str, object_name: str) -> bytes:
+        """Download object contents."""
+        try:
+            response = self.client.get_object(bucket, object_name)
+        except S3Error as e:
+            raise StorageError(f"Storage error: {e}", operation="download")
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+    
     def object_exists(self, bucket: str, object_name: str) -> bool:
         """Check if object exists."""
         try:
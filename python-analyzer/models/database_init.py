@@ -4,19 +4,24 @@ database_init.py — Initialize database schema and seed product taxonomy on sta
 Features:
 - Applies full BCNF schema if not already present
 - Seeds product_categories and products from configuration
+- Manages the time partitions of the hits table (creation ahead, retention)
 - Provides convenient session helpers
 """
 
 import logging
+import os
+import re
+import time
 from contextlib import contextmanager
-from typing import Generator
+from datetime import datetime, timedelta, timezone
+from typing import Generator, List, Optional, Tuple
 
 from sqlalchemy import inspect, text
 from config.settings import engine, SessionLocal, Base
 from models.database_models import (
     ProductCategory, Product, PaymentProvider, CrawlSession, AuditLog
 )
-from models.hit_model import Result, Hit  # noqa: F401 - ensures Base registers tables
+from models.hit_model import Result, ResultUrl, Hit  # noqa: F401 - ensures Base registers tables
 
 logger = logging.getLogger(__name__)
 
@@ -139,11 +144,235 @@ UPI_PROVIDERS = [
 ]
 
 
+# Columns added to existing tables after their first release; create_all only
+# creates missing tables, so these are added in place
+ADDED_COLUMNS = {
+    "results": [
+        ("total_matches", "INTEGER"),
+        ("total_urls", "INTEGER"),
+        ("keyword_counts", "JSON"),
+        ("raw_data_url", "TEXT"),
+    ],
+}
+
+
+def upgrade_columns():
+    """Add ADDED_COLUMNS missing from existing tables."""
+    existing = inspect(engine)
+    with engine.begin() as conn:
+        for table, columns in ADDED_COLUMNS.items():
+            if not existing.has_table(table):
+                continue
+            present = {c["name"] for c in existing.get_columns(table)}
+            for name, ddl in columns:
+                if name not in present:
+                    conn.execute(text(f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS "{name}" {ddl}'))
+                    logger.info(f"Added column {table}.{name}")
+
+
+# ---------------- HITS PARTITIONING ----------------
+# hits is range-partitioned on its epoch-seconds timestamp (see database_optimizations.sql,
+# section 13). Partitions are named hits_pYYYYMMDD after their first day (UTC).
+HITS_PARTITION_INTERVAL = os.environ.get("HITS_PARTITION_INTERVAL", "weekly").lower()  # daily | weekly
+HITS_PARTITIONS_AHEAD = int(os.environ.get("HITS_PARTITIONS_AHEAD", "4"))       # future partitions kept ready
+HITS_RETENTION_DAYS = int(os.environ.get("HITS_RETENTION_DAYS", "0"))           # 0 = keep everything
+# detach: partitions past retention are detached and renamed hits_archive_YYYYMMDD
+# (exported to Parquet and dropped by the archive job, libs/archive.py); drop: DROP TABLE
+HITS_RETENTION_MODE = os.environ.get("HITS_RETENTION_MODE", "detach").lower()
+# convert an existing unpartitioned hits table (copies every row once)
+HITS_PARTITION_MIGRATE = os.environ.get("HITS_PARTITION_MIGRATE", "0").lower() in ("1", "true", "yes")
+
+_PARTITION_RE = re.compile(r"^hits_p(\d{8})$")
+
+
+def _period_days() -> int:
+    return 1 if HITS_PARTITION_INTERVAL == "daily" else 7
+
+
+def _period_start(day: datetime) -> datetime:
+    day = day.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    if _period_days() == 7:
+        day -= timedelta(days=day.weekday())  # weeks start on Monday
+    return day
+
+
+def _partition_bounds(start: datetime) -> Tuple[str, int, int]:
+    end = start + timedelta(days=_period_days())
+    return f"hits_p{start:%Y%m%d}", int(start.timestamp()), int(end.timestamp())
+
+
+def hits_is_partitioned(conn) -> Optional[bool]:
+    """True/False for an existing hits table, None if there is none."""
+    kind = conn.execute(text(
+        "SELECT c.relkind FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+        "WHERE c.relname = 'hits' AND n.nspname = current_schema()"
+    )).scalar()
+    return None if kind is None else kind == "p"
+
+
+def hit_partitions(conn) -> List[str]:
+    return list(conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'hits'::regclass ORDER BY c.relname"
+    )).scalars())
+
+
+def _create_hit_partition(conn, name: str, lo: int, hi: int, has_default: bool) -> None:
+    """
+    Create one range partition. Rows that already landed in hits_default for its
+    range would make CREATE ... PARTITION OF fail, so they are moved into it:
+    the DEFAULT partition is detached, the partition created and filled from it,
+    and the DEFAULT partition attached again, all in the caller's transaction.
+    """
+    stray = has_default and conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM hits_default WHERE timestamp >= :lo AND timestamp < :hi)"
+    ), {"lo": lo, "hi": hi}).scalar()
+    if not stray:
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF hits "
+                          f"FOR VALUES FROM ({lo}) TO ({hi})"))
+        return
+    conn.execute(text("ALTER TABLE hits DETACH PARTITION hits_default"))
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF hits "
+                      f"FOR VALUES FROM ({lo}) TO ({hi})"))
+    moved = conn.execute(text(
+        f"WITH moved AS (DELETE FROM hits_default WHERE timestamp >= :lo AND timestamp < :hi RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), {"lo": lo, "hi": hi}).rowcount
+    conn.execute(text("ALTER TABLE hits ATTACH PARTITION hits_default DEFAULT"))
+    logger.warning(f"Partition {name} was missing: moved {moved} hits out of hits_default")
+
+
+def ensure_hit_partitions(now: Optional[float] = None, since: Optional[int] = None) -> List[str]:
+    """
+    Create the partitions from the current period (or from `since`, an epoch
+    timestamp) up to HITS_PARTITIONS_AHEAD periods ahead, plus the DEFAULT
+    partition that catches timestamps outside them. Returns the ones created.
+    Each partition is created in its own transaction, so one failure does not
+    undo the others.
+    """
+    created: List[str] = []
+    with engine.connect() as conn:
+        if not hits_is_partitioned(conn):
+            return created
+        existing = set(hit_partitions(conn))
+    has_default = "hits_default" in existing
+    current = _period_start(datetime.fromtimestamp(now or time.time(), timezone.utc))
+    start = _period_start(datetime.fromtimestamp(since, timezone.utc)) if since is not None else current
+    last = current + timedelta(days=_period_days() * HITS_PARTITIONS_AHEAD)
+    while start <= last:
+        name, lo, hi = _partition_bounds(start)
+        if name not in existing:
+            try:
+                with engine.begin() as conn:
+                    _create_hit_partition(conn, name, lo, hi, has_default)
+                created.append(name)
+            except Exception as e:
+                logger.error(f"Failed to create hits partition {name}: {e}")
+        start += timedelta(days=_period_days())
+    if not has_default:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE IF NOT EXISTS hits_default PARTITION OF hits DEFAULT"))
+        created.append("hits_default")
+    if created:
+        logger.info(f"Created hits partitions: {', '.join(created)}")
+    return created
+
+
+def detach_hit_partitions(cutoff: float, drop: bool = False) -> List[str]:
+    """
+    Detach every range partition of hits that ends at or before `cutoff` (epoch),
+    then drop it or rename it hits_archive_YYYYMMDD. No rows are DELETEd.
+    Returns the partitions removed.
+    """
+    removed: List[str] = []
+    with engine.begin() as conn:
+        if not hits_is_partitioned(conn):
+            return removed
+        for name in hit_partitions(conn):
+            m = _PARTITION_RE.match(name)
+            if not m:
+                continue
+            start = datetime.strptime(m.group(1), "%Y%m%d").replace(tzinfo=timezone.utc)
+            _, _, hi = _partition_bounds(start)
+            if hi > cutoff:
+                continue
+            conn.execute(text(f"ALTER TABLE hits DETACH PARTITION {name}"))
+            if drop:
+                conn.execute(text(f"DROP TABLE {name}"))
+            else:
+                conn.execute(text(f"ALTER TABLE {name} RENAME TO hits_archive_{m.group(1)}"))
+            removed.append(name)
+    return removed
+
+
+def apply_hit_retention(now: Optional[float] = None) -> List[str]:
+    """
+    Detach (HITS_RETENTION_MODE=detach) or drop every partition that ends before
+    HITS_RETENTION_DAYS ago. No rows are DELETEd. Returns the partitions removed.
+    """
+    if HITS_RETENTION_DAYS <= 0:
+        return []
+    cutoff = (now or time.time()) - HITS_RETENTION_DAYS * 86400
+    removed = detach_hit_partitions(cutoff, drop=HITS_RETENTION_MODE == "drop")
+    if removed:
+        logger.info(f"Hits retention ({HITS_RETENTION_MODE}, {HITS_RETENTION_DAYS}d): {', '.join(removed)}")
+    return removed
+
+
+def migrate_hits_to_partitioned() -> bool:
+    """
+    Convert an unpartitioned hits table: rename it to hits_legacy, create the
+    partitioned table, partitions covering its rows, and copy them over. The
+    id sequence continues after the legacy ids. hits_legacy is kept for the
+    operator to drop once checked.
+    """
+    with engine.begin() as conn:
+        if hits_is_partitioned(conn) is not False:
+            return False
+        oldest = conn.execute(text("SELECT min(timestamp) FROM hits")).scalar()
+        conn.execute(text("ALTER TABLE hits RENAME TO hits_legacy"))
+        for index in conn.execute(text(
+                "SELECT indexname FROM pg_indexes WHERE tablename = 'hits_legacy' "
+                "AND schemaname = current_schema()")).scalars():
+            conn.execute(text(f'ALTER INDEX "{index}" RENAME TO "{index}_legacy"'))
+        sequence = conn.execute(text("SELECT pg_get_serial_sequence('hits_legacy', 'id')")).scalar()
+        if sequence:
+            conn.execute(text(f"ALTER SEQUENCE {sequence} RENAME TO hits_legacy_id_seq"))
+        Hit.__table__.create(conn)
+    ensure_hit_partitions(since=oldest)
+    with engine.begin() as conn:
+        copied = conn.execute(text(
+            "INSERT INTO hits SELECT id, task_id, main_url, sub_url, category, matched_keyword, snippet, "
+            "screenshot_path, timestamp, source, confident_score FROM hits_legacy"
+        )).rowcount
+        conn.execute(text(
+            "SELECT setval(pg_get_serial_sequence('hits', 'id'), "
+            "GREATEST((SELECT max(id) FROM hits_legacy), 1))"
+        ))
+    logger.info(f"Migrated {copied} hits into the partitioned table (hits_legacy kept)")
+    return True
+
+
+def maintain_hit_partitions(now: Optional[float] = None) -> None:
+    """Create upcoming partitions and apply retention; run at startup and periodically."""
+    with engine.connect() as conn:
+        partitioned = hits_is_partitioned(conn)
+    if partitioned is False:
+        if not HITS_PARTITION_MIGRATE:
+            logger.warning("hits is not partitioned; set HITS_PARTITION_MIGRATE=1 to convert it")
+            return
+        migrate_hits_to_partitioned()
+    ensure_hit_partitions(now)
+    apply_hit_retention(now)
+
+
 def init_database():
     """Initialize database schema on application startup."""
     try:
         # Create all tables from ORM models
         Base.metadata.create_all(bind=engine)
+        upgrade_columns()
+        maintain_hit_partitions()
         logger.info("Database schema initialized successfully")
     except Exception as e:
         logger.error(f"Error initializing database schema: {e}")
@@ -1,6 +1,6 @@
 # models/result_model.py
 
-from sqlalchemy import Column, Integer, String, Text, JSON, BigInteger
+from sqlalchemy import Column, Integer, String, Text, JSON, BigInteger, UniqueConstraint, Index
 from config.settings import Base
 import time
 
@@ -10,6 +10,8 @@ class Result(Base):
     Results table: Stores ALL matches (before spaCy validation) as master data.
     One row per main_url containing all matches found before validation.
     This is the master data showing what was found before filtering.
+    Per-page counts live in result_urls; the snippets in object storage (raw_data_url).
+    sub_urls / keyword_match / raw_data are only filled on rows written before that.
     """
     __tablename__ = "results"
 
@@ -24,28 +26,92 @@ class Result(Base):
     raw_data = Column(Text, nullable=True)
     cleaned_data = Column(Text, nullable=True)
     timestamp = Column(Integer, default=lambda: int(time.time()))
+    total_matches = Column(Integer, nullable=True)     # ALL matches (before validation); NULL on older rows
+    total_urls = Column(Integer, nullable=True)        # pages scanned; NULL on older rows
+    keyword_counts = Column(JSON, default=dict)        # {keyword: matches}
+    raw_data_url = Column(Text, nullable=True)         # gzipped snippets in object storage
+
+
+class ResultUrl(Base):
+    """
+    Per-page aggregate of a Result: one row per (main_url, sub_url) scanned,
+    with the number of matches (before validation) found on that page.
+    """
+    __tablename__ = "result_urls"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    main_url = Column(String, nullable=False, index=True)
+    sub_url = Column(Text, nullable=False)
+    matches = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (UniqueConstraint("main_url", "sub_url", name="uq_result_urls_page"),)
 
 class Hit(Base):
     """
     Hits table: Stores ONLY validated matches (after spaCy validation).
     Individual hits that passed spaCy validation threshold.
     Multiple rows per main_url (one per validated match).
+    Range-partitioned on timestamp (daily or weekly partitions, managed by
+    models/database_init.py), so the primary key includes timestamp.
     """
     __tablename__ = "hits"
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    task_id = Column(String, nullable=False, index=True)             # Task identifier
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    task_id = Column(String, nullable=False)                          # Task identifier
     main_url = Column(Text, nullable=False, index=True)               # Main/master URL
-    sub_url = Column(Text, nullable=False, index=True)                # Subpage where match occurred
+    sub_url = Column(Text, nullable=False)                            # Subpage where match occurred
     category = Column(String(100), nullable=False)        # e.g., payments, crypto, etc.
     matched_keyword = Column(String(255), nullable=False) # Keyword or pattern term
     snippet = Column(Text, nullable=False)                # Contextual text snippet
     screenshot_path = Column(Text, nullable=True)        # Path to cropped screenshot
-    timestamp = Column(BigInteger, nullable=False)        # Unix epoch time
+    timestamp = Column(BigInteger, primary_key=True, nullable=False)  # Unix epoch time (partition key)
     source = Column(String(50), nullable=False)           # regex / alias / fuzzy / qr / context
     confident_score = Column(Integer, nullable=True)        # Confidence score from spaCy validation
 
+    __table_args__ = (
+        Index("ix_hits_task_sub_url", "task_id", "sub_url"),  # task lookups and screenshot assignment
+        Index("ix_hits_timestamp_brin", "timestamp", postgresql_using="brin"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
     def __repr__(self):
         return f"<Hit(task={self.task_id}, keyword={self.matched_keyword}, source={self.source})>"
 
 
+
+
+class HitRecord:
+    """
+    Lightweight hit used between record_hit, the hit queue, the DLQ and the
+    hit writer. Its fields are fixed once built; only `id` is filled in, once,
+    when the writer inserts it. Build a `Hit` with `to_orm()` where the ORM is needed.
+    """
+    __slots__ = ("id", "task_id", "main_url", "sub_url", "category", "matched_keyword", "snippet",
+                 "screenshot_path", "timestamp", "source", "confident_score")
+
+    def __init__(self, task_id: str, main_url: str, sub_url: str, category: str, matched_keyword: str,
+                 snippet: str, timestamp: int, source: str, confident_score: int = None,
+                 screenshot_path: str = None, id: int = None):
+        set_ = object.__setattr__
+        set_(self, "id", id)
+        set_(self, "task_id", task_id)
+        set_(self, "main_url", main_url)
+        set_(self, "sub_url", sub_url)
+        set_(self, "category", category)
+        set_(self, "matched_keyword", matched_keyword)
+        set_(self, "snippet", snippet)
+        set_(self, "screenshot_path", screenshot_path)
+        set_(self, "timestamp", timestamp)
+        set_(self, "source", source)
+        set_(self, "confident_score", confident_score)
+
+    def __setattr__(self, name, value):
+        if name != "id" or self.id is not None:
+            raise AttributeError(f"HitRecord.{name} is read-only")
+        object.__setattr__(self, name, value)
+
+    def to_orm(self) -> Hit:
+        return Hit(**{name: getattr(self, name) for name in self.__slots__})
+
+    def __repr__(self):
+        return f"<HitRecord(id={self.id}, task={self.task_id}, keyword={self.matched_keyword}, source={self.source})>"
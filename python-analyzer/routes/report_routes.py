@@ -1,3 +1,5 @@
+from typing import Optional
+
 from fastapi import APIRouter
 from controllers.report_controller import (
     export_hits_controller,
@@ -5,15 +7,22 @@ from controllers.report_controller import (
     report_upi_json_controller,
     list_report_tasks_controller,
     get_report_by_main_url_controller,
+    get_result_snippets_controller,
+    skipped_screenshots_controller,
+    request_skipped_screenshots_controller,
 )
 
 router = APIRouter(prefix="/report", tags=["reports"])
 
 # -------------------- EXPORT AGGREGATED HITS (from Postgres) --------------------
 @router.get("/export")
-def export_hits():
-    """Export aggregated crawl results from PostgreSQL (hits table) as CSV."""
-    return export_hits_controller()
+def export_hits(kind: str = "hits", task_id: Optional[str] = None, category: Optional[str] = None,
+                since: Optional[int] = None, until: Optional[int] = None, gzip: bool = False):
+    """
+    Stream hits (kind=hits) or results (kind=results) from PostgreSQL as CSV, optionally gzipped.
+    Filters: task_id, category, since/until (epoch seconds, [since, until)).
+    """
+    return export_hits_controller(kind, task_id, category, since, until, gzip)
 
 
 # -------------------- UPI REPORT (CSV) --------------------
@@ -32,13 +41,33 @@ def report_upi_json():
 
 # -------------------- LIST ALL UNIQUE MAIN URLS --------------------
 @router.get("/tasks")
-def list_report_tasks():
-    """List all unique main URLs from the hits table (grouped)."""
-    return list_report_tasks_controller()
+async def list_report_tasks(include_archived: bool = False):
+    """List all unique main URLs from the hits table (grouped); include_archived adds archived results."""
+    return await list_report_tasks_controller(include_archived)
 
 
 # -------------------- GET DETAILS FOR A SPECIFIC MAIN URL --------------------
 @router.get("/tasks/{main_url:path}")
-def get_report_by_main_url(main_url: str):
+async def get_report_by_main_url(main_url: str):
     """Retrieve detailed report for a given main_url."""
-    return get_report_by_main_url_controller(main_url)
+    return await get_report_by_main_url_controller(main_url)
+
+
+# -------------------- SNIPPETS OF A MAIN URL (from object storage) --------------------
+@router.get("/snippets")
+async def get_result_snippets(main_url: str):
+    """Return all snippets found for a main_url (before validation) as plain text."""
+    return await get_result_snippets_controller(main_url)
+
+
+# -------------------- SCREENSHOTS SKIPPED BY THE BUDGET --------------------
+@router.get("/screenshots/skipped/{task_id}")
+def skipped_screenshots(task_id: str, limit: int = 100):
+    """List screenshots skipped by the per-task/per-domain budget for a task."""
+    return skipped_screenshots_controller(task_id, limit)
+
+
+@router.post("/screenshots/skipped/{task_id}/request")
+async def request_skipped_screenshots(task_id: str, limit: int = 100):
+    """Queue skipped screenshots of a task for capture, bypassing the budget."""
+    return await request_skipped_screenshots_controller(task_id, limit)
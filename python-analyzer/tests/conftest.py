@@ -0,0 +1,5 @@
+import os
+import sys
+
+# modules import each other as libs.<name> / models.<name>, relative to the service root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
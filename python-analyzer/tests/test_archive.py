@@ -0,0 +1,113 @@
+import io
+import json
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+import config.settings as settings  # noqa: E402
+from libs import archive  # noqa: E402
+from models.hit_model import Result  # noqa: E402
+
+HIT_ROW = (1, "t1", "https://a.example", "https://a.example/p", "payments", "upi", "pay x@upi",
+           None, 1700000000, "regex", 90)
+
+
+def _hit_row(**overrides):
+    row = dict(zip(archive.HIT_COLUMNS, HIT_ROW), **overrides)
+    return tuple(row[c] for c in archive.HIT_COLUMNS)
+
+
+class FakeMinio:
+    """In-memory stand-in for MinioStorageClient (only what archive.py uses)."""
+
+    def __init__(self):
+        self.objects = {}
+
+    def object_exists(self, bucket, name):
+        return name in self.objects
+
+    def get_object(self, bucket, name):
+        return self.objects[name]
+
+    def upload_object(self, bucket, name, data, length, content_type="application/octet-stream"):
+        self.objects[name] = data.read()
+        assert len(self.objects[name]) == length
+
+
+@pytest.fixture
+def minio(monkeypatch):
+    client = FakeMinio()
+    monkeypatch.setattr(settings, "minio_client", client)
+    return client
+
+
+def test_day_and_safe():
+    assert archive._day(1700000000) == "2023-11-14"
+    assert archive._safe("crypto/wallet drain") == "crypto_wallet_drain"
+    assert archive._safe(None) == "none"
+    assert len(archive._safe("x" * 200)) == 64
+
+
+def test_column_batches_split_rows_and_fill_the_span(monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_BATCH_ROWS", 2)
+    rows = [_hit_row(id=5, main_url="https://b.example", timestamp=1700000005),
+            _hit_row(id=3, main_url="https://a.example", timestamp=1700000003),
+            _hit_row(id=9, main_url="https://b.example", timestamp=1700000009)]
+    span = archive._Span()
+    batches = list(archive._column_batches(rows, archive.HIT_COLUMNS, span))
+    assert [len(b["id"]) for b in batches] == [2, 1]
+    assert batches[0]["id"] == [5, 3] and batches[1]["timestamp"] == [1700000009]
+    assert (span.rows, span.first_id, span.last_id) == (3, 3, 9)
+    assert (span.min_ts, span.max_ts) == (1700000003, 1700000009)
+    entry = span.entry("hits", "2023-11-14", "payments")
+    assert entry["main_urls"] == ["https://a.example", "https://b.example"]
+    assert entry["rows"] == 3 and entry["category"] == "payments"
+
+
+def test_result_row_folds_legacy_lists_into_counts():
+    legacy = Result(id=1, task_id="t", main_url="https://a.example", categories=["payments"],
+                    keyword_match=["upi", "upi", "crypto"], sub_urls=["https://a.example/1"],
+                    total_matches=None, total_urls=None, raw_data=None, timestamp=1700000000)
+    row = dict(zip(archive.RESULT_COLUMNS, archive._result_row(legacy, {}, "u")))
+    assert json.loads(row["keyword_counts"]) == {"upi": 2, "crypto": 1}
+    assert json.loads(row["url_matches"]) == {"https://a.example/1": 0}
+    assert (row["total_matches"], row["total_urls"], row["raw_data_url"]) == (3, 1, "u")
+
+
+def test_archive_snippets_copies_under_the_archive_prefix(minio):
+    minio.objects["results/a-example/t1-snippets.txt.gz"] = b"gz"
+    url = f"minio:7000/{archive.MINIO_BUCKET}/results/a-example/t1-snippets.txt.gz"
+    moved = archive._archive_snippets(url)
+    target = f"{archive.ARCHIVE_PREFIX}/snippets/results/a-example/t1-snippets.txt.gz"
+    assert moved == f"minio:7000/{archive.MINIO_BUCKET}/{target}"
+    assert minio.objects[target] == b"gz"
+    # already archived, or nothing to copy: unchanged
+    assert archive._archive_snippets(moved) == moved
+    assert archive._archive_snippets(None) is None
+    gone = f"minio:7000/{archive.MINIO_BUCKET}/results/expired.txt.gz"
+    assert archive._archive_snippets(gone) == gone
+
+
+def test_parquet_upload_round_trip(minio):
+    pytest.importorskip("pyarrow")
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    span = archive._Span()
+    rows = archive._upload_parquet("archive/hits/x.parquet", archive.HIT_SCHEMA,
+                                   archive._column_batches([HIT_ROW], archive.HIT_COLUMNS, span))
+    assert rows == 1
+    table = pq.read_table(pa.BufferReader(minio.objects["archive/hits/x.parquet"]))
+    assert table.to_pylist()[0] == dict(zip(archive.HIT_COLUMNS, HIT_ROW))
+
+
+def test_archived_objects_filter_by_table_and_main_url(monkeypatch):
+    manifest = {"files": {
+        "archive/hits/a.parquet": {"table": "hits", "main_urls": ["https://a.example"]},
+        "archive/hits/b.parquet": {"table": "hits", "main_urls": ["https://b.example"]},
+        "archive/results/a.parquet": {"table": "results", "main_urls": ["https://a.example"]},
+    }}
+    monkeypatch.setattr(archive, "load_manifest", lambda max_age=None: manifest)
+    assert archive.archived_objects("hits") == ["archive/hits/a.parquet", "archive/hits/b.parquet"]
+    assert archive.archived_objects("hits", "https://a.example") == ["archive/hits/a.parquet"]
+    assert archive.archived_objects("results", "https://b.example") == []
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from models import database_init  # noqa: E402
+from models.database_init import _PARTITION_RE, _partition_bounds, _period_start  # noqa: E402
+
+
+def utc(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def weekly(monkeypatch):
+    monkeypatch.setattr(database_init, "HITS_PARTITION_INTERVAL", "weekly")
+
+
+@pytest.fixture
+def daily(monkeypatch):
+    monkeypatch.setattr(database_init, "HITS_PARTITION_INTERVAL", "daily")
+
+
+def test_daily_period_starts_at_utc_midnight(daily):
+    assert _period_start(utc(2026, 10, 14, 23, 59, 59)) == utc(2026, 10, 14)
+    name, lo, hi = _partition_bounds(utc(2026, 10, 14))
+    assert name == "hits_p20261014"
+    assert (lo, hi) == (int(utc(2026, 10, 14).timestamp()), int(utc(2026, 10, 15).timestamp()))
+
+
+def test_weekly_period_starts_on_monday(weekly):
+    # 2026-10-14 is a Wednesday
+    assert _period_start(utc(2026, 10, 14, 12)) == utc(2026, 10, 12)
+    assert _period_start(utc(2026, 10, 12)) == utc(2026, 10, 12)
+    assert _period_start(utc(2026, 10, 18, 23, 59)) == utc(2026, 10, 12)
+    name, lo, hi = _partition_bounds(utc(2026, 10, 12))
+    assert name == "hits_p20261012"
+    assert hi - lo == 7 * 86400
+
+
+def test_period_start_converts_to_utc(daily):
+    plus_five = timezone(timedelta(hours=5))
+    # 02:00 at +05:00 is still the previous day in UTC
+    assert _period_start(datetime(2026, 10, 15, 2, tzinfo=plus_five)) == utc(2026, 10, 14)
+
+
+def test_consecutive_partitions_tile_without_gaps(weekly):
+    start = _period_start(utc(2026, 12, 28))
+    bounds = []
+    for _ in range(6):
+        name, lo, hi = _partition_bounds(start)
+        bounds.append((lo, hi))
+        start = datetime.fromtimestamp(hi, timezone.utc)
+    assert all(prev[1] == nxt[0] for prev, nxt in zip(bounds, bounds[1:]))
+
+
+def test_partition_name_pattern():
+    assert _PARTITION_RE.match("hits_p20261012").group(1) == "20261012"
+    for name in ("hits_default", "hits_archive_20261012", "hits_p2026101", "hits"):
+        assert _PARTITION_RE.match(name) is None
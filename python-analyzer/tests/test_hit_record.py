@@ -0,0 +1,70 @@
+import json
+from dataclasses import asdict
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from libs.dlq import FailedHit  # noqa: E402
+from models.hit_model import Hit, HitRecord  # noqa: E402
+
+
+def make(**overrides) -> HitRecord:
+    fields = dict(task_id="t1", main_url="https://a.example", sub_url="https://a.example/p",
+                  category="payments", matched_keyword="upi", snippet="pay to x@upi",
+                  timestamp=1700000000, source="regex", confident_score=90)
+    fields.update(overrides)
+    return HitRecord(**fields)
+
+
+def test_fields_and_defaults():
+    hit = make()
+    assert hit.id is None and hit.screenshot_path is None
+    assert hit.matched_keyword == "upi" and hit.timestamp == 1700000000
+    assert not hasattr(hit, "__dict__")
+
+
+def test_id_is_set_once():
+    hit = make()
+    hit.id = 42
+    assert hit.id == 42
+    with pytest.raises(AttributeError):
+        hit.id = 43
+    assert make(id=7).id == 7
+
+
+def test_other_fields_are_read_only():
+    hit = make()
+    with pytest.raises(AttributeError):
+        hit.snippet = "changed"
+    with pytest.raises(AttributeError):
+        hit.unknown = 1
+    assert hit.snippet == "pay to x@upi"
+
+
+def test_to_orm_copies_every_field():
+    hit = make(id=5, screenshot_path="minio/s.png")
+    row = hit.to_orm()
+    assert isinstance(row, Hit)
+    for name in HitRecord.__slots__:
+        assert getattr(row, name) == getattr(hit, name)
+
+
+def test_failed_hit_round_trip_keeps_the_primary_key():
+    hit = make(id=99)
+    failed = FailedHit.from_record(hit, error="db_flush_timeout")
+    # as stored in and read back from the Redis DLQ
+    restored = FailedHit(**json.loads(json.dumps(asdict(failed), default=str)))
+    record = restored.to_record()
+    assert (record.id, record.timestamp) == (99, hit.timestamp)
+    for name in ("task_id", "main_url", "sub_url", "category", "matched_keyword", "snippet", "source",
+                 "confident_score"):
+        assert getattr(record, name) == getattr(hit, name)
+
+
+def test_failed_hit_from_older_entries_without_id():
+    data = asdict(FailedHit.from_record(make(confident_score=None), error="x"))
+    data.pop("id")
+    restored = FailedHit(**data)
+    assert restored.confident_score == 0
+    assert restored.to_record().id is None
@@ -0,0 +1,132 @@
+import csv
+import itertools
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy.dialects import postgresql  # noqa: E402
+
+from libs import hit_writer  # noqa: E402
+from models.hit_model import HitRecord  # noqa: E402
+
+
+def make(i=0, **overrides) -> HitRecord:
+    fields = dict(task_id="t1", main_url="https://a.example", sub_url=f"https://a.example/{i}",
+                  category="payments", matched_keyword="upi", snippet=f"pay {i}, \"quoted\"\nline",
+                  timestamp=1700000000 + i, source="regex", confident_score=90)
+    fields.update(overrides)
+    return HitRecord(**fields)
+
+
+class _Result:
+    def __init__(self, values=(), rowcount=0):
+        self._values, self.rowcount = list(values), rowcount
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self._values
+
+
+class FakeSession:
+    """Records statements; hands out sequence ids; no database."""
+
+    def __init__(self):
+        self.statements, self.commits, self.rollbacks = [], 0, 0
+        self._ids = itertools.count(1000)
+
+    def execute(self, statement, params=None):
+        sql = str(statement.compile(dialect=postgresql.dialect())) if not hasattr(statement, "text") \
+            else statement.text
+        self.statements.append((sql, params))
+        if "nextval" in sql:
+            return _Result([next(self._ids) for _ in range(params["n"])])
+        return _Result(rowcount=len(params) if isinstance(params, list) else 0)
+
+    def bulk_save_objects(self, rows, return_defaults=False):
+        for row in rows:
+            row.id = next(self._ids)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def test_csv_rows_follow_columns_and_strip_nul():
+    hit = make(snippet="a\x00b, c", screenshot_path=None, id=1)
+    rows = list(csv.reader(hit_writer._csv([hit])))
+    assert len(rows) == 1
+    row = dict(zip(hit_writer._COLUMNS, rows[0]))
+    assert row["snippet"] == "ab, c"
+    assert row["screenshot_path"] == "" and row["id"] == "1"
+
+
+def test_records_use_empty_string_only_for_not_null_columns():
+    hit = make(screenshot_path=None, confident_score=None, snippet=None, id=1)
+    record = dict(zip(hit_writer._COLUMNS, hit_writer._records([hit])[0]))
+    assert record["screenshot_path"] is None and record["confident_score"] is None
+    if "snippet" in hit_writer._NOT_NULL:
+        assert record["snippet"] == ""
+
+
+def test_reserve_ids_only_for_hits_without_one():
+    db = FakeSession()
+    hits = [make(0), make(1, id=7), make(2)]
+    hit_writer._reserve_ids(db, hits)
+    assert [h.id for h in hits] == [1000, 7, 1001]
+    assert db.statements[0][1] == {"n": 2}
+
+
+@pytest.fixture
+def copy_calls(monkeypatch):
+    calls = []
+
+    def fake_copy(db, hits, staging):
+        calls.append(staging)
+        return len(hits)
+    monkeypatch.setattr(hit_writer, "_copy", fake_copy)
+    return calls
+
+
+def test_fresh_batch_in_copy_mode_goes_straight_in(copy_calls):
+    db = FakeSession()
+    hits = [make(0), make(1)]
+    assert hit_writer.write_hits(db, hits, "copy") == "copy"
+    assert copy_calls == [False]
+    assert all(h.id is not None for h in hits) and db.commits == 1
+
+
+def test_retried_batch_in_copy_mode_is_merged_through_staging(copy_calls):
+    db = FakeSession()
+    hits = [make(0, id=5), make(1)]
+    assert hit_writer.write_hits(db, hits, "copy") == "copy"
+    assert copy_calls == [True]
+    assert hits[0].id == 5
+
+
+def test_copy_failure_falls_back_to_orm_with_on_conflict(monkeypatch):
+    def broken(db, hits, staging):
+        raise RuntimeError("copy failed")
+    monkeypatch.setattr(hit_writer, "_copy", broken)
+    db = FakeSession()
+    hits = [make(0), make(1)]
+    assert hit_writer.write_hits(db, hits, "copy_staging") == "orm"
+    assert db.rollbacks == 1 and db.commits == 1
+    # ids reserved before the failed COPY are kept and inserted idempotently
+    inserts = [(sql, params) for sql, params in db.statements if sql.startswith("INSERT")]
+    assert len(inserts) == 1
+    sql, params = inserts[0]
+    assert "ON CONFLICT DO NOTHING" in sql
+    assert [p["id"] for p in params] == [h.id for h in hits]
+
+
+def test_orm_mode_assigns_ids_through_the_orm():
+    db = FakeSession()
+    hits = [make(0), make(1)]
+    assert hit_writer.write_hits(db, hits, "orm") == "orm"
+    assert [h.id for h in hits] == [1000, 1001]
+    assert not any(sql.startswith("INSERT") for sql, _ in db.statements)
@@ -0,0 +1,94 @@
+import pytest
+
+pytest.importorskip("selectolax")
+
+from selectolax.parser import HTMLParser  # noqa: E402
+
+from libs import js_predictor  # noqa: E402
+from libs.js_predictor import (LANE_RENDER_FIRST, LANE_RENDER_PARALLEL, LANE_STATIC, PageFeatures,  # noqa: E402
+                               RenderHistory, extract_features, lane_for, predict, score)
+
+SPA = """<html><head><script src="/a.js"></script><script src="/b.js"></script>
+<script>window.__NEXT_DATA__ = {"props": {}};</script></head>
+<body><div id="__next"></div><noscript>You need to enable JavaScript to run this app.</noscript></body></html>"""
+
+ARTICLE = ("<html><body><article>"
+           + "".join("<p>" + "Plain server-rendered text. " * 40 + "</p>" for _ in range(8))
+           + "</article><style>p { color: red }</style></body></html>")
+
+
+def _features(html):
+    return extract_features(html, HTMLParser(html))
+
+
+def test_spa_features():
+    f = _features(SPA)
+    assert f.external_scripts == 2
+    assert f.script_bytes == len('window.__NEXT_DATA__ = {"props": {}};')
+    assert f.framework and f.empty_mount and f.noscript_js
+    assert f.html_bytes == len(SPA)
+
+
+def test_article_features_exclude_style_text():
+    f = _features(ARTICLE)
+    assert not (f.framework or f.empty_mount or f.noscript_js)
+    assert f.external_scripts == 0 and f.script_bytes == 0
+    body_text = HTMLParser(ARTICLE).body.text(separator=" ", strip=True)
+    assert f.text_bytes == len(body_text) - len("p { color: red }")
+    assert f.text_bytes > 5000
+
+
+def test_scores_order_pages_and_lanes():
+    spa, article = score(_features(SPA)), score(_features(ARTICLE))
+    assert 0.0 < article < spa < 1.0
+    assert lane_for(spa) == LANE_RENDER_FIRST
+    assert lane_for(article) == LANE_STATIC
+
+
+def test_lane_thresholds():
+    assert lane_for(js_predictor.RENDER_FIRST_THRESHOLD) == LANE_RENDER_FIRST
+    assert lane_for(js_predictor.RENDER_PARALLEL_THRESHOLD) == LANE_RENDER_PARALLEL
+    assert lane_for(js_predictor.RENDER_PARALLEL_THRESHOLD - 1e-9) == LANE_STATIC
+
+
+def test_history_moves_the_score():
+    f = PageFeatures(html_bytes=3000, text_bytes=1000, script_bytes=1000, external_scripts=2,
+                     framework=False, empty_mount=False, noscript_js=False)
+    assert score(f, history_rate=0.0) < score(f) < score(f, history_rate=1.0)
+
+
+def test_history_needs_min_renders_and_is_smoothed(tmp_path, monkeypatch):
+    monkeypatch.setattr(js_predictor, "HISTORY_MIN_RENDERS", 3)
+    history = RenderHistory(str(tmp_path / "stats.json"))
+    history.record("shop.example", True)
+    history.record("shop.example", True)
+    assert history.rate("shop.example") is None
+    history.record("shop.example", False)
+    assert history.rate("shop.example") == pytest.approx((2 + 1) / (3 + 2))
+    history.record("", True)  # ignored
+    assert history.rate("") is None
+
+
+def test_history_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(js_predictor, "HISTORY_MIN_RENDERS", 1)
+    path = str(tmp_path / "stats.json")
+    history = RenderHistory(path)
+    history.record("a.example", True)
+    history.save()
+    assert RenderHistory(path).rate("a.example") == pytest.approx(2 / 3)
+
+
+def test_history_ignores_unreadable_file(tmp_path):
+    path = tmp_path / "stats.json"
+    path.write_text("{not json")
+    assert RenderHistory(str(path)).rate("a.example") is None
+
+
+def test_predict_uses_history():
+    class Always:
+        def rate(self, domain):
+            assert domain == "x.example"
+            return 1.0
+    out = predict(ARTICLE, HTMLParser(ARTICLE), "x.example", Always())
+    assert out["lane"] in (LANE_STATIC, LANE_RENDER_PARALLEL, LANE_RENDER_FIRST)
+    assert out["score"] > score(out["features"])
@@ -0,0 +1,61 @@
+import threading
+
+from libs.match_index import MatchIndex
+
+
+def test_repeat_pair_is_rejected_per_task():
+    index = MatchIndex(stripes=4)
+    assert index.add("https://a.example", "https://a.example/1", "upi")
+    assert not index.add("https://a.example", "https://a.example/1", "upi")
+    assert index.add("https://a.example", "https://a.example/1", "crypto")
+    assert index.add("https://a.example", "https://a.example/2", "upi")
+    # another task keeps its own pairs
+    assert index.add("https://b.example", "https://a.example/1", "upi")
+    assert index.size("https://a.example") == 3
+    assert index.tasks() == 2
+
+
+def test_clear_forgets_the_task():
+    index = MatchIndex(stripes=1)
+    index.add("t", "u", "k")
+    index.add("other", "u", "k")
+    index.clear("t")
+    assert index.size("t") == 0
+    assert index.add("t", "u", "k")
+    assert not index.add("other", "u", "k")
+    index.clear("missing")  # no-op
+
+
+def test_oldest_pairs_dropped_past_the_cap():
+    index = MatchIndex(stripes=2, max_per_task=2)
+    for url in ("u1", "u2", "u3"):
+        assert index.add("t", url, "k")
+    assert index.size("t") == 2
+    assert index.add("t", "u1", "k")      # forgotten, so recorded again
+    assert not index.add("t", "u3", "k")  # still indexed
+
+
+def test_zero_cap_is_unbounded_and_zero_stripes_still_work():
+    index = MatchIndex(stripes=0, max_per_task=0)
+    for i in range(1000):
+        index.add("t", f"u{i}", "k")
+    assert index.size("t") == 1000
+
+
+def test_concurrent_adds_record_each_pair_once():
+    index = MatchIndex(stripes=8)
+    accepted = []
+    lock = threading.Lock()
+
+    def worker():
+        mine = sum(index.add(f"task{i % 5}", f"u{i}", "k") for i in range(2000))
+        with lock:
+            accepted.append(mine)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(accepted) == 2000
+    assert sum(index.size(f"task{i}") for i in range(5)) == 2000
@@ -0,0 +1,74 @@
+import csv
+import gzip
+import io
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy.dialects import postgresql  # noqa: E402
+
+from controllers import report_controller as rc  # noqa: E402
+
+
+class FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.closed = False
+
+    def execute(self, stmt):
+        return iter(self.rows)
+
+    def close(self):
+        self.closed = True
+
+
+def _sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def test_result_csv_row_prefers_keyword_counts():
+    row = ("https://a.example", "t1", 3, 2, ["payments", "crypto"], {"upi": 2, "btc": 1}, ["ignored"], "u", 17)
+    assert rc._result_csv_row(row) == ["https://a.example", "t1", 3, 2, "payments;crypto", "upi:2;btc:1", "u", 17]
+
+
+def test_result_csv_row_counts_legacy_keyword_lists():
+    row = ("https://a.example", "t1", 3, 1, None, None, ["upi", "btc", "upi"], None, 17)
+    assert rc._result_csv_row(row)[4:6] == ["", "upi:2;btc:1"]
+    assert rc._result_csv_row(row[:5] + (None, None) + row[7:])[5] == ""
+
+
+def test_export_query_filters_and_orders_by_id():
+    hits = _sql(rc._export_query("hits", "t1", "payments", 10, 20))
+    assert "hits.category = " in hits and "hits.task_id = " in hits
+    assert "hits.timestamp >= " in hits and "hits.timestamp < " in hits
+    assert hits.rstrip().endswith("ORDER BY hits.id")
+    results = _sql(rc._export_query("results", None, "payments", None, None))
+    assert "@>" in results and "results.timestamp" not in results.split("WHERE")[1]
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_iter_export_csv_chunks_and_closes_the_session(monkeypatch, compress):
+    rows = [(i, "t1", "https://a.example", f"https://a.example/{i}", "payments", "upi", "pay,now",
+             None, 1700000000 + i, "regex", 90) for i in range(50)]
+    session = FakeSession(rows)
+    monkeypatch.setattr(rc, "SessionLocal", lambda: session)
+    monkeypatch.setattr(rc, "EXPORT_CHUNK_BYTES", 512)
+    chunks = list(rc.iter_export_csv("hits", compress=compress))
+    assert len(chunks) > 1 and session.closed
+    data = b"".join(chunks)
+    text = (gzip.decompress(data) if compress else data).decode("utf-8")
+    parsed = list(csv.reader(io.StringIO(text)))
+    assert parsed[0] == [c.key for c in rc.HIT_EXPORT_COLUMNS]
+    assert len(parsed) == 51 and parsed[1][6] == "pay,now" and parsed[-1][0] == "49"
+
+
+def test_iter_export_csv_closes_the_session_when_abandoned(monkeypatch):
+    session = FakeSession([(i,) * 11 for i in range(1000)])
+    monkeypatch.setattr(rc, "SessionLocal", lambda: session)
+    monkeypatch.setattr(rc, "EXPORT_CHUNK_BYTES", 64)
+    gen = rc.iter_export_csv("hits")
+    next(gen)
+    gen.close()
+    assert session.closed
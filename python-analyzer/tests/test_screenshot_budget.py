@@ -0,0 +1,107 @@
+import pytest
+
+from libs.screenshot_budget import (SKIP_DOMAIN_BUDGET, SKIP_SAMPLED_OUT, SKIP_TASK_BUDGET, ScreenshotBudget,
+                                    domain_of)
+
+
+def budget(task_cap=0, domain_cap=0, domain_floor=0, sampling_load=0.8, target_latency_sec=10.0):
+    return ScreenshotBudget(task_cap=task_cap, domain_cap=domain_cap, domain_floor=domain_floor,
+                            sampling_load=sampling_load, target_latency_sec=target_latency_sec)
+
+
+def test_domain_of_strips_www_and_case():
+    assert domain_of("https://WWW.Shop.Example/x?y") == "shop.example"
+    assert domain_of("http://api.shop.example:8080/") == "api.shop.example"
+    assert domain_of("not a url") == ""
+
+
+def test_load_is_queue_fill_or_latency_pressure():
+    b = budget(target_latency_sec=10.0)
+    assert b.load(0.3) == 0.3
+    b.observe_latency(15.0)
+    assert b.load(0.1) == pytest.approx(0.5)
+    b.observe_latency(100.0)
+    assert b.load(0.0) == 1.0
+    assert b.load(-1.0) == 1.0
+
+
+def test_latency_is_smoothed():
+    b = budget()
+    b.observe_latency(10.0)
+    b.observe_latency(20.0)
+    assert b.latency_sec == pytest.approx(12.0)
+
+
+def test_domain_limit_shrinks_with_load_to_the_floor():
+    b = budget(domain_cap=10, domain_floor=2)
+    assert b.domain_limit(0.0) == 10
+    assert b.domain_limit(0.5) == 5
+    assert b.domain_limit(1.0) == 2
+    assert budget(domain_cap=0).domain_limit(1.0) == 0
+    assert budget(domain_cap=3, domain_floor=5).domain_floor == 3
+
+
+def test_task_cap():
+    b = budget(task_cap=2)
+    assert b.admit("t", "a.example", ["k1"], 0.0) is None
+    assert b.admit("t", "b.example", ["k2"], 0.0) is None
+    assert b.admit("t", "c.example", ["k3"], 0.0) == SKIP_TASK_BUDGET
+    assert b.admit("other", "a.example", ["k1"], 0.0) is None
+
+
+def test_domain_cap():
+    b = budget(domain_cap=1, domain_floor=1)
+    assert b.admit("t", "a.example", ["k1"], 0.0) is None
+    assert b.admit("t", "a.example", ["k2"], 0.0) == SKIP_DOMAIN_BUDGET
+    assert b.admit("t", "b.example", ["k2"], 0.0) is None
+
+
+def test_sampling_keeps_only_new_keywords_under_load():
+    b = budget(sampling_load=0.5)
+    assert b.admit("t", "a.example", ["k1"], 0.9) is None
+    b.settle("t", "a.example", ["k1"])
+    assert b.admit("t", "a.example", ["k1"], 0.9) == SKIP_SAMPLED_OUT
+    assert b.admit("t", "a.example", ["k1", "k2"], 0.9) is None
+    # below the sampling load repeats are still taken
+    assert b.admit("t", "a.example", ["k1"], 0.1) is None
+
+
+def test_settle_without_capture_releases_the_slot():
+    b = budget(task_cap=1)
+    assert b.admit("t", "a.example", ["k1"], 0.0) is None
+    b.settle("t", "a.example", [])
+    assert b.novelty("t", "a.example", ["k1"]) == 1
+    assert b.admit("t", "a.example", ["k1"], 0.0) is None
+    b.settle("t", "a.example", ["k1"])
+    assert b.admit("t", "a.example", ["k2"], 0.0) == SKIP_TASK_BUDGET
+
+
+def test_keywords_count_as_captured_only_once_settled():
+    b = budget(sampling_load=0.5)
+    assert b.admit("t", "a.example", ["k1"], 0.9) is None
+    # the first capture is still in flight: k1 is not captured yet
+    assert b.novelty("t", "a.example", ["k1"]) == 1
+
+
+def test_priority_prefers_new_keywords_then_confidence():
+    b = budget()
+    b.admit("t", "a.example", ["seen"], 0.0)
+    b.settle("t", "a.example", ["seen"])
+    keys = {
+        "new-low": b.priority("t", "a.example", ["n1"], 0.7),
+        "new-high": b.priority("t", "a.example", ["n1"], 0.9),
+        "two-new": b.priority("t", "a.example", ["n1", "n2"], 0.5),
+        "seen": b.priority("t", "a.example", ["seen"], 1.0),
+    }
+    assert sorted(keys, key=keys.get) == ["two-new", "new-high", "new-low", "seen"]
+
+
+def test_forget_drops_the_task_only():
+    b = budget(task_cap=1)
+    b.admit("t1", "a.example", ["k"], 0.0)
+    b.settle("t1", "a.example", ["k"])
+    b.admit("t2", "a.example", ["k"], 0.0)
+    b.forget("t1")
+    assert b.admit("t1", "a.example", ["k"], 0.0) is None
+    assert b.novelty("t1", "a.example", ["k"]) == 1
+    assert b.admit("t2", "b.example", ["k"], 0.0) == SKIP_TASK_BUDGET